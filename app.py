@@ -3,18 +3,20 @@
 SAS Awards web dashboard.
 Two pages: Dashboard (/) and Reports (/reports).
 """
+import datetime
+import functools
+import hashlib
 import os
-import requests
-from flask import Flask, render_template, request, jsonify, redirect
+from flask import Flask, render_template, request, jsonify, redirect, make_response
 
 import queries
 import regions as _regions
-from report_config import MIN_SEATS
+import sas_routes
+from report_config import MIN_SEATS, TRIP_DAYS_MIN, TRIP_DAYS_MAX
 
 from partner_awards.airfrance.routes import bp as partner_airfrance_bp
 from partner_awards.pages import bp as partner_pages_bp
 
-ROUTES_API = "https://www.sas.se/bff/award-finder/routes/v1"
 # SAS booking: sas.se/boka/flyg is 404; use flysas.com booking page
 BOOK_BASE_URL = "https://www.flysas.com/en/book"
 
@@ -23,11 +25,61 @@ app.register_blueprint(partner_airfrance_bp)
 app.register_blueprint(partner_pages_bp)
 
 
+# ═══════════════════════════════════════════════════════════════════════════
+# HTTP caching: ETag / Last-Modified from the fetcher's data_version
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _validators():
+    """
+    (etag, last_modified) for the current request and data version. Built only
+    from shared inputs (data_version, the UTC day, the request path), so every
+    worker process and restart agrees on them.
+    """
+    version, updated_at = queries.data_version()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    # Queries filter on date('now'), so content also changes at UTC midnight
+    last_modified = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if updated_at:
+        last_modified = max(last_modified, datetime.datetime.fromisoformat(updated_at.replace("Z", "+00:00")))
+    key = f"{version}|{updated_at}|{now.date().isoformat()}|{request.full_path}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest(), last_modified
+
+
+def conditional(view):
+    """
+    Answer If-None-Match / If-Modified-Since with 304 before running the view
+    when the data has not changed; tag successful responses with validators.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        etag, last_modified = _validators()
+        if request.if_none_match:
+            fresh = request.if_none_match.contains(etag)
+        else:
+            ims = request.if_modified_since
+            fresh = ims is not None and last_modified <= ims
+        if fresh:
+            resp = make_response("", 304)
+        else:
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200:
+                return resp
+        resp.set_etag(etag)
+        resp.last_modified = last_modified
+        # Cacheable, but the browser must revalidate (cheap 304) before reuse
+        resp.cache_control.public = True
+        resp.cache_control.no_cache = True
+        return resp
+
+    return wrapper
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 # Primary pages
 # ═══════════════════════════════════════════════════════════════════════════
 
 @app.route("/")
+@conditional
 def dashboard():
     args = request.args
     mode = args.get("mode", "flights")
@@ -39,6 +91,8 @@ def dashboard():
     from_date = args.get("from", "")
     to_date = args.get("to", "")
     page = int(args.get("page", 1))
+    after = args.get("after", "")
+    before = args.get("before", "")
 
     stats = queries.dashboard_stats()
     region_defs = queries.region_counts()
@@ -49,12 +103,14 @@ def dashboard():
         results = queries.query_weekend_pairs(
             countries=countries, cabin=cabin, origin=origin,
             min_seats=min_seats, city=city, page=page, per_page=50,
+            after=after, before=before,
         )
     else:
         results = queries.query_flights(
             countries=countries, cabin=cabin, origin=origin,
             min_seats=min_seats, from_date=from_date, to_date=to_date,
             city=city, page=page, per_page=50,
+            after=after, before=before,
         )
 
     return render_template(
@@ -69,6 +125,7 @@ def dashboard():
 
 
 @app.route("/reports")
+@conditional
 def reports():
     tab = request.args.get("tab", "region")
     origin = request.args.get("origin", "")
@@ -139,6 +196,7 @@ def api_reports_region_cities():
 
 
 @app.route("/api/reports/calendar")
+@conditional
 def api_reports_calendar():
     """Daily availability for origin+code from today to +365 days."""
     origin = request.args.get("origin", "")
@@ -158,21 +216,27 @@ def api_reports_calendar():
 
 
 @app.route("/api/reports/calendar/weekend-pairs")
+@conditional
 def api_reports_calendar_weekend_pairs():
-    """Weekend pairs (out Wed–Fri, back Sat–Mon) for a single route."""
+    """Weekend pairs (out Wed–Fri, back Sat–Mon) for a single route; trip_min/trip_max in days."""
     origin = request.args.get("origin", "")
     code = request.args.get("code", "")
     min_seats = int(request.args.get("min_seats", MIN_SEATS))
     cabin = request.args.get("cabin", "all")
+    trip_days = (
+        int(request.args.get("trip_min", TRIP_DAYS_MIN)),
+        int(request.args.get("trip_max", TRIP_DAYS_MAX)),
+    )
     if not origin or not code:
         return jsonify({"error": "Missing origin or code"}), 400
     pairs = queries.weekend_pairs_for_route(
-        origin, code, min_seats=min_seats, cabin=cabin
+        origin, code, min_seats=min_seats, cabin=cabin, trip_days=trip_days
     )
     return jsonify({"origin": origin, "code": code, "pairs": pairs})
 
 
 @app.route("/api/detail")
+@conditional
 def api_detail():
     origin = request.args.get("origin", "")
     dest = request.args.get("dest", "")
@@ -199,15 +263,7 @@ def api_routes_proxy():
     date = request.args.get("date", "")
     if not all([orig, dest, date]):
         return jsonify({"error": "Missing origin, dest, or date"}), 400
-    try:
-        r = requests.get(ROUTES_API, params={
-            "market": "se-sv", "origin": orig, "destination": dest,
-            "departureDate": date, "direct": "false",
-        }, timeout=15)
-        r.raise_for_status()
-        return jsonify(r.json())
-    except Exception as e:
-        return jsonify({"_error": str(e)})
+    return jsonify(sas_routes.get_routes_or_error(orig, dest, date))
 
 
 @app.route("/api/weekend-pair-detail")
@@ -244,6 +300,7 @@ def api_flow_regions():
 
 
 @app.route("/api/flow/results")
+@conditional
 def api_flow_results():
     args = request.args
     region = args.get("region", "")
@@ -257,6 +314,8 @@ def api_flow_results():
         to_date=args.get("to", ""),
         city=args.get("city", ""),
         page=int(args.get("page", 1)),
+        after=args.get("after", ""),
+        before=args.get("before", ""),
     )
     return jsonify(data)
 
@@ -374,21 +433,12 @@ def legacy_weekend_routes():
     if not all([origin, code, outbound, inbound]):
         return jsonify({"error": "Missing params"}), 400
 
-    def fetch(orig, dest, date):
-        try:
-            r = requests.get(ROUTES_API, params={
-                "market": "se-sv", "origin": orig, "destination": dest,
-                "departureDate": date, "direct": "false",
-            }, timeout=15)
-            r.raise_for_status()
-            raw = r.json()
-            out = _normalize_routes_response(raw)
-            return out if isinstance(out, list) else out  # list or {_error: ...}
-        except Exception as e:
-            return {"_error": str(e)}
-
-    out_res = fetch(origin, code, outbound)
-    inb_res = fetch(code, origin, inbound)
+    # Both legs in parallel (cached per leg, see sas_routes.py)
+    out_raw, inb_raw = sas_routes.fetch_legs([
+        (origin, code, outbound), (code, origin, inbound),
+    ])
+    out_res = _normalize_routes_response(out_raw)
+    inb_res = _normalize_routes_response(inb_raw)
 
     def to_payload(res):
         if isinstance(res, dict) and "_error" in res:
@@ -0,0 +1,137 @@
+"""
+SQLite connection management for the SAS Awards database.
+
+The database runs in WAL mode, so readers never wait for the fetcher's write
+transaction (and vice versa). Readers (web app, bot, report scripts) borrow
+read-only connections from a small per-database pool via reader(); close()
+hands the connection back instead of closing it, so existing
+`conn = get_conn(); ...; conn.close()` code reuses warm connections with their
+page cache and prepared-statement cache. The fetcher opens its own read-write
+connection with connect().
+"""
+import os
+import sqlite3
+import threading
+
+import schema
+
+# Negative cache_size is in KiB: 64 MiB page cache per connection
+CACHE_SIZE_KIB = int(os.environ.get("SAS_DB_CACHE_KIB", "65536"))
+MMAP_SIZE      = int(os.environ.get("SAS_DB_MMAP_BYTES", str(256 * 1024 * 1024)))
+BUSY_TIMEOUT_MS = 5000
+CACHED_STATEMENTS = 256   # per-connection prepared-statement cache
+POOL_SIZE      = int(os.environ.get("SAS_DB_POOL_SIZE", "8"))   # idle readers kept per database
+
+
+def _tune(conn):
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+
+
+def connect(path):
+    """Read-write connection in WAL mode (for the fetcher and other writers)."""
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=CACHED_STATEMENTS)
+    conn.execute("PRAGMA journal_mode = WAL")
+    # WAL is durable on commit with NORMAL; FULL only adds an fsync per commit
+    conn.execute("PRAGMA synchronous = NORMAL")
+    _tune(conn)
+    return conn
+
+
+class PooledConnection(sqlite3.Connection):
+    """Read-only connection whose close() returns it to its pool."""
+
+    pool = None
+
+    def close(self):
+        if self.pool is None:
+            return super().close()
+        self.set_trace_callback(None)
+        if self.in_transaction:
+            self.rollback()
+        self.pool.release(self)
+
+    def discard(self):
+        super().close()
+
+
+class ReaderPool:
+    """Idle read-only connections to one database file, shared by all threads."""
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def _open(self):
+        uri = f"file:{os.path.abspath(self.path)}?mode=ro"
+        conn = sqlite3.connect(
+            uri, uri=True, factory=PooledConnection, check_same_thread=False,
+            timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=CACHED_STATEMENTS,
+        )
+        _tune(conn)
+        conn.execute("PRAGMA query_only = ON")
+        conn.pool = self
+        self.opened += 1
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._open()
+
+    def release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.discard()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.discard()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _prepare(path):
+    """Create/migrate the database and switch it to WAL before any read-only open."""
+    conn = connect(path)
+    try:
+        schema.migrate(conn)
+    finally:
+        conn.close()
+
+
+def pool(path):
+    """The ReaderPool for a database path (migrating the file on first use)."""
+    path = os.path.expanduser(path)
+    with _pools_lock:
+        p = _pools.get(path)
+        if p is None:
+            _prepare(path)
+            p = _pools[path] = ReaderPool(path)
+        return p
+
+
+def reader(path):
+    """Borrow a read-only connection; conn.close() gives it back."""
+    return pool(path).acquire()
+
+
+def close_all():
+    """Close every idle pooled connection (e.g. before deleting or replacing a DB file)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for p in pools:
+        p.close_all()
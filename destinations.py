@@ -0,0 +1,157 @@
+"""
+Destination name index for city search (dashboard, reports and bot).
+
+The SAS API names cities in Swedish ("Aten", "Köpenhamn"), users type English,
+Swedish, airport codes or just a prefix. DestinationIndex maps all of those to
+airport codes in memory, so the SQL side becomes `airport_code IN (...)` on an
+index instead of `LIKE '%x%'` scans. The index is rebuilt from `flights` once
+per data version (i.e. once per fetch) and cached per database.
+"""
+import bisect
+import difflib
+import threading
+import unicodedata
+
+import db
+import schema
+
+# English / alternative spellings per airport code (city names from the API are Swedish)
+ALIASES = {
+    "ATH": ["Athens", "Athina"],
+    "AMS": ["Amsterdam"],
+    "BCN": ["Barcelona"],
+    "BER": ["Berlin"],
+    "BGO": ["Bergen"],
+    "BKK": ["Bangkok"],
+    "BOS": ["Boston"],
+    "BRU": ["Brussels", "Bryssel", "Bruxelles"],
+    "BUD": ["Budapest"],
+    "CPH": ["Copenhagen", "Köpenhamn", "København"],
+    "DEL": ["Delhi", "New Delhi"],
+    "DUB": ["Dublin"],
+    "DXB": ["Dubai"],
+    "EWR": ["New York", "Newark"],
+    "JFK": ["New York"],
+    "FCO": ["Rome", "Rom", "Roma"],
+    "GOT": ["Gothenburg", "Göteborg"],
+    "GVA": ["Geneva", "Genève", "Genf"],
+    "HEL": ["Helsinki", "Helsingfors"],
+    "ICN": ["Seoul"],
+    "IAD": ["Washington"],
+    "KEF": ["Reykjavik", "Reykjavík"],
+    "LHR": ["London"],
+    "LIS": ["Lisbon", "Lissabon", "Lisboa"],
+    "LAX": ["Los Angeles"],
+    "MIA": ["Miami"],
+    "MUC": ["Munich", "München"],
+    "NCE": ["Nice", "Nizza"],
+    "NRT": ["Tokyo"],
+    "HND": ["Tokyo"],
+    "ORD": ["Chicago"],
+    "OSL": ["Oslo"],
+    "PRG": ["Prague", "Prag", "Praha"],
+    "SFO": ["San Francisco"],
+    "TLV": ["Tel Aviv"],
+    "TRD": ["Trondheim"],
+    "VIE": ["Vienna", "Wien"],
+    "WAW": ["Warsaw", "Warszawa"],
+    "YYZ": ["Toronto"],
+    "ZRH": ["Zurich", "Zürich"],
+}
+
+FUZZY_CUTOFF = 0.75
+
+# Letters NFKD does not decompose
+_FOLD = str.maketrans({"ø": "o", "æ": "ae", "ß": "ss", "ł": "l", "đ": "d", "þ": "th"})
+
+
+def normalize(name):
+    """Lower-case, accent-free, single-spaced form used for all lookups."""
+    s = unicodedata.normalize("NFKD", name.strip().lower()).translate(_FOLD)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return " ".join(s.replace("-", " ").split())
+
+
+class DestinationIndex:
+    """Sorted (normalized name, airport code) pairs with prefix, substring and fuzzy lookup."""
+
+    def __init__(self, destinations, aliases=ALIASES):
+        """destinations: iterable of (airport_code, city_name)."""
+        pairs = set()
+        codes = set()
+        for code, city in destinations:
+            codes.add(code)
+            pairs.add((normalize(city), code))
+        for code, names in aliases.items():
+            if code in codes:
+                pairs.update((normalize(n), code) for n in names)
+        self.codes = codes
+        self.entries = sorted(pairs)
+        self.names = [n for n, _ in self.entries]
+        self._by_name = {}
+        for n, code in self.entries:
+            self._by_name.setdefault(n, []).append(code)
+
+    @classmethod
+    def load(cls, conn):
+        rows = conn.execute("SELECT DISTINCT airport_code, city_name FROM flights").fetchall()
+        return cls(rows)
+
+    def _prefix(self, q):
+        i = bisect.bisect_left(self.names, q)
+        out = []
+        while i < len(self.names) and self.names[i].startswith(q):
+            out.append(self.entries[i][1])
+            i += 1
+        return out
+
+    def resolve(self, query):
+        """
+        Airport codes for a search string, from the best-matching tier:
+        airport code or exact name → name prefix → substring → part of an
+        airport code (the old LIKE also matched codes) → fuzzy (typos).
+        """
+        q = normalize(query)
+        if not q:
+            return []
+        as_code = query.strip().upper()
+        if as_code in self.codes:
+            return [as_code]
+        for tier in (
+            lambda: self._by_name.get(q, []),
+            lambda: self._prefix(q),
+            lambda: [code for n, code in self.entries if q in n],
+            lambda: [c for c in self.codes if as_code in c],
+            lambda: [c for n in difflib.get_close_matches(q, self._by_name, n=5, cutoff=FUZZY_CUTOFF)
+                     for c in self._by_name[n]],
+        ):
+            codes = tier()
+            if codes:
+                return sorted(set(codes))
+        return []
+
+
+_indexes = {}   # db path -> (data version, DestinationIndex)
+_lock = threading.Lock()
+
+
+def index_for(path):
+    """DestinationIndex for a database, rebuilt after each refresh (data_version bump)."""
+    conn = db.reader(path)
+    try:
+        stamp = schema.data_version(conn)[0]
+        with _lock:
+            hit = _indexes.get(path)
+            if hit and hit[0] == stamp:
+                return hit[1]
+        index = DestinationIndex.load(conn)
+    finally:
+        conn.close()
+    with _lock:
+        _indexes[path] = (stamp, index)
+    return index
+
+
+def resolve(path, query):
+    """Airport codes matching `query` in the database at `path`."""
+    return index_for(path).resolve(query)
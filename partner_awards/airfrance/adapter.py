@@ -375,6 +375,15 @@ def init_db(conn: sqlite3.Connection) -> None:
         if "duplicate column name" not in str(e4).lower():
             raise
 
+    # Migration: job_tasks leases (several jobs_worker processes share a job)
+    for col in ("claimed_by", "lease_expires_at", "heartbeat_at"):
+        try:
+            conn.execute(f"ALTER TABLE partner_award_job_tasks ADD COLUMN {col} TEXT")
+            conn.commit()
+        except sqlite3.OperationalError as e5:
+            if "duplicate column name" not in str(e5).lower():
+                raise
+
 
 def create_scan_run(
     conn: sqlite3.Connection,
@@ -294,144 +294,155 @@ def ingest_lowest_fares_file(
     return True, count, scan_run_id
 
 
-def main() -> int:
-    parser = argparse.ArgumentParser(description="Import remote runner JSON outputs into partner_awards DB")
-    parser.add_argument("--path", required=True, help="Path to outputs/AF/PAR-JNB/2026-02-27 or parent")
-    args = parser.parse_args()
-
-    path = Path(args.path).resolve()
-    if not path.exists():
-        print(f"Error: path not found: {path}")
-        return 1
-
-    Path(PARTNER_DB_DIR).mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(PARTNER_DB_PATH)
-
+def import_path(conn: sqlite3.Connection, path: Path) -> tuple[int, int, list[int]]:
+    """
+    Import a runner output folder (route/date, route/month, or any parent) or a
+    single file into conn. Returns (files, rows ingested, scan_run_ids).
+    Raises ValueError for a single file that cannot be imported.
+    Used by main() and in-process by partner_awards.jobs_worker.
+    """
     total_files = 0
     total_inserted = 0
     scan_run_ids: list[int] = []
 
-    try:
-        # If path is a directory like outputs/AF/PAR-JNB/2026-02-27 or outputs/AF/AMS-JNB/2026-03
-        if path.is_dir():
-            route_date = _parse_route_date_from_path(path)
-            route_month = _parse_route_month_from_path(path)
-            if route_date:
-                origin, destination, depart_date = route_date
-                host_used, host_attempts = _read_meta(path)
-                meta = _read_meta_full(path)
-                search = _meta_search(meta)
-                origin = search.get("origin") or (meta or {}).get("origin") or origin
-                destination = search.get("destination") or (meta or {}).get("destination") or destination
-                scan_run_id = None
-                for f in sorted(path.glob("*.json")):
-                    if f.name == ".meta.json":
+    # If path is a directory like outputs/AF/PAR-JNB/2026-02-27 or outputs/AF/AMS-JNB/2026-03
+    if path.is_dir():
+        route_date = _parse_route_date_from_path(path)
+        route_month = _parse_route_month_from_path(path)
+        if route_date:
+            origin, destination, depart_date = route_date
+            host_used, host_attempts = _read_meta(path)
+            meta = _read_meta_full(path)
+            search = _meta_search(meta)
+            origin = search.get("origin") or (meta or {}).get("origin") or origin
+            destination = search.get("destination") or (meta or {}).get("destination") or destination
+            scan_run_id = None
+            for f in sorted(path.glob("*.json")):
+                if f.name == ".meta.json":
+                    continue
+                if f.name.startswith("lowest_fares_") or _is_lowest_fares_from_file(f):
+                    ok, count, sid = ingest_lowest_fares_file(conn, f, path, origin, destination, host_used, host_attempts, scan_run_id)
+                    if ok:
+                        if scan_run_id is None:
+                            scan_run_id = sid
+                        conn.commit()
+                        total_files += 1
+                        total_inserted += count
+                        if sid:
+                            scan_run_ids.append(sid)
+                        print(f"  {f.name}: {count} calendar fares (scan_run_id={sid})")
+                    continue
+                cabin = _parse_cabin_from_filename(f.name)
+                ok, count, sid = ingest_file(conn, f, origin, destination, depart_date, cabin, host_used, host_attempts)
+                if ok:
+                    conn.commit()
+                    total_files += 1
+                    total_inserted += count
+                    if sid:
+                        scan_run_ids.append(sid)
+                    print(f"  {f.name}: {count} offers (scan_run_id={sid})")
+                else:
+                    print(f"  {f.name}: skipped (not AvailableOffers format)")
+        elif route_month:
+            origin, destination, month_str = route_month
+            host_used, host_attempts = _read_meta(path)
+            meta = _read_meta_full(path)
+            search = _meta_search(meta)
+            origin = search.get("origin") or (meta or {}).get("origin") or origin
+            destination = search.get("destination") or (meta or {}).get("destination") or destination
+            scan_run_id = None
+            for f in sorted(path.glob("*.json")):
+                if f.name == ".meta.json":
+                    continue
+                if f.name.startswith("lowest_fares_") or _is_lowest_fares_from_file(f):
+                    ok, count, sid = ingest_lowest_fares_file(conn, f, path, origin, destination, host_used, host_attempts, scan_run_id)
+                    if ok:
+                        if scan_run_id is None:
+                            scan_run_id = sid
+                        conn.commit()
+                        total_files += 1
+                        total_inserted += count
+                        if sid:
+                            scan_run_ids.append(sid)
+                        print(f"  {f.name}: {count} calendar fares (scan_run_id={sid})")
+            # Month folders typically have no available_offers
+        else:
+            # Recurse: path might be outputs/ or outputs/AF/
+            for sub in sorted(path.rglob("*.json")):
+                parent = sub.parent
+                route_date = _parse_route_date_from_path(parent)
+                route_month = _parse_route_month_from_path(parent)
+                meta = _read_meta_full(parent)
+                has_meta = (parent / ".meta.json").exists()
+                if route_date or route_month or has_meta:
+                    search = _meta_search(meta)
+                    route = route_date or route_month
+                    o, d = (route or ("", "", ""))[0], (route or ("", "", ""))[1]
+                    dd = (route_date or ("", "", ""))[2] if route_date else ""
+                    origin = search.get("origin") or (meta or {}).get("origin") or o
+                    destination = search.get("destination") or (meta or {}).get("destination") or d
+                    depart_date = dd or search.get("start_date") or ((search.get("end_date") or "")[:10] if search.get("end_date") else "")
+                    if not origin or not destination:
                         continue
-                    if f.name.startswith("lowest_fares_") or _is_lowest_fares_from_file(f):
-                        ok, count, sid = ingest_lowest_fares_file(conn, f, path, origin, destination, host_used, host_attempts, scan_run_id)
+                    if sub.name.startswith("lowest_fares_") or _is_lowest_fares_from_file(sub):
+                        ok, count, sid = ingest_lowest_fares_file(conn, sub, parent, origin, destination, *_read_meta(parent))
                         if ok:
-                            if scan_run_id is None:
-                                scan_run_id = sid
                             conn.commit()
                             total_files += 1
                             total_inserted += count
                             if sid:
                                 scan_run_ids.append(sid)
-                            print(f"  {f.name}: {count} calendar fares (scan_run_id={sid})")
+                            print(f"  {sub.relative_to(path)}: {count} calendar fares (scan_run_id={sid})")
                         continue
-                    cabin = _parse_cabin_from_filename(f.name)
-                    ok, count, sid = ingest_file(conn, f, origin, destination, depart_date, cabin, host_used, host_attempts)
+                    cabin = _parse_cabin_from_filename(sub.name)
+                    host_used, host_attempts = _read_meta(parent)
+                    ok, count, sid = ingest_file(conn, sub, origin, destination, depart_date, cabin, host_used, host_attempts)
                     if ok:
                         conn.commit()
                         total_files += 1
                         total_inserted += count
                         if sid:
                             scan_run_ids.append(sid)
-                        print(f"  {f.name}: {count} offers (scan_run_id={sid})")
-                    else:
-                        print(f"  {f.name}: skipped (not AvailableOffers format)")
-            elif route_month:
-                origin, destination, month_str = route_month
-                host_used, host_attempts = _read_meta(path)
-                meta = _read_meta_full(path)
-                search = _meta_search(meta)
-                origin = search.get("origin") or (meta or {}).get("origin") or origin
-                destination = search.get("destination") or (meta or {}).get("destination") or destination
-                scan_run_id = None
-                for f in sorted(path.glob("*.json")):
-                    if f.name == ".meta.json":
-                        continue
-                    if f.name.startswith("lowest_fares_") or _is_lowest_fares_from_file(f):
-                        ok, count, sid = ingest_lowest_fares_file(conn, f, path, origin, destination, host_used, host_attempts, scan_run_id)
-                        if ok:
-                            if scan_run_id is None:
-                                scan_run_id = sid
-                            conn.commit()
-                            total_files += 1
-                            total_inserted += count
-                            if sid:
-                                scan_run_ids.append(sid)
-                            print(f"  {f.name}: {count} calendar fares (scan_run_id={sid})")
-                # Month folders typically have no available_offers
-            else:
-                # Recurse: path might be outputs/ or outputs/AF/
-                for sub in sorted(path.rglob("*.json")):
-                    parent = sub.parent
-                    route_date = _parse_route_date_from_path(parent)
-                    route_month = _parse_route_month_from_path(parent)
-                    meta = _read_meta_full(parent)
-                    has_meta = (parent / ".meta.json").exists()
-                    if route_date or route_month or has_meta:
-                        search = _meta_search(meta)
-                        route = route_date or route_month
-                        o, d = (route or ("", "", ""))[0], (route or ("", "", ""))[1]
-                        dd = (route_date or ("", "", ""))[2] if route_date else ""
-                        origin = search.get("origin") or (meta or {}).get("origin") or o
-                        destination = search.get("destination") or (meta or {}).get("destination") or d
-                        depart_date = dd or search.get("start_date") or ((search.get("end_date") or "")[:10] if search.get("end_date") else "")
-                        if not origin or not destination:
-                            continue
-                        if sub.name.startswith("lowest_fares_") or _is_lowest_fares_from_file(sub):
-                            ok, count, sid = ingest_lowest_fares_file(conn, sub, parent, origin, destination, *_read_meta(parent))
-                            if ok:
-                                conn.commit()
-                                total_files += 1
-                                total_inserted += count
-                                if sid:
-                                    scan_run_ids.append(sid)
-                                print(f"  {sub.relative_to(path)}: {count} calendar fares (scan_run_id={sid})")
-                            continue
-                        cabin = _parse_cabin_from_filename(sub.name)
-                        host_used, host_attempts = _read_meta(parent)
-                        ok, count, sid = ingest_file(conn, sub, origin, destination, depart_date, cabin, host_used, host_attempts)
-                        if ok:
-                            conn.commit()
-                            total_files += 1
-                            total_inserted += count
-                            if sid:
-                                scan_run_ids.append(sid)
-                            print(f"  {sub.relative_to(path)}: {count} offers (scan_run_id={sid})")
+                        print(f"  {sub.relative_to(path)}: {count} offers (scan_run_id={sid})")
+    else:
+        # Single file: try to derive from parent path
+        parent = path.parent
+        route_date = _parse_route_date_from_path(parent)
+        if not route_date:
+            raise ValueError("cannot derive origin/destination/date from path. Use outputs/AF/PAR-JNB/2026-02-27/")
+        origin, destination, depart_date = route_date
+        cabin = _parse_cabin_from_filename(path.name)
+        host_used, host_attempts = _read_meta(parent)
+        ok, count, sid = ingest_file(conn, path, origin, destination, depart_date, cabin, host_used, host_attempts)
+        if ok:
+            conn.commit()
+            total_files = 1
+            total_inserted = count
+            if sid:
+                scan_run_ids.append(sid)
+            print(f"  {path.name}: {count} offers (scan_run_id={sid})")
         else:
-            # Single file: try to derive from parent path
-            parent = path.parent
-            route_date = _parse_route_date_from_path(parent)
-            if not route_date:
-                print("Error: cannot derive origin/destination/date from path. Use outputs/AF/PAR-JNB/2026-02-27/")
-                return 1
-            origin, destination, depart_date = route_date
-            cabin = _parse_cabin_from_filename(path.name)
-            host_used, host_attempts = _read_meta(parent)
-            ok, count, sid = ingest_file(conn, path, origin, destination, depart_date, cabin, host_used, host_attempts)
-            if ok:
-                conn.commit()
-                total_files = 1
-                total_inserted = count
-                if sid:
-                    scan_run_ids.append(sid)
-                print(f"  {path.name}: {count} offers (scan_run_id={sid})")
-            else:
-                print("Error: file is not SearchResultAvailableOffersQuery format")
-                return 1
+            raise ValueError("file is not SearchResultAvailableOffersQuery format")
+    return total_files, total_inserted, scan_run_ids
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Import remote runner JSON outputs into partner_awards DB")
+    parser.add_argument("--path", required=True, help="Path to outputs/AF/PAR-JNB/2026-02-27 or parent")
+    args = parser.parse_args()
+
+    path = Path(args.path).resolve()
+    if not path.exists():
+        print(f"Error: path not found: {path}")
+        return 1
+
+    Path(PARTNER_DB_DIR).mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(PARTNER_DB_PATH)
+    try:
+        total_files, total_inserted, scan_run_ids = import_path(conn, path)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
     finally:
         conn.close()
 
@@ -159,7 +159,10 @@ CREATE TABLE IF NOT EXISTS partner_award_job_tasks (
   finished_at TEXT,
   attempts INTEGER DEFAULT 0,
   last_error TEXT,
-  output_folder TEXT
+  output_folder TEXT,
+  claimed_by TEXT,        -- worker id holding the lease (jobs_worker)
+  lease_expires_at TEXT,  -- running task may be reclaimed after this
+  heartbeat_at TEXT
 );
 
 CREATE INDEX IF NOT EXISTS idx_partner_award_job_tasks_job_id
@@ -8,18 +8,54 @@ from __future__ import annotations
 
 import json
 import os
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of this process are serialized
+    fcntl = None
 
 STATE_DIR = Path(os.path.expanduser(os.environ.get("SAS_DB_PATH", "~/sas_awards")))
 STATE_PATH = STATE_DIR / "partner_awards_state.json"
 
+_lock = threading.Lock()
+
 
 def _ensure_dir() -> None:
     STATE_DIR.mkdir(parents=True, exist_ok=True)
 
 
+@contextmanager
+def _locked():
+    """Exclusive lock for a read-modify-write of the state file (threads and processes)."""
+    _ensure_dir()
+    with _lock, open(STATE_PATH.with_name(STATE_PATH.name + ".lock"), "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def _update(change: Callable[[dict[str, Any]], None]) -> None:
+    """Apply change(state) under the lock and replace the file atomically, so readers never see half of it."""
+    with _locked():
+        data = read_state()
+        change(data)
+        data["updated_at"] = datetime.utcnow().isoformat() + "Z"
+        fd, tmp = tempfile.mkstemp(dir=STATE_DIR, prefix=STATE_PATH.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, STATE_PATH)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
 def read_state() -> dict[str, Any]:
     """Read state file. Returns dict with afkl_blocked_until, last_block_reason, etc."""
     if not STATE_PATH.exists():
@@ -33,12 +69,7 @@ def read_state() -> dict[str, Any]:
 
 def write_state(**kwargs: Any) -> None:
     """Update state file with given fields."""
-    _ensure_dir()
-    data = read_state()
-    data.update(kwargs)
-    data["updated_at"] = datetime.utcnow().isoformat() + "Z"
-    with open(STATE_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    _update(lambda data: data.update(kwargs))
 
 
 def is_blocked() -> tuple[bool, Optional[str]]:
@@ -67,24 +98,48 @@ def is_blocked() -> tuple[bool, Optional[str]]:
 def set_blocked(minutes: int = 30, reason: str = "", host: str = "") -> None:
     """Record block: afkl_blocked_until = now + minutes. Increases cooldown after consecutive blocks."""
     from datetime import timezone, timedelta
-    state = read_state()
-    consecutive = int(state.get("afkl_consecutive_blocked", 0)) + 1
-    mins = 60 if consecutive >= 2 else minutes
-    until = datetime.now(timezone.utc) + timedelta(minutes=mins)
-    write_state(
-        afkl_blocked_until=until.isoformat(),
-        afkl_consecutive_blocked=consecutive,
-        last_block_reason=reason,
-        last_block_host=host,
-    )
+
+    def block(state: dict[str, Any]) -> None:
+        consecutive = int(state.get("afkl_consecutive_blocked", 0)) + 1
+        mins = 60 if consecutive >= 2 else minutes
+        until = datetime.now(timezone.utc) + timedelta(minutes=mins)
+        state.update(
+            afkl_blocked_until=until.isoformat(),
+            afkl_consecutive_blocked=consecutive,
+            last_block_reason=reason,
+            last_block_host=host,
+        )
+
+    _update(block)
 
 
 def clear_blocked() -> None:
     """Clear block so scans can resume. Removes afkl_blocked_until and resets consecutive count."""
-    state = read_state()
-    state.pop("afkl_blocked_until", None)
-    state["afkl_consecutive_blocked"] = 0
-    state["updated_at"] = datetime.utcnow().isoformat() + "Z"
-    _ensure_dir()
-    with open(STATE_PATH, "w", encoding="utf-8") as f:
-        json.dump(state, f, indent=2)
+
+    def clear(state: dict[str, Any]) -> None:
+        state.pop("afkl_blocked_until", None)
+        state["afkl_consecutive_blocked"] = 0
+
+    _update(clear)
+
+
+def get_pacing(host: str) -> Optional[float]:
+    """Last learned inter-request delay (seconds) for host, or None if never recorded."""
+    entry = (read_state().get("pacing") or {}).get(host)
+    try:
+        return float(entry["delay_sec"]) if entry else None
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def set_pacing(host: str, delay_sec: float) -> None:
+    """Persist the adaptive pacer's current delay for host under state['pacing']."""
+
+    def pace(state: dict[str, Any]) -> None:
+        state["pacing"] = dict(state.get("pacing") or {})
+        state["pacing"][host] = {
+            "delay_sec": round(delay_sec, 3),
+            "updated_at": datetime.utcnow().isoformat() + "Z",
+        }
+
+    _update(pace)
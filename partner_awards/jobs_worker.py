@@ -4,16 +4,28 @@ Background job worker for Flying Blue batch scans.
 Run: python -m partner_awards.jobs_worker
 
 Polls for queued jobs, executes open-dates-month tasks via remote runner, imports results.
+Tasks run in-process by default, spread over every configured host
+(HostPoolExecutor: one warmed browser client per host, shared task queue).
+PARTNER_AWARDS_EXECUTOR=inprocess uses a single host (ScanExecutor) and
+=subprocess the old runner.py-per-task mode.
+
+Several workers can run at once: tasks are leased (claimed_by /
+lease_expires_at, extended by a heartbeat) and a crashed worker's tasks are
+picked up by the others once its lease expires.
 """
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
+import socket
 import sqlite3
 import subprocess
 import sys
+import threading
 import time
+import uuid
 from datetime import datetime
 from pathlib import Path
 
@@ -24,11 +36,31 @@ OUTPUT_AF = RUNNER_DIR / "outputs" / "AF"
 
 PARTNER_DB_DIR = os.path.expanduser(os.environ.get("SAS_DB_PATH", "~/sas_awards"))
 DB_PATH = os.environ.get("PARTNER_AWARDS_DB_PATH") or os.path.join(PARTNER_DB_DIR, "partner_awards.sqlite")
+EXECUTOR = os.environ.get("PARTNER_AWARDS_EXECUTOR", "pool")  # pool | inprocess | subprocess
+# host:pid alone repeats when a container restarts; the nonce keeps a new process from
+# taking over (and renewing) leases its predecessor died holding
+WORKER_ID = (os.environ.get("PARTNER_AWARDS_WORKER_ID")
+             or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}")
+LEASE_SEC = int(os.environ.get("PARTNER_AWARDS_LEASE_SEC", "600"))
+# The heartbeat stops renewing a task held this long, so a hung task's lease runs out
+TASK_MAX_SEC = int(os.environ.get("PARTNER_AWARDS_TASK_MAX_SEC", "1800"))
+
+# Leases a task may run out before it is failed instead of handed out again
+# (a task that crashes or hangs every worker that takes it)
+MAX_ATTEMPTS = int(os.environ.get("PARTNER_AWARDS_MAX_ATTEMPTS", "3"))
+
+# Leased, but the worker crashed or the task hung past TASK_MAX_SEC
+_LEASE_EXPIRED = "status='running' AND (lease_expires_at IS NULL OR lease_expires_at < datetime('now'))"
+# A task another worker may take: never claimed, or its lease ran out with attempts to
+# spare (one parameter: MAX_ATTEMPTS)
+_CLAIMABLE = f"status='queued' OR ({_LEASE_EXPIRED} AND attempts < ?)"
 
 
 def get_conn():
     Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
-    return sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")  # several workers and the app write concurrently
+    return conn
 
 
 def _log(msg: str):
@@ -157,135 +189,557 @@ def run_import(path: str) -> tuple[bool, str]:
         return False, str(e)[:500]
 
 
-def process_job(conn: sqlite3.Connection, job: tuple) -> None:
-    job_id, program, job_type = job[0], job[1], job[2]
-    params = job[3] if len(job) > 3 else {}
-    force_refresh = params.get("force_refresh", False)
-    _log(f"Processing job {job_id} type={job_type} force_refresh={force_refresh}")
+def _run_tasks_in_order(executor, tasks, start, finish) -> None:
+    """Default run_tasks: one task at a time. start(task) -> False means skip; finish(task, result)."""
+    for task in tasks:
+        if start(task):
+            finish(task, executor.run_task(*task[1:]))
 
-    conn.execute(
-        "UPDATE partner_award_jobs SET status='running', started_at=datetime('now') WHERE id=?",
+
+class SubprocessExecutor:
+    """One runner.py and one import_folder subprocess per task (warmup and browser launch every time)."""
+
+    batch_size = 1  # tasks leased per claim
+
+    def run_task(self, origin: str, destination: str, month: str, cabin: str) -> tuple[bool, str, str | None]:
+        return run_task(origin, destination, month, cabin)
+
+    def run_import(self, conn: sqlite3.Connection, path: str) -> tuple[bool, str]:
+        return run_import(path)
+
+    def run_tasks(self, tasks, start, finish) -> None:
+        _run_tasks_in_order(self, tasks, start, finish)
+
+    def close(self) -> None:
+        pass
+
+
+class ScanExecutor:
+    """
+    Runs open-dates-month tasks inside the worker process. Keeps one event loop
+    and one warmed AirFrancePlaywrightClient alive across tasks, calls the
+    runner's async implementation directly and imports results through the
+    worker's own DB connection, so a task costs its API round-trips only.
+    The client is dropped (and the next task warms up again) after an error or
+    a task that wrote nothing, which is how a block usually shows.
+    """
+
+    batch_size = 1  # tasks leased per claim
+
+    def __init__(self, cfg: dict | None = None):
+        if str(RUNNER_DIR) not in sys.path:
+            sys.path.insert(0, str(RUNNER_DIR))
+        import runner
+
+        self.runner = runner
+        self.cfg = cfg or runner._load_config()
+        out = Path(self.cfg["output_dir"])
+        self.output_base = out if out.is_absolute() else RUNNER_DIR / out
+        self.output_base.mkdir(parents=True, exist_ok=True)
+        self.log_path = self.output_base / f"run_{datetime.now().strftime('%Y%m%d')}.log"
+        self._loop = asyncio.new_event_loop()
+        self._session: tuple | None = None  # (client, host_used, host_attempts)
+        self.warmups = 0
+
+    def _warm(self) -> tuple | None:
+        if self._session is None:
+            self.warmups += 1
+            self._session = self._loop.run_until_complete(self.runner._try_hosts_warmup(self.cfg, self.log_path))
+        return self._session
+
+    def _drop_session(self) -> None:
+        if self._session is not None:
+            client = self._session[0]
+            self._session = None
+            try:
+                self._loop.run_until_complete(client.close())
+            except Exception:
+                pass
+
+    def run_task(self, origin: str, destination: str, month: str, cabin: str) -> tuple[bool, str, str | None]:
+        """Same contract as run_task(): (ok, message, output_folder)."""
+        from partner_awards.airfrance.state import clear_blocked, is_blocked
+
+        blocked, until = is_blocked()
+        if blocked:
+            return False, f"Fetching paused until {until} due to blocking", None
+        try:
+            session = self._warm()
+            if session is None:
+                return False, "Warmup failed on all hosts", None
+            n = self._loop.run_until_complete(
+                self.runner._open_dates_month_impl(
+                    self.cfg, self.output_base, origin, destination, month, [cabin],
+                    False, self.log_path, warmed=session,
+                )
+            )
+        except Exception as e:
+            self._drop_session()
+            return False, str(e)[:500], None
+        if n > 0:
+            clear_blocked()
+        else:
+            self._drop_session()
+        return True, "", str(self.output_base / "AF" / f"{origin}-{destination}" / month)
+
+    def run_import(self, conn: sqlite3.Connection, path: str) -> tuple[bool, str]:
+        """Import an output folder into conn (no subprocess)."""
+        from partner_awards.airfrance.import_folder import import_path
+
+        try:
+            import_path(conn, Path(path))
+            return True, ""
+        except Exception as e:
+            conn.rollback()  # drop the failed file's partial writes before the caller commits
+            return False, str(e)[:500]
+
+    def run_tasks(self, tasks, start, finish) -> None:
+        _run_tasks_in_order(self, tasks, start, finish)
+
+    def close(self) -> None:
+        self._drop_session()
+        self._loop.close()
+
+
+class _Host:
+    """One host in the pool: its warmed session and circuit breaker state."""
+
+    def __init__(self, host: dict):
+        self.host = host
+        self.name = host.get("name", host.get("base_url", "?"))
+        self.session: tuple | None = None  # (client, host_used, host_attempts)
+        self.failures = 0                  # consecutive
+        self.open_until = 0.0              # time.monotonic() until which the breaker is open
+        self.tasks = 0
+
+    def is_open(self) -> bool:
+        return time.monotonic() < self.open_until
+
+
+class HostPoolExecutor(ScanExecutor):
+    """
+    In-process executor that scans through every host in hosts_to_try at
+    once. Each host keeps its own warmed client (and so its own adaptive
+    pacer) and pulls tasks from the job's shared queue, so a batch finishes
+    roughly len(hosts) times faster than through one host.
+
+    Each host has a circuit breaker: host_breaker_failures consecutive
+    failures (warmup failure, error, or an empty result) close its client and
+    take it out of rotation for host_breaker_cooldown_sec; after that it warms
+    up again. The task that trips a host's breaker is handed to another host
+    once. When every host is open the runner cooldown is set and the
+    remaining tasks fail like any blocked scan.
+    """
+
+    def __init__(self, cfg: dict | None = None):
+        super().__init__(cfg)
+        self.hosts = [_Host(h) for h in self.cfg.get("hosts_to_try") or self.runner.DEFAULT_HOSTS]
+        self.batch_size = len(self.hosts)  # one leased task per host at a time
+        self.breaker_failures = max(1, int(self.cfg.get("host_breaker_failures", 2)))
+        self.breaker_cooldown = float(self.cfg.get("host_breaker_cooldown_sec", 900))
+
+    async def _close_host(self, host: _Host) -> None:
+        if host.session is not None:
+            client = host.session[0]
+            host.session = None
+            try:
+                await client.close()
+            except Exception:
+                pass
+
+    async def _failed(self, host: _Host, reason: str) -> None:
+        host.failures += 1
+        await self._close_host(host)
+        if host.failures >= self.breaker_failures:
+            host.open_until = time.monotonic() + self.breaker_cooldown
+            _log(f"  Host {host.name} open for {self.breaker_cooldown:.0f}s after {host.failures} failures ({reason})")
+
+    async def _run_on(self, host: _Host, task: tuple) -> tuple[bool, str, str | None]:
+        _, origin, destination, month, cabin = task
+        if host.session is None:
+            self.warmups += 1
+            client, attempt = await self.runner._warm_host(self.cfg, host.host, self.log_path)
+            if client is None:
+                await self._failed(host, "warmup failed")
+                return False, f"Warmup failed on {host.name}", None
+            host.session = (client, host.name, [attempt])
+        try:
+            n = await self.runner._open_dates_month_impl(
+                self.cfg, self.output_base, origin, destination, month, [cabin],
+                False, self.log_path, warmed=host.session,
+            )
+        except Exception as e:
+            await self._failed(host, str(e)[:100])
+            return False, str(e)[:500], None
+        host.tasks += 1
+        if n > 0:
+            host.failures = 0
+        else:
+            await self._failed(host, "no data")
+        return True, "", str(self.output_base / "AF" / f"{origin}-{destination}" / month)
+
+    async def _drain(self, tasks, start, finish) -> list:
+        """Run tasks on all hosts; returns [(task, started)] left over when every host is open."""
+        from collections import deque
+
+        queue = deque(tasks)
+        tried: dict[int, set] = {}
+
+        async def worker(host: _Host) -> None:
+            while queue and not host.is_open():
+                task = queue.popleft()
+                retry = task[0] in tried
+                if not retry and not start(task):
+                    continue
+                tried.setdefault(task[0], set()).add(host.name)
+                result = await self._run_on(host, task)
+                # This task tripped the breaker (error or empty result): give it to a fresh host
+                if host.is_open() and any(
+                    not h.is_open() and h.name not in tried[task[0]] for h in self.hosts
+                ):
+                    _log(f"  Task {task[1]}→{task[2]} {task[3]} {task[4]}: retrying on another host")
+                    queue.appendleft(task)
+                    continue
+                finish(task, result)
+
+        # Workers stop when their host trips; go again if one came back while work is left
+        while queue and not all(h.is_open() for h in self.hosts):
+            await asyncio.gather(*(worker(h) for h in self.hosts))
+        return [(task, task[0] in tried) for task in queue]
+
+    def run_tasks(self, tasks, start, finish) -> None:
+        from partner_awards.airfrance.state import clear_blocked, is_blocked, set_blocked
+
+        blocked, until = is_blocked()
+        if blocked:
+            left = [(task, False) for task in tasks]
+            reason = f"Fetching paused until {until} due to blocking"
+        else:
+            left = self._loop.run_until_complete(self._drain(tasks, start, finish))
+            reason = "All hosts unavailable (circuit open)"
+            if left:
+                set_blocked(minutes=max(1, round(self.breaker_cooldown / 60)), reason="all hosts open", host="")
+            elif any(h.tasks and not h.failures for h in self.hosts):
+                clear_blocked()
+        for task, started in left:
+            if started or start(task):
+                finish(task, (False, reason, None))
+
+    def run_task(self, origin: str, destination: str, month: str, cabin: str) -> tuple[bool, str, str | None]:
+        results = []
+        self.run_tasks([(0, origin, destination, month, cabin)], lambda task: True,
+                       lambda task, result: results.append(result))
+        return results[0]
+
+    def close(self) -> None:
+        for host in self.hosts:
+            self._loop.run_until_complete(self._close_host(host))
+        super().close()
+
+
+def make_executor():
+    if EXECUTOR == "subprocess":
+        return SubprocessExecutor()
+    return ScanExecutor() if EXECUTOR == "inprocess" else HostPoolExecutor()
+
+
+def claim_job(conn: sqlite3.Connection, job_id: int, params: dict | None = None) -> bool:
+    """
+    Move a queued job to running and expand its tasks in one write transaction,
+    so other workers only see the job as running once its tasks exist.
+    False if another worker got there first.
+    """
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    cur = conn.execute(
+        "UPDATE partner_award_jobs SET status='running', started_at=datetime('now') WHERE id=? AND status='queued'",
         (job_id,),
     )
+    if cur.rowcount != 1:
+        conn.rollback()
+        return False
+    create_open_dates_tasks(conn, job_id, params)  # commits
+    conn.execute("UPDATE partner_award_jobs SET progress_json=? WHERE id=?", (_job_progress(conn, job_id), job_id))
     conn.commit()
+    return True
 
-    total = create_open_dates_tasks(conn, job_id, params)
-    conn.execute(
-        "UPDATE partner_award_jobs SET progress_json=? WHERE id=?",
-        (json.dumps({"total_tasks": total, "done_tasks": 0, "skipped_tasks": 0, "current_task": None}), job_id),
-    )
+
+def claim_tasks(conn: sqlite3.Connection, job_id: int, worker_id: str = WORKER_ID, limit: int = 1,
+                lease_sec: int = LEASE_SEC) -> list[tuple]:
+    """
+    Atomically lease up to `limit` tasks of a running job to worker_id: queued
+    tasks first, then running tasks whose lease expired (their worker died).
+    Expired tasks already leased MAX_ATTEMPTS times are failed instead.
+    Returns [(task_id, origin, destination, month, cabin)].
+    """
     conn.commit()
+    conn.execute("BEGIN IMMEDIATE")  # take the write lock before choosing tasks
+    try:
+        conn.execute(
+            f"""UPDATE partner_award_job_tasks
+                SET status='failed', finished_at=datetime('now'), lease_expires_at=NULL,
+                    last_error='Lease expired ' || attempts || ' times'
+                WHERE job_id=? AND {_LEASE_EXPIRED} AND attempts >= ?""",
+            (job_id, MAX_ATTEMPTS),
+        )
+        rows = conn.execute(
+            f"""SELECT id, origin, destination, month, cabin FROM partner_award_job_tasks
+                WHERE job_id=? AND ({_CLAIMABLE})
+                  AND (SELECT status FROM partner_award_jobs WHERE id=?) = 'running'
+                ORDER BY status='running', id LIMIT ?""",
+            (job_id, MAX_ATTEMPTS, job_id, limit),
+        ).fetchall()
+        conn.executemany(
+            """UPDATE partner_award_job_tasks
+               SET status='running', claimed_by=?, started_at=datetime('now'), attempts=attempts+1,
+                   heartbeat_at=datetime('now'), lease_expires_at=datetime('now', ?)
+               WHERE id=?""",
+            [(worker_id, f"+{lease_sec} seconds", r[0]) for r in rows],
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return rows
+
+
+class _Heartbeat:
+    """
+    Background thread that keeps extending the leases of the tasks this worker
+    is running: only ids passed to hold() and not yet released, and each for
+    at most max_sec, so neither finished nor hung tasks stay leased.
+    """
+
+    def __init__(self, db_file: str, worker_id: str, lease_sec: int = LEASE_SEC, max_sec: int = TASK_MAX_SEC):
+        self.db_file = db_file
+        self.worker_id = worker_id
+        self.lease_sec = lease_sec
+        self.max_sec = max_sec
+        self._held: dict[int, float] = {}  # task id -> monotonic time it was leased
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+
+    def hold(self, task_ids) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._held.update((task_id, now) for task_id in task_ids)
+
+    def release(self, task_id: int) -> None:
+        with self._lock:
+            self._held.pop(task_id, None)
+
+    def _due(self) -> list[int]:
+        now = time.monotonic()
+        with self._lock:
+            return [task_id for task_id, since in self._held.items() if now - since < self.max_sec]
+
+    def _run(self) -> None:
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        try:
+            while not self._stop.wait(max(1, self.lease_sec // 3)):
+                ids = self._due()
+                if not ids:
+                    continue
+                try:
+                    conn.execute(
+                        f"""UPDATE partner_award_job_tasks
+                           SET heartbeat_at=datetime('now'), lease_expires_at=datetime('now', ?)
+                           WHERE id IN ({",".join("?" * len(ids))}) AND claimed_by=? AND status='running'""",
+                        (f"+{self.lease_sec} seconds", *ids, self.worker_id),
+                    )
+                    conn.commit()
+                except sqlite3.Error as e:
+                    _log(f"Heartbeat error: {e}")
+        finally:
+            conn.close()
 
+    def __enter__(self):
+        # In-memory DBs (tests) cannot be shared with another connection, nor with another worker
+        if self.db_file:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def _job_progress(conn: sqlite3.Connection, job_id: int, current_task: str | None = None) -> str:
+    """progress_json from the task table (shared by every worker on the job)."""
+    counts = dict(conn.execute(
+        "SELECT status, COUNT(*) FROM partner_award_job_tasks WHERE job_id=? GROUP BY status", (job_id,)
+    ).fetchall())
+    return json.dumps({
+        "total_tasks": sum(counts.values()),
+        "done_tasks": sum(counts.get(k, 0) for k in ("done", "failed", "skipped")),
+        "skipped_tasks": counts.get("skipped", 0),
+        "current_task": current_task,
+    })
+
+
+def finish_job(conn: sqlite3.Connection, job_id: int) -> str | None:
+    """
+    Mark the job done/failed once none of its tasks is queued or running.
+    Returns the new status, or None while tasks are still out (another
+    worker holding a lease will finish the job).
+    """
     cur = conn.execute(
-        "SELECT id, origin, destination, month, cabin FROM partner_award_job_tasks WHERE job_id=? AND status='queued' ORDER BY id",
+        """UPDATE partner_award_jobs
+           SET status = CASE WHEN EXISTS (SELECT 1 FROM partner_award_job_tasks t
+                                          WHERE t.job_id=partner_award_jobs.id AND t.status='failed')
+                             THEN 'failed' ELSE 'done' END,
+               finished_at = datetime('now'),
+               last_error = (SELECT t.last_error FROM partner_award_job_tasks t
+                             WHERE t.job_id=partner_award_jobs.id AND t.status='failed'
+                             ORDER BY t.finished_at DESC, t.id DESC LIMIT 1)
+           WHERE id=? AND status='running'
+             AND NOT EXISTS (SELECT 1 FROM partner_award_job_tasks t
+                             WHERE t.job_id=partner_award_jobs.id AND t.status IN ('queued', 'running'))""",
         (job_id,),
     )
-    tasks = cur.fetchall()
-    done = 0
-    failed = 0
-    skipped = 0
-    last_error = None
+    if cur.rowcount != 1:
+        conn.commit()
+        return None
+    conn.execute("UPDATE partner_award_jobs SET progress_json=? WHERE id=?", (_job_progress(conn, job_id), job_id))
+    conn.commit()
+    return conn.execute("SELECT status FROM partner_award_jobs WHERE id=?", (job_id,)).fetchone()[0]
+
 
-    for task_id, origin, dest, month, cabin in tasks:
+def abandon_tasks(conn: sqlite3.Connection, job_id: int, worker_id: str, error: str) -> str | None:
+    """
+    After this worker's error on a job: fail only the tasks it still has leased
+    and leave the job to the other workers; finish_job closes it (returned
+    status) if those were the last tasks out.
+    """
+    conn.execute(
+        "UPDATE partner_award_job_tasks SET status='failed', finished_at=datetime('now'), lease_expires_at=NULL, last_error=? WHERE job_id=? AND claimed_by=? AND status='running'",
+        (error, job_id, worker_id),
+    )
+    conn.execute(
+        "UPDATE partner_award_jobs SET progress_json=?, last_error=? WHERE id=?",
+        (_job_progress(conn, job_id), error, job_id),
+    )
+    conn.commit()
+    return finish_job(conn, job_id)
+
+
+def process_job(conn: sqlite3.Connection, job: tuple, executor=None, worker_id: str = WORKER_ID) -> None:
+    """
+    Work on a job alongside any other workers: claim it if still queued,
+    then lease tasks in small batches until none is left, and finish the
+    job if this worker ran its last task.
+    """
+    job_id, program, job_type = job[0], job[1], job[2]
+    params = job[3] if len(job) > 3 else {}
+    force_refresh = params.get("force_refresh", False)
+    executor = executor or SubprocessExecutor()
+    if claim_job(conn, job_id, params):
+        _log(f"Processing job {job_id} type={job_type} force_refresh={force_refresh}")
+    else:
+        _log(f"Joining job {job_id} type={job_type}")
+
+    def owned(sql: str, args: tuple) -> bool:
+        """Run a task update only while this worker still holds the task's lease."""
+        cur = conn.execute(sql + " AND claimed_by=? AND status='running'", args + (worker_id,))
+        if cur.rowcount != 1:
+            _log(f"  Task {args[-1]}: lease lost, result discarded")
+            return False
+        return True
+
+    def start(task) -> bool:
+        """Mark a task skipped if its route ran <24h ago (returns False); it is already leased."""
+        task_id, origin, dest, month, cabin = task
         if not force_refresh and _route_run_recently(conn, origin, dest, month, cabin, job_id):
-            conn.execute(
-                "UPDATE partner_award_job_tasks SET status='skipped', finished_at=datetime('now'), last_error='Skipped: run <24h ago' WHERE id=?",
+            owned(
+                "UPDATE partner_award_job_tasks SET status='skipped', finished_at=datetime('now'), lease_expires_at=NULL, last_error='Skipped: run <24h ago' WHERE id=?",
                 (task_id,),
             )
-            skipped += 1
-            done += 1
-            conn.execute(
-                "UPDATE partner_award_jobs SET progress_json=? WHERE id=?",
-                (
-                    json.dumps({
-                        "total_tasks": total,
-                        "done_tasks": done,
-                        "skipped_tasks": skipped,
-                        "current_task": None,
-                    }),
-                    job_id,
-                ),
-            )
+            conn.execute("UPDATE partner_award_jobs SET progress_json=? WHERE id=?", (_job_progress(conn, job_id), job_id))
             conn.commit()
             _log(f"  Task {origin}→{dest} {month} {cabin} [skipped: <24h]")
-            continue
+            return False
 
-        conn.execute(
-            "UPDATE partner_award_job_tasks SET status='running', started_at=datetime('now'), attempts=attempts+1 WHERE id=?",
-            (task_id,),
-        )
         conn.execute(
             "UPDATE partner_award_jobs SET progress_json=? WHERE id=?",
-            (
-                json.dumps({
-                    "total_tasks": total,
-                    "done_tasks": done,
-                    "skipped_tasks": skipped,
-                    "current_task": f"{origin}→{dest} {month} {cabin}",
-                }),
-                job_id,
-            ),
+            (_job_progress(conn, job_id, f"{origin}→{dest} {month} {cabin}"), job_id),
         )
         conn.commit()
-
         _log(f"  Task {origin}→{dest} {month} {cabin}")
-        ok, err_msg, out_folder = run_task(origin, dest, month, cabin)
+        return True
 
+    def finish(task, result) -> None:
+        """Import a finished task's output and record its status."""
+        task_id, origin, dest, month, cabin = task
+        ok, err_msg, out_folder = result
+        error = None
         if ok and out_folder and Path(out_folder).exists():
-            imp_ok, imp_err = run_import(out_folder)
+            imp_ok, imp_err = executor.run_import(conn, out_folder)
             if imp_ok:
                 # Import return leg if runner wrote it (ByResourceId) to dest-origin/month
                 return_folder = Path(out_folder).parent.parent / f"{dest}-{origin}" / month
                 if return_folder.exists():
-                    run_import(str(return_folder))
-                conn.execute(
-                    "UPDATE partner_award_job_tasks SET status='done', finished_at=datetime('now'), output_folder=? WHERE id=?",
+                    executor.run_import(conn, str(return_folder))
+                owned(
+                    "UPDATE partner_award_job_tasks SET status='done', finished_at=datetime('now'), lease_expires_at=NULL, output_folder=? WHERE id=?",
                     (out_folder, task_id),
                 )
             else:
-                conn.execute(
-                    "UPDATE partner_award_job_tasks SET status='failed', finished_at=datetime('now'), last_error=? WHERE id=?",
-                    (f"Import: {imp_err}", task_id),
-                )
-                failed += 1
-                last_error = imp_err
+                error = f"Import: {imp_err}"
         elif ok:
-            conn.execute(
-                "UPDATE partner_award_job_tasks SET status='done', finished_at=datetime('now'), output_folder=? WHERE id=?",
+            owned(
+                "UPDATE partner_award_job_tasks SET status='done', finished_at=datetime('now'), lease_expires_at=NULL, output_folder=? WHERE id=?",
                 (out_folder or "", task_id),
             )
         else:
-            conn.execute(
-                "UPDATE partner_award_job_tasks SET status='failed', finished_at=datetime('now'), last_error=? WHERE id=?",
-                (err_msg, task_id),
+            error = err_msg
+        if error is not None:
+            owned(
+                "UPDATE partner_award_job_tasks SET status='failed', finished_at=datetime('now'), lease_expires_at=NULL, last_error=? WHERE id=?",
+                (error, task_id),
             )
-            failed += 1
-            last_error = err_msg
-
-        done += 1
         conn.execute(
-            "UPDATE partner_award_jobs SET progress_json=?, last_error=? WHERE id=?",
-            (
-                json.dumps({"total_tasks": total, "done_tasks": done, "skipped_tasks": skipped, "current_task": None}),
-                last_error,
-                job_id,
-            ),
+            "UPDATE partner_award_jobs SET progress_json=?, last_error=COALESCE(?, last_error) WHERE id=?",
+            (_job_progress(conn, job_id), error, job_id),
         )
         conn.commit()
 
-    job_status = "failed" if failed else "done"
-    conn.execute(
-        "UPDATE partner_award_jobs SET status=?, finished_at=datetime('now'), progress_json=?, last_error=? WHERE id=?",
-        (
-            job_status,
-            json.dumps({"total_tasks": total, "done_tasks": done, "skipped_tasks": skipped, "current_task": None}),
-            last_error if failed else None,
-            job_id,
-        ),
-    )
-    conn.commit()
-    skip_info = f", {skipped} skipped" if skipped else ""
-    _log(f"Job {job_id} finished: {job_status} ({done}/{total} tasks, {failed} failed{skip_info})")
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    ran = 0
+    with _Heartbeat(db_file, worker_id) as heartbeat:
+        while True:
+            tasks = claim_tasks(conn, job_id, worker_id, limit=executor.batch_size)
+            if not tasks:
+                break
+            heartbeat.hold(task[0] for task in tasks)
+
+            def started(task) -> bool:
+                heartbeat.hold([task[0]])  # TASK_MAX_SEC counts from here
+                return start(task)
+
+            def finished(task, result) -> None:
+                finish(task, result)
+                heartbeat.release(task[0])
+
+            try:
+                executor.run_tasks(tasks, started, finished)
+            finally:
+                for task in tasks:
+                    heartbeat.release(task[0])
+            ran += len(tasks)
+
+    status = finish_job(conn, job_id)
+    progress = json.loads(_job_progress(conn, job_id))
+    failed = conn.execute(
+        "SELECT COUNT(*) FROM partner_award_job_tasks WHERE job_id=? AND status='failed'", (job_id,)
+    ).fetchone()[0]
+    skip_info = f", {progress['skipped_tasks']} skipped" if progress["skipped_tasks"] else ""
+    counts = f"{progress['done_tasks']}/{progress['total_tasks']} tasks, {failed} failed{skip_info}"
+    if status:
+        _log(f"Job {job_id} finished: {status} ({counts}; {ran} run by {worker_id})")
+    else:
+        _log(f"Job {job_id}: no tasks left to claim ({counts}); other workers are finishing theirs")
 
 
 def main():
@@ -297,13 +751,31 @@ def main():
         _log(f"ERROR: Runner dir not found: {RUNNER_DIR}")
         sys.exit(1)
 
+    executor = make_executor()
+    _log(f"Executor: {type(executor).__name__}, worker id {WORKER_ID}, lease {LEASE_SEC}s")
+    try:
+        _poll(executor, init_db)
+    finally:
+        executor.close()
+
+
+def _poll(executor, init_db) -> None:
     while True:
         try:
             conn = get_conn()
             init_db(conn)
+            # Queued jobs, and running jobs another worker started that still have queued or
+            # expired tasks (claim_tasks reclaims or, past MAX_ATTEMPTS, fails them) or were
+            # left unfinished by a crash
             cur = conn.execute(
-                """SELECT id, program, job_type, params_json FROM partner_award_jobs
-                   WHERE program='flyingblue' AND status='queued'
+                f"""SELECT id, program, job_type, params_json FROM partner_award_jobs j
+                   WHERE program='flyingblue' AND (
+                     status='queued'
+                     OR (status='running' AND (
+                       EXISTS (SELECT 1 FROM partner_award_job_tasks
+                               WHERE job_id=j.id AND (status='queued' OR ({_LEASE_EXPIRED})))
+                       OR NOT EXISTS (SELECT 1 FROM partner_award_job_tasks
+                                      WHERE job_id=j.id AND status IN ('queued', 'running')))))
                    ORDER BY id LIMIT 1"""
             )
             row = cur.fetchone()
@@ -319,15 +791,12 @@ def main():
                 conn = get_conn()
                 init_db(conn)
                 try:
-                    process_job(conn, job_tuple)
+                    process_job(conn, job_tuple, executor)
                 except Exception as e:
                     _log(f"Job error: {e}")
                     try:
-                        conn.execute(
-                            "UPDATE partner_award_jobs SET status='failed', last_error=?, finished_at=datetime('now') WHERE id=?",
-                            (str(e)[:500], job_id),
-                        )
-                        conn.commit()
+                        conn.rollback()
+                        abandon_tasks(conn, job_id, WORKER_ID, str(e)[:500])
                     except Exception:
                         pass
                 finally:
@@ -8,6 +8,7 @@ from __future__ import annotations
 
 import sqlite3
 import sys
+import tempfile
 from pathlib import Path
 
 # Project root
@@ -142,6 +143,401 @@ def test_watchlist_validation():
     print("  watchlist validation: OK")
 
 
+class _FakeAFClient:
+    """Stands in for AirFrancePlaywrightClient: canned GraphQL bodies, no browser."""
+
+    def __init__(self):
+        self.calls = []
+        self.closed = False
+
+    async def gql_post(self, operation_name, payload, url_params=None, max_retries=1):
+        self.calls.append(operation_name)
+        if operation_name == "SharedSearchCreateSearchContextForSearchQuery":
+            body = {"data": {}}
+        elif operation_name == "SharedSearchLowestFareOffersForSearchQuery":
+            start = payload["variables"]["lowestFareOffersRequest"]["requestedConnections"][0]["dateInterval"][:8]
+            body = {"data": {"lowestFareOffers": {
+                "days": {start + "05": {"miles": 60000, "tax": 100}, start + "06": {"miles": 55000, "tax": 100}},
+                "resourceIds": {"self": "res-1"},
+            }}}
+        else:
+            start = payload["variables"]["lowestOffersByResourceIdOptions"]["dateInterval"][:8]
+            body = {"data": {"lowestFareOffersByResourceId": {"days": {start + "20": {"miles": 70000, "tax": 100}}}}}
+        return {"ok": True, "status": 200, "timing_ms": 1, "json": body, "error": None}
+
+    async def close(self):
+        self.closed = True
+
+
+class _BlockedAFClient(_FakeAFClient):
+    """A host that answers every request with 403."""
+
+    async def gql_post(self, operation_name, payload, url_params=None, max_retries=1):
+        self.calls.append(operation_name)
+        return {"ok": False, "status": 403, "timing_ms": 1, "json": None, "error": "HTTP 403"}
+
+
+def test_in_process_executor():
+    """ScanExecutor warms up once for many tasks and imports results in-process."""
+    from partner_awards import jobs_worker
+    from partner_awards.airfrance import state
+    from partner_awards.airfrance.adapter import init_db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_state = state.STATE_DIR, state.STATE_PATH
+        state.STATE_DIR, state.STATE_PATH = Path(tmp), Path(tmp) / "state.json"
+        ex = jobs_worker.ScanExecutor(cfg={"output_dir": tmp + "/outputs", "hosts_to_try": [{"name": "KLM-SE", "base_url": "https://www.klm.se"}], "pacing_ms": [0, 0]})
+        client = _FakeAFClient()
+
+        async def fake_warmup(cfg, log_path):
+            return client, "KLM-SE", []
+
+        old_warmup = ex.runner._try_hosts_warmup
+        ex.runner._try_hosts_warmup = fake_warmup
+        conn = _tmp_db()
+        init_db(conn)
+        try:
+            for month in ("2030-03", "2030-04", "2030-05"):
+                ok, err, folder = ex.run_task("AMS", "JNB", month, "BUSINESS")
+                assert ok and Path(folder).exists(), err
+                assert ex.run_import(conn, folder) == (True, "")
+                assert ex.run_import(conn, folder.replace("AMS-JNB", "JNB-AMS")) == (True, "")
+            assert ex.warmups == 1 and not client.closed
+            assert client.calls.count("SharedSearchCreateSearchContextForSearchQuery") == 3
+            rows = conn.execute(
+                "SELECT origin, destination, COUNT(*) FROM partner_award_calendar_fares GROUP BY 1, 2 ORDER BY 1"
+            ).fetchall()
+            assert rows == [("AMS", "JNB", 6), ("JNB", "AMS", 3)]
+
+            # A failed import leaves nothing half-written for the task's status commit to keep
+            from partner_awards.airfrance import import_folder
+
+            def broken_import(c, path):
+                c.execute("DELETE FROM partner_award_calendar_fares")
+                raise ValueError("bad file")
+
+            old_import, import_folder.import_path = import_folder.import_path, broken_import
+            try:
+                assert ex.run_import(conn, folder) == (False, "bad file")
+            finally:
+                import_folder.import_path = old_import
+            conn.commit()
+            assert conn.execute("SELECT COUNT(*) FROM partner_award_calendar_fares").fetchone()[0] == 9
+        finally:
+            ex.close()
+            ex.runner._try_hosts_warmup = old_warmup
+            state.STATE_DIR, state.STATE_PATH = old_state
+            conn.close()
+        assert client.closed
+    print("  in-process executor: OK")
+
+
+def test_host_pool_executor():
+    """HostPoolExecutor: hosts share one job's queue; a blocked host trips its breaker and hands off."""
+    import json
+
+    from partner_awards import jobs_worker
+    from partner_awards.airfrance import state
+    from partner_awards.airfrance.adapter import init_db
+
+    hosts = [{"name": "KLM-SE", "base_url": "https://www.klm.se"}, {"name": "AF-US", "base_url": "https://wwws.airfrance.us"}]
+    with tempfile.TemporaryDirectory() as tmp:
+        old_state = state.STATE_DIR, state.STATE_PATH
+        state.STATE_DIR, state.STATE_PATH = Path(tmp), Path(tmp) / "state.json"
+        try:
+            for blocked_host in (None, "AF-US"):
+                cfg = {"output_dir": tmp + "/outputs", "hosts_to_try": hosts, "pacing_ms": [0, 0],
+                       "host_breaker_failures": 1, "host_breaker_cooldown_sec": 900}
+                ex = jobs_worker.HostPoolExecutor(cfg=cfg)
+                clients = {}
+
+                async def fake_warm_host(cfg, host, log_path):
+                    client = _BlockedAFClient() if host["name"] == blocked_host else _FakeAFClient()
+                    clients[host["name"]] = client
+                    return client, {"name": host["name"], "ok": True}
+
+                old_warm = ex.runner._warm_host
+                ex.runner._warm_host = fake_warm_host
+                conn = _tmp_db()
+                init_db(conn)
+                try:
+                    params = {"routes": [["AMS", "JNB"]], "force_refresh": True}
+                    job_id = conn.execute(
+                        "INSERT INTO partner_award_jobs (program, job_type, status, params_json) VALUES ('flyingblue', 'open_dates', 'queued', ?)",
+                        (json.dumps(params),),
+                    ).lastrowid
+                    conn.commit()
+                    jobs_worker.process_job(conn, (job_id, "flyingblue", "open_dates", params), ex)
+                    assert conn.execute("SELECT status FROM partner_award_jobs WHERE id=?", (job_id,)).fetchone()[0] == "done"
+                    statuses = dict(conn.execute(
+                        "SELECT status, COUNT(*) FROM partner_award_job_tasks GROUP BY status"
+                    ).fetchall())
+                    assert statuses == {"done": 48}, statuses
+                    per_host = {h.name: h.tasks for h in ex.hosts}
+                    if blocked_host is None:
+                        assert per_host["KLM-SE"] > 0 and per_host["AF-US"] > 0 and sum(per_host.values()) == 48
+                        assert ex.warmups == 2
+                    else:
+                        # AF-US tripped on its first task, which KLM-SE then ran along with the rest
+                        assert per_host == {"KLM-SE": 48, "AF-US": 1}, per_host
+                        assert ex.hosts[1].is_open() and not ex.hosts[0].is_open()
+                        assert clients["AF-US"].closed
+                    fares = conn.execute("SELECT COUNT(*) FROM partner_award_calendar_fares").fetchone()[0]
+                    assert fares > 0
+                finally:
+                    ex.close()
+                    ex.runner._warm_host = old_warm
+                    conn.close()
+                assert all(c.closed for c in clients.values())
+        finally:
+            state.STATE_DIR, state.STATE_PATH = old_state
+    print("  host pool executor: OK")
+
+
+class _NoopExecutor:
+    """Executor that 'runs' each task in a few ms and writes nothing."""
+
+    batch_size = 1
+
+    def __init__(self):
+        self.ran = []
+
+    def run_task(self, origin, destination, month, cabin):
+        import time
+        time.sleep(0.002)
+        self.ran.append((origin, destination, month, cabin))
+        return True, "", None
+
+    def run_tasks(self, tasks, start, finish):
+        from partner_awards.jobs_worker import _run_tasks_in_order
+        _run_tasks_in_order(self, tasks, start, finish)
+
+
+def test_task_leases():
+    """Several workers drain one job without duplicate work and reclaim a dead worker's expired leases."""
+    import json
+    import threading
+
+    from partner_awards import jobs_worker
+    from partner_awards.airfrance.adapter import init_db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = str(Path(tmp) / "partner.sqlite")
+        conn = sqlite3.connect(db_file)
+        init_db(conn)
+        params = {"routes": [["AMS", "JNB"]], "force_refresh": True}
+        job_id = conn.execute(
+            "INSERT INTO partner_award_jobs (program, job_type, status, params_json) VALUES ('flyingblue', 'open_dates', 'queued', ?)",
+            (json.dumps(params),),
+        ).lastrowid
+        conn.commit()
+        assert jobs_worker.claim_job(conn, job_id, params)
+        assert not jobs_worker.claim_job(conn, job_id, params)
+
+        # A worker that died holding three tasks: its lease has run out
+        dead = jobs_worker.claim_tasks(conn, job_id, "dead:1", limit=3)
+        conn.execute(
+            "UPDATE partner_award_job_tasks SET lease_expires_at=datetime('now', '-1 minute') WHERE claimed_by='dead:1'"
+        )
+        # ...and one still holding a live lease is left alone
+        (live,) = jobs_worker.claim_tasks(conn, job_id, "live:1", limit=1)
+        conn.commit()
+        assert {t[0] for t in dead}.isdisjoint({live[0]})
+
+        executors = {"w1": _NoopExecutor(), "w2": _NoopExecutor()}
+
+        def work(worker_id):
+            c = sqlite3.connect(db_file, timeout=30)
+            try:
+                jobs_worker.process_job(c, (job_id, "flyingblue", "open_dates", params), executors[worker_id], worker_id)
+            finally:
+                c.close()
+
+        threads = [threading.Thread(target=work, args=(w,)) for w in executors]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        ran = executors["w1"].ran + executors["w2"].ran
+        assert len(ran) == len(set(ran)) == 47 and executors["w1"].ran and executors["w2"].ran
+        rows = conn.execute(
+            "SELECT claimed_by, status, attempts, COUNT(*) FROM partner_award_job_tasks GROUP BY 1, 2, 3 ORDER BY 1, 2, 3"
+        ).fetchall()
+        assert ("live:1", "running", 1, 1) in rows
+        assert sum(n for w, st, a, n in rows if w in executors and st == "done" and a == 2) == 3  # reclaimed
+        # The job waits for the live lease; its holder finishing the task closes the job
+        assert conn.execute("SELECT status FROM partner_award_jobs WHERE id=?", (job_id,)).fetchone()[0] == "running"
+        conn.execute("UPDATE partner_award_job_tasks SET status='done' WHERE id=?", (live[0],))
+        assert jobs_worker.finish_job(conn, job_id) == "done"
+        progress = json.loads(conn.execute("SELECT progress_json FROM partner_award_jobs WHERE id=?", (job_id,)).fetchone()[0])
+        assert progress["done_tasks"] == progress["total_tasks"] == 48
+
+        assert jobs_worker.claim_tasks(conn, job_id, "w3") == []  # finished job: nothing to claim
+
+        # The heartbeat extends the leases of the tasks it holds, not every task
+        # under the same worker id (e.g. left by a dead process), and stops once
+        # a task has been held for max_sec
+        stale = dead[0][0]
+        conn.execute(
+            "UPDATE partner_award_job_tasks SET status='running', claimed_by='hb', lease_expires_at=datetime('now', '-1 second') WHERE id IN (?, ?)",
+            (live[0], stale),
+        )
+        conn.commit()
+        import time
+        lease_live = "SELECT lease_expires_at > datetime('now') FROM partner_award_job_tasks WHERE id=?"
+        with jobs_worker._Heartbeat(db_file, "hb", lease_sec=3) as heartbeat:
+            heartbeat.hold([live[0]])
+            time.sleep(1.5)
+        assert conn.execute(lease_live, (live[0],)).fetchone()[0] == 1
+        assert conn.execute(lease_live, (stale,)).fetchone()[0] == 0
+        conn.execute(
+            "UPDATE partner_award_job_tasks SET lease_expires_at=datetime('now', '-1 second') WHERE id=?", (live[0],)
+        )
+        conn.commit()
+        with jobs_worker._Heartbeat(db_file, "hb", lease_sec=3, max_sec=0) as heartbeat:
+            heartbeat.hold([live[0]])
+            time.sleep(1.5)
+        assert conn.execute(lease_live, (live[0],)).fetchone()[0] == 0
+        assert ":" in jobs_worker.WORKER_ID.rsplit(":", 1)[0]  # host:pid:nonce
+
+        # A task whose lease ran out MAX_ATTEMPTS times is failed, not handed to yet another worker
+        job3 = conn.execute(
+            "INSERT INTO partner_award_jobs (program, job_type, status, params_json) VALUES ('flyingblue', 'open_dates', 'queued', ?)",
+            (json.dumps(params),),
+        ).lastrowid
+        conn.commit()
+        assert jobs_worker.claim_job(conn, job3, params)
+        (poison,) = jobs_worker.claim_tasks(conn, job3, "crash:1", limit=1)
+        # ...as if each of MAX_ATTEMPTS workers took it and crashed
+        conn.execute(
+            "UPDATE partner_award_job_tasks SET attempts=?, lease_expires_at=datetime('now', '-1 minute') WHERE id=?",
+            (jobs_worker.MAX_ATTEMPTS, poison[0]),
+        )
+        conn.commit()
+        rest = jobs_worker.claim_tasks(conn, job3, "w4", limit=100)
+        assert poison[0] not in {t[0] for t in rest} and len(rest) == 47
+        assert conn.execute(
+            "SELECT status, attempts, last_error FROM partner_award_job_tasks WHERE id=?", (poison[0],)
+        ).fetchone() == ("failed", jobs_worker.MAX_ATTEMPTS, f"Lease expired {jobs_worker.MAX_ATTEMPTS} times")
+        conn.execute("UPDATE partner_award_job_tasks SET status='done' WHERE job_id=? AND claimed_by='w4'", (job3,))
+        assert jobs_worker.finish_job(conn, job3) == "failed"
+
+        # One worker's error fails only its own leased tasks; the job stays open for the others
+        job2 = conn.execute(
+            "INSERT INTO partner_award_jobs (program, job_type, status, params_json) VALUES ('flyingblue', 'open_dates', 'queued', ?)",
+            (json.dumps(params),),
+        ).lastrowid
+        conn.commit()
+        assert jobs_worker.claim_job(conn, job2, params)
+        (mine,) = jobs_worker.claim_tasks(conn, job2, "crashed", limit=1)
+        (theirs,) = jobs_worker.claim_tasks(conn, job2, "other", limit=1)
+        assert jobs_worker.abandon_tasks(conn, job2, "crashed", "boom") is None
+        status = dict(conn.execute(
+            "SELECT id, status FROM partner_award_job_tasks WHERE id IN (?, ?)", (mine[0], theirs[0])
+        ).fetchall())
+        assert status == {mine[0]: "failed", theirs[0]: "running"}
+        assert conn.execute("SELECT status FROM partner_award_jobs WHERE id=?", (job2,)).fetchone()[0] == "running"
+        assert jobs_worker.claim_tasks(conn, job2, "other", limit=1)  # still claimable
+        conn.execute("UPDATE partner_award_job_tasks SET status='done' WHERE job_id=? AND status!='failed'", (job2,))
+        assert jobs_worker.finish_job(conn, job2) == "failed"
+        conn.close()
+    print("  task leases: OK")
+
+
+def test_open_dates_range():
+    """open-dates-range: one search context for all months, one manifest, importable month folders."""
+    import asyncio
+    import json
+
+    from partner_awards.jobs_worker import RUNNER_DIR
+    from partner_awards.airfrance.adapter import init_db
+    from partner_awards.airfrance.import_folder import import_path
+
+    if str(RUNNER_DIR) not in sys.path:
+        sys.path.insert(0, str(RUNNER_DIR))
+    import runner
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cfg = {"hosts_to_try": [{"name": "KLM-SE", "base_url": "https://www.klm.se"}], "pacing_ms": [0, 0]}
+        client = _FakeAFClient()
+        months = runner._next_months("2030-11", 3)
+        assert months == ["2030-11", "2030-12", "2031-01"]
+        n = asyncio.run(runner._open_dates_range_impl(
+            cfg, Path(tmp), "AMS", "JNB", months, ["BUSINESS", "PREMIUM"], False, None,
+            warmed=(client, "KLM-SE", []),
+        ))
+        assert n == 3
+        assert client.calls.count("SharedSearchCreateSearchContextForSearchQuery") == 1
+        assert client.calls.count("SharedSearchLowestFareOffersForSearchQuery") == 3
+        assert client.calls.count("SharedSearchLowestFareOffersByResourceIdForSearchQuery") == 6
+        (manifest_path,) = (Path(tmp) / "AF" / "AMS-JNB").glob("range_manifest_*.json")
+        manifest = json.loads(manifest_path.read_text())
+        assert manifest["requests"] == 10 and [m["month"] for m in manifest["months"]] == months
+        assert all(m["ok"] and len(m["return_files"]) == 2 for m in manifest["months"])
+
+        conn = _tmp_db()
+        init_db(conn)
+        import_path(conn, Path(tmp) / "AF")
+        rows = conn.execute(
+            "SELECT origin, COUNT(DISTINCT substr(depart_date, 1, 7)) FROM partner_award_calendar_fares GROUP BY 1 ORDER BY 1"
+        ).fetchall()
+        assert rows == [("AMS", 3), ("JNB", 3)]
+        conn.close()
+    print("  open-dates-range: OK")
+
+
+def test_adaptive_pacing():
+    """AIMD pacer: clean responses speed up, retriable ones back off, rate persists per host."""
+    from partner_awards.jobs_worker import RUNNER_DIR
+    from partner_awards.airfrance import state
+
+    if str(RUNNER_DIR) not in sys.path:
+        sys.path.insert(0, str(RUNNER_DIR))
+    import runner
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_state = state.STATE_DIR, state.STATE_PATH
+        state.STATE_DIR, state.STATE_PATH = Path(tmp), Path(tmp) / "state.json"
+        try:
+            cfg = {"pacing_ms": [800, 1800], "pacing_min_ms": 500, "pacing_max_ms": 5000, "pacing_step_ms": 100}
+            pacer = runner._make_pacer("KLM-SE", cfg)
+            assert abs(pacer.delay_sec - 1.3) < 1e-9
+            for _ in range(20):
+                pacer.record(200)
+            assert abs(pacer.delay_sec - 0.5) < 1e-9           # floored at pacing_min_ms
+            assert abs(state.get_pacing("KLM-SE") - 0.5) < 1e-9  # saved every 10 responses
+            pacer.record(429)
+            pacer.record(0)
+            assert abs(pacer.delay_sec - 2.0) < 1e-9
+            for _ in range(5):
+                pacer.record(503)
+            assert pacer.delay_sec == 5.0                       # capped at pacing_max_ms
+            assert state.get_pacing("KLM-SE") == 5.0            # backoff saves immediately
+            assert state.get_pacing("AF-US") is None
+
+            # Concurrent read-modify-writes keep each other's fields
+            import threading
+            writers = [threading.Thread(target=state.set_pacing, args=(f"H{i}", i)) for i in range(20)]
+            writers.append(threading.Thread(target=state.set_blocked, kwargs={"minutes": 1, "reason": "test"}))
+            for t in writers:
+                t.start()
+            for t in writers:
+                t.join()
+            assert all(state.get_pacing(f"H{i}") == i for i in range(20))
+            assert state.is_blocked()[0]
+            state.clear_blocked()
+            assert not state.is_blocked()[0] and state.get_pacing("H3") == 3
+            assert [p.name for p in Path(tmp).iterdir() if p.suffix == ".tmp"] == []
+
+            resumed = runner._make_pacer("KLM-SE", cfg)
+            assert resumed.delay_sec == 5.0
+            assert runner._make_pacer("KLM-SE", dict(cfg, adaptive_pacing=False)) is None
+        finally:
+            state.STATE_DIR, state.STATE_PATH = old_state
+    print("  adaptive pacing: OK")
+
+
 def main():
     print("Partner Awards smoke tests")
     test_init_and_watchlist()
@@ -149,6 +545,11 @@ def main():
     test_top_deals_ordering()
     test_heatmap_structure()
     test_route_discovery_sorting()
+    test_in_process_executor()
+    test_host_pool_executor()
+    test_task_leases()
+    test_open_dates_range()
+    test_adaptive_pacing()
     print("All passed.")
 
 
@@ -182,6 +182,77 @@ def _parse_cookie_string(cookie_string: str, domain: str = ".klm.se") -> List[Di
     return cookies
 
 
+class AdaptivePacer:
+    """
+    AIMD inter-request delay for one host. Each clean response shortens the
+    delay by `step_sec` (additive increase of the request rate); a retriable
+    status (403/429/503) or transport error multiplies it by `backoff`
+    (multiplicative decrease). wait() spaces request *starts* by the current
+    delay, ±jitter. `save(host, delay_sec)` is called after every backoff and
+    every `save_every` clean responses so the learned rate can be persisted.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        delay_sec: float = 1.3,
+        min_sec: float = 0.3,
+        max_sec: float = 60.0,
+        step_sec: float = 0.1,
+        backoff: float = 2.0,
+        jitter: float = 0.2,
+        retry_on_status: Optional[List[int]] = None,
+        save=None,
+        save_every: int = 10,
+    ):
+        self.host = host
+        self.min_sec = min_sec
+        self.max_sec = max_sec
+        self.delay_sec = min(max(delay_sec, min_sec), max_sec)
+        self.step_sec = step_sec
+        self.backoff = backoff
+        self.jitter = jitter
+        self.retry_on_status = retry_on_status or [403, 429, 503]
+        self.save = save
+        self.save_every = max(1, save_every)
+        self.stats = {"ok": 0, "backoffs": 0}
+        self._last_start: Optional[float] = None
+        self._unsaved = 0
+
+    async def wait(self) -> None:
+        """Sleep until the current delay has passed since the previous request started."""
+        now = time.monotonic()
+        if self._last_start is not None:
+            delay = self.delay_sec * (1 + self.jitter * (2 * random.random() - 1))
+            remaining = self._last_start + delay - now
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+        self._last_start = time.monotonic()
+
+    def record(self, status: int) -> None:
+        """Adjust the delay after a response (status 0 = transport error/timeout)."""
+        if status == 0 or status in self.retry_on_status:
+            self.delay_sec = min(self.max_sec, self.delay_sec * self.backoff)
+            self.stats["backoffs"] += 1
+            log.warning("%s: status %s, pacing backed off to %.2fs", self.host, status, self.delay_sec)
+            self.flush()
+            return
+        if status == 200:
+            self.delay_sec = max(self.min_sec, self.delay_sec - self.step_sec)
+            self.stats["ok"] += 1
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.flush()
+
+    def flush(self) -> None:
+        self._unsaved = 0
+        if self.save:
+            try:
+                self.save(self.host, self.delay_sec)
+            except Exception as e:
+                log.warning("Could not persist pacing for %s: %s", self.host, e)
+
+
 class AirFrancePlaywrightClient:
     """Playwright-based Air France/KLM GraphQL client for VPS deployment."""
 
@@ -196,6 +267,7 @@ class AirFrancePlaywrightClient:
         force_http1: bool = False,
         cookies: Optional[List[Dict[str, Any]]] = None,
         cookie_header: Optional[str] = None,
+        pacer: Optional[AdaptivePacer] = None,
     ):
         self.user_agent = user_agent
         self.headers_base = headers_base
@@ -207,6 +279,8 @@ class AirFrancePlaywrightClient:
         self.force_http1 = force_http1
         self._cookies = cookies or []
         self._cookie_header = (cookie_header or "").strip() or None
+        # With a pacer, gql_post spaces and backs off requests itself (no fixed retry sleep)
+        self.pacer = pacer
         self._context = None
         self._browser = None
         self._playwright = None
@@ -240,6 +314,8 @@ class AirFrancePlaywrightClient:
 
     async def close(self):
         """Release resources."""
+        if self.pacer:
+            self.pacer.flush()
         if self._context:
             await self._context.close()
         if self._browser:
@@ -314,6 +390,8 @@ class AirFrancePlaywrightClient:
         last_error = None
 
         while attempt <= max_retries:
+            if self.pacer:
+                await self.pacer.wait()
             t0 = time.perf_counter()
             try:
                 gql_headers = {
@@ -331,6 +409,8 @@ class AirFrancePlaywrightClient:
                 )
                 elapsed_ms = round((time.perf_counter() - t0) * 1000)
                 last_status = req.status
+                if self.pacer:
+                    self.pacer.record(req.status)
 
                 if req.status == 200:
                     raw = await req.body()
@@ -341,8 +421,11 @@ class AirFrancePlaywrightClient:
                         return {"ok": False, "status": req.status, "timing_ms": elapsed_ms, "json": None, "error": "Invalid JSON response"}
 
                 if req.status in self.retry_on_status and attempt < max_retries:
-                    log.warning("%s returned %s, retrying in %ds", operation_name, req.status, self.retry_backoff_sec)
-                    await asyncio.sleep(self.retry_backoff_sec)
+                    if self.pacer:
+                        log.warning("%s returned %s, retrying after %.1fs", operation_name, req.status, self.pacer.delay_sec)
+                    else:
+                        log.warning("%s returned %s, retrying in %ds", operation_name, req.status, self.retry_backoff_sec)
+                        await asyncio.sleep(self.retry_backoff_sec)
                     attempt += 1
                     continue
 
@@ -352,9 +435,12 @@ class AirFrancePlaywrightClient:
             except Exception as e:
                 elapsed_ms = round((time.perf_counter() - t0) * 1000)
                 last_error = str(e)
+                if self.pacer:
+                    self.pacer.record(0)
                 if attempt < max_retries:
-                    log.warning("%s failed: %s, retrying in %ds", operation_name, e, self.retry_backoff_sec)
-                    await asyncio.sleep(self.retry_backoff_sec)
+                    log.warning("%s failed: %s, retrying", operation_name, e)
+                    if not self.pacer:
+                        await asyncio.sleep(self.retry_backoff_sec)
                     attempt += 1
                     continue
                 return {"ok": False, "status": 0, "timing_ms": elapsed_ms, "json": None, "error": last_error}
@@ -23,6 +23,7 @@ from typing import Any, Dict, List, Optional
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
 from airfrance_client_pw import (
+    AdaptivePacer,
     AirFrancePlaywrightClient,
     build_available_offers,
     build_create_context,
@@ -49,6 +50,13 @@ DEFAULT_CONFIG = {
     "retry_backoff_sec": 3,
     "retry_on_status": [403, 429, 503],
     "pacing_delay_sec": [1, 3],
+    "adaptive_pacing": True,
+    "pacing_min_ms": 300,
+    "pacing_max_ms": 60000,
+    "pacing_step_ms": 100,
+    "pacing_backoff": 2.0,
+    "host_breaker_failures": 2,
+    "host_breaker_cooldown_sec": 900,
     "force_http1": False,
 }
 
@@ -206,6 +214,39 @@ def _host_attempt_entry(host: Dict, ok: bool, status: int, timing_ms: Optional[i
     }
 
 
+async def _warm_host(cfg: Dict, host: Dict, log_path: Optional[Path]) -> tuple:
+    """Warm up one host. Returns (client or None, host_attempt_entry); the client is closed on failure."""
+    name = host.get("name", host.get("base_url", "?"))
+    # Only attach cookies when host matches cookie origin (e.g. AF-US cookies -> AF-US host)
+    prefer = cfg.get("cookie_prefer_host")
+    matches = bool(prefer) and name == prefer
+    host_cookies = _load_cookies(cfg, base_url=host.get("base_url", "https://www.klm.se")) if matches else []
+    cookie_header = (cfg.get("cookie_string") or os.environ.get("AF_COOKIE_STRING") or "") if matches else None
+    headers = _headers_from_host(host, cfg)
+    client = AirFrancePlaywrightClient(
+        user_agent=cfg["user_agent"],
+        headers_base=headers,
+        base_url=host["base_url"],
+        timeout_ms=cfg.get("warmup_timeout_ms", 60000),
+        force_http1=cfg.get("force_http1", False),
+        cookies=host_cookies,
+        cookie_header=cookie_header,
+        pacer=_make_pacer(name, cfg),
+    )
+    try:
+        result = await client.warmup()
+        ok = result.get("ok", False)
+        ms = result.get("request_ms") or result.get("advanced_ms")
+        attempt = _host_attempt_entry(host, ok, 200 if ok else 0, ms, None if ok else "warmup failed")
+        if ok:
+            _log_line(f"Warmup succeeded on {name}", log_path)
+            return client, attempt
+    except Exception as e:
+        attempt = _host_attempt_entry(host, False, 0, None, str(e)[:200])
+    await client.close()
+    return None, attempt
+
+
 async def _try_hosts_warmup(cfg: Dict, log_path: Optional[Path]) -> Optional[tuple]:
     """Try each host until warmup succeeds. Returns (client, host_used, host_attempts) or None.
     On all-fail: writes cooldown state and returns None."""
@@ -215,35 +256,11 @@ async def _try_hosts_warmup(cfg: Dict, log_path: Optional[Path]) -> Optional[tup
     if prefer and _load_cookies(cfg):
         # Put preferred host first when we have cookies from that domain
         hosts = [h for h in hosts if h.get("name") == prefer] + [h for h in hosts if h.get("name") != prefer]
-    base_url = hosts[0].get("base_url", "https://www.klm.se") if hosts else "https://www.klm.se"
-    all_cookies = _load_cookies(cfg, base_url=base_url)
     for host in hosts:
-        name = host.get("name", host.get("base_url", "?"))
-        # Only attach cookies when host matches cookie origin (e.g. AF-US cookies -> AF-US host)
-        host_cookies = all_cookies if (prefer and name == prefer) else []
-        cookie_header = (cfg.get("cookie_string") or os.environ.get("AF_COOKIE_STRING") or "") if (prefer and name == prefer) else None
-        headers = _headers_from_host(host, cfg)
-        client = AirFrancePlaywrightClient(
-            user_agent=cfg["user_agent"],
-            headers_base=headers,
-            base_url=host["base_url"],
-            timeout_ms=cfg.get("warmup_timeout_ms", 60000),
-            force_http1=cfg.get("force_http1", False),
-            cookies=host_cookies,
-            cookie_header=cookie_header,
-        )
-        try:
-            result = await client.warmup()
-            ok = result.get("ok", False)
-            ms = result.get("request_ms") or result.get("advanced_ms")
-            attempts.append(_host_attempt_entry(host, ok, 200 if ok else 0, ms, None if ok else "warmup failed"))
-            if ok:
-                _log_line(f"Warmup succeeded on {name}", log_path)
-                return (client, name, attempts)
-        except Exception as e:
-            err_str = str(e)[:200]
-            attempts.append(_host_attempt_entry(host, False, 0, None, err_str))
-        await client.close()
+        client, attempt = await _warm_host(cfg, host, log_path)
+        attempts.append(attempt)
+        if client:
+            return (client, attempt["name"], attempts)
 
     # All hosts failed: write cooldown state
     consecutive = int(cfg.get("_consecutive_blocked", 0))
@@ -283,6 +300,45 @@ def _pacing_delay(cfg: Dict) -> float:
     return float(delays[0]) if isinstance(delays, (list, tuple)) and delays else 1.5
 
 
+def _state_module():
+    """partner_awards.airfrance.state when the runner is deployed inside the repo, else None."""
+    try:
+        proj_root = Path(__file__).resolve().parent.parent
+        if str(proj_root) not in sys.path:
+            sys.path.insert(0, str(proj_root))
+        from partner_awards.airfrance import state
+        return state
+    except Exception:
+        return None
+
+
+def _make_pacer(host_name: str, cfg: Dict) -> Optional[AdaptivePacer]:
+    """AIMD pacer for host, resuming from the delay learned on earlier runs (None if disabled)."""
+    if not cfg.get("adaptive_pacing", True):
+        return None
+    state = _state_module()
+    delay = state.get_pacing(host_name) if state else None
+    if delay is None:
+        pacing = cfg.get("pacing_ms") or [800, 1800]
+        delay = sum(pacing[:2]) / 2000 if isinstance(pacing, list) and len(pacing) >= 2 else 1.0
+    return AdaptivePacer(
+        host_name,
+        delay_sec=delay,
+        min_sec=cfg.get("pacing_min_ms", 300) / 1000,
+        max_sec=cfg.get("pacing_max_ms", 60000) / 1000,
+        step_sec=cfg.get("pacing_step_ms", 100) / 1000,
+        backoff=cfg.get("pacing_backoff", 2.0),
+        retry_on_status=cfg.get("retry_on_status", [403, 429, 503]),
+        save=state.set_pacing if state else None,
+    )
+
+
+async def _pace(client, cfg: Dict) -> None:
+    """Sleep between requests: the client's pacer spaces requests itself, else fixed jitter."""
+    if getattr(client, "pacer", None) is None:
+        await asyncio.sleep(_pacing_delay(cfg))
+
+
 def _verify_output_impl(path: Path) -> int:
     """Verify output folder: .meta.json exists, each JSON has meta_ref and body, origin/destination/cabins."""
     if not path.exists():
@@ -440,7 +496,7 @@ async def _run_once_impl(
     url_params = _url_params_from_host(host, cfg)
 
     try:
-        await asyncio.sleep(_pacing_delay(cfg))
+        await _pace(client, cfg)
         search_uuid = str(uuid.uuid4())
 
         create_res = await client.gql_post(
@@ -454,7 +510,7 @@ async def _run_once_impl(
             _log_line(f"CreateContext failed: {create_res.get('error', '')[:200]}", log_path)
             return 0
 
-        await asyncio.sleep(_pacing_delay(cfg))
+        await _pace(client, cfg)
 
         offers_res = await client.gql_post(
             "SearchResultAvailableOffersQuery",
@@ -517,7 +573,7 @@ async def _calendar_scan_impl(
     written = 0
     consecutive_blocked = 0
     try:
-        await asyncio.sleep(_pacing_delay(cfg))
+        await _pace(client, cfg)
         search_uuid = str(uuid.uuid4())
 
         create_res = await client.gql_post(
@@ -530,7 +586,7 @@ async def _calendar_scan_impl(
             _log_line(f"CreateContext failed: {create_res.get('error', '')[:200]}", log_path)
             return 0
 
-        await asyncio.sleep(_pacing_delay(cfg))
+        await _pace(client, cfg)
 
         candidate_dates: List[str] = []
         lowest_body: Optional[Dict] = None
@@ -544,7 +600,7 @@ async def _calendar_scan_impl(
             _log_line(f"LowestFares ({cab}): status={lowest_res.get('status')}", log_path)
             if lowest_res["ok"] and lowest_res.get("json") and not _has_lowest_fare_connections(lowest_res["json"]):
                 _log_line(f"LowestFares empty, retrying with AIRPORT/AIRPORT for {origin}-{destination}", log_path)
-                await asyncio.sleep(_pacing_delay(cfg))
+                await _pace(client, cfg)
                 retry_res = await client.gql_post(
                     "SharedSearchLowestFareOffersForSearchQuery",
                     build_lowest_fares(
@@ -569,7 +625,7 @@ async def _calendar_scan_impl(
                 if consecutive_blocked >= 2:
                     _log_line("Blocked twice in a row, stopping early", log_path)
                     break
-            await asyncio.sleep(_pacing_delay(cfg))
+            await _pace(client, cfg)
 
         # Output calendar (LowestFareOffers) JSON
         out_dir = output_base / "AF" / f"{origin}-{destination}" / start_date
@@ -594,7 +650,7 @@ async def _calendar_scan_impl(
         _log_line(f"Candidate dates: {candidate_dates[:max_offer_days]}", log_path)
 
         for depart_date in candidate_dates[:max_offer_days]:
-            await asyncio.sleep(_pacing_delay(cfg))
+            await _pace(client, cfg)
             for cab in cabins:
                 offers_res = await client.gql_post(
                     "SearchResultAvailableOffersQuery",
@@ -627,6 +683,172 @@ async def _calendar_scan_impl(
     return written
 
 
+def _month_bounds(month: str, full_month: bool = True) -> tuple:
+    """(start_date, end_date, interval_type) for "YYYY-MM". full_month=True: that month, DAY grid.
+    full_month=False: 12-month window, MONTH type (sparse sample)."""
+    import calendar as cal_mod
+    year, m = int(month[:4]), int(month[5:7])
+    start_date = f"{year:04d}-{m:02d}-01"
+    last_day = cal_mod.monthrange(year, m)[1]
+    end_date = f"{year:04d}-{m:02d}-{last_day:02d}"
+    if full_month:
+        # DAY type + single month: returns every day like KLM calendar
+        return start_date, end_date, "DAY"
+    # MONTH type: 12-month window (sparse sample)
+    end_m = m + 11
+    end_year = year + (end_m - 1) // 12
+    end_m = ((end_m - 1) % 12) + 1
+    end_day = cal_mod.monthrange(end_year, end_m)[1]
+    return start_date, f"{end_year:04d}-{end_m:02d}-{end_day:02d}", "MONTH"
+
+
+def _next_months(start_month: str, count: int) -> List[str]:
+    """["2026-03", "2026-04", ...]: count months from start_month."""
+    year, m = int(start_month[:4]), int(start_month[5:7])
+    out = []
+    for _ in range(count):
+        out.append(f"{year:04d}-{m:02d}")
+        m += 1
+        if m > 12:
+            m, year = 1, year + 1
+    return out
+
+
+async def _create_search_context(client, cfg: Dict, url_params: Dict, log_path: Optional[Path]) -> Optional[str]:
+    """CreateSearchContext; returns the searchStateUuid or None."""
+    await _pace(client, cfg)
+    search_uuid = str(uuid.uuid4())
+    create_res = await client.gql_post(
+        "SharedSearchCreateSearchContextForSearchQuery",
+        build_create_context(search_uuid),
+        url_params=url_params,
+        max_retries=cfg.get("max_retries", 1),
+    )
+    if not create_res["ok"]:
+        _log_line(f"CreateContext failed: {create_res.get('error', '')[:200]}", log_path)
+        return None
+    return search_uuid
+
+
+async def _fetch_month(
+    client,
+    cfg: Dict,
+    url_params: Dict,
+    search_uuid: str,
+    output_base: Path,
+    origin: str,
+    destination: str,
+    month: str,
+    cabins: List[str],
+    host_used: str,
+    host_attempts: List[Dict],
+    log_path: Optional[Path],
+    full_month: bool = True,
+) -> Dict[str, Any]:
+    """LowestFareOffers for one month (+ ByResourceId return leg per cabin) in an existing search context.
+    Writes the month folders and returns {month, ok, status, error, file, return_files, requests}."""
+    start_date, end_date, interval_type = _month_bounds(month, full_month)
+    result: Dict[str, Any] = {"month": month, "ok": False, "status": 0, "error": "", "file": None, "return_files": [], "requests": 0}
+
+    await _pace(client, cfg)
+
+    lowest_res = await client.gql_post(
+        "SharedSearchLowestFareOffersForSearchQuery",
+        build_lowest_fares(origin, destination, start_date, end_date, cabins, search_uuid, interval_type=interval_type),
+        url_params=url_params,
+        max_retries=cfg.get("max_retries", 1),
+    )
+    result["requests"] += 1
+    _log_line(f"LowestFares {interval_type}: status={lowest_res.get('status')}", log_path)
+
+    # Fallback: if empty, retry with AIRPORT/AIRPORT (some routes e.g. AMS-CPT need both as airports)
+    if lowest_res["ok"] and lowest_res.get("json") and not _has_lowest_fare_connections(lowest_res["json"]):
+        for retry_name, retry_url_params, retry_kw in [
+            ("AIRPORT/AIRPORT", url_params, {"origin_type": "AIRPORT", "destination_type": "AIRPORT"}),
+            ("bookingFlow=REWARD", {**url_params, "bookingFlow": "REWARD"}, {"origin_type": "CITY", "destination_type": "AIRPORT"}),
+            ("DAY+omit_departure_date", url_params, {"interval_type": "DAY", "omit_departure_date": True, "origin_type": "AIRPORT", "destination_type": "AIRPORT"}),
+        ]:
+            _log_line(f"LowestFares empty, retrying with {retry_name} for {origin}-{destination}", log_path)
+            await _pace(client, cfg)
+            kw = {"interval_type": interval_type, "origin_type": "CITY", "destination_type": "AIRPORT", **retry_kw}
+            retry_res = await client.gql_post(
+                "SharedSearchLowestFareOffersForSearchQuery",
+                build_lowest_fares(origin, destination, start_date, end_date, cabins, search_uuid, **kw),
+                url_params=retry_url_params,
+                max_retries=cfg.get("max_retries", 1),
+            )
+            result["requests"] += 1
+            if retry_res["ok"] and retry_res.get("json") and _has_lowest_fare_connections(retry_res["json"]):
+                lowest_res = retry_res
+                _log_line(f"Retry succeeded ({retry_name}): got connections for {origin}-{destination}", log_path)
+                break
+
+    result["status"] = lowest_res.get("status", 0)
+    if not lowest_res["ok"] or not lowest_res.get("json"):
+        result["error"] = (lowest_res.get("error") or "")[:200]
+        _log_line(f"LowestFares failed: {result['error']}", log_path)
+        return result
+
+    out_dir = output_base / "AF" / f"{origin}-{destination}" / month
+    out_dir.mkdir(parents=True, exist_ok=True)
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    cab_str = "_".join(cabins)
+    fname = f"lowest_fares_MONTH_{cab_str}_{ts}.json"
+    out_path = out_dir / fname
+    wrapped = {"meta_ref": "./.meta.json", "operationName": "SharedSearchLowestFareOffersForSearchQuery", "body": lowest_res["json"]}
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(wrapped, f, indent=2, ensure_ascii=False)
+    _write_meta(out_dir, host_used, host_attempts, cfg, origin=origin, destination=destination,
+        start_date=start_date, end_date=end_date, cabins=cabins, search_type="MONTH")
+    _log_line(f"Wrote {out_path}", log_path)
+    result["ok"] = True
+    result["file"] = str(out_path)
+
+    # Return leg: use ByResourceId API with resourceIds.self from outbound response
+    outbound_body = lowest_res.get("json") or {}
+    lfo = (outbound_body.get("data") or {}).get("lowestFareOffers") or {}
+    resource_links = lfo.get("resourceIds") or {}
+    unique_resource_id = resource_links.get("self") if isinstance(resource_links, dict) else None
+    date_interval = f"{start_date}/{end_date}"
+    return_url_params = {**url_params, "bookingFlow": "REWARD"}
+    if unique_resource_id:
+        for cabin in cabins:
+            await _pace(client, cfg)
+            return_res = await client.gql_post(
+                "SharedSearchLowestFareOffersByResourceIdForSearchQuery",
+                build_lowest_fares_by_resource_id(unique_resource_id, date_interval, cabin, active_connection=1),
+                url_params=return_url_params,
+                max_retries=cfg.get("max_retries", 1),
+            )
+            result["requests"] += 1
+            _log_line(f"LowestFaresByResourceId return {cabin}: status={return_res.get('status')}", log_path)
+            return_json = return_res.get("json")
+            has_data = _has_lowest_fare_connections(return_json)
+            # ByResourceId may return lowestFareOffers or lowestFareOffersByResourceId; write whenever we have a body
+            if return_res.get("ok") and return_json:
+                data = (return_json.get("data") or {})
+                lfo = data.get("lowestFareOffers") or data.get("lowestFareOffersByResourceId")
+                if isinstance(lfo, dict):
+                    return_dir = output_base / "AF" / f"{destination}-{origin}" / month
+                    return_dir.mkdir(parents=True, exist_ok=True)
+                    ts2 = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    return_fname = f"lowest_fares_MONTH_{cabin}_return_{ts2}.json"
+                    # Normalize to data.lowestFareOffers so ingest works
+                    body = copy.deepcopy(return_json)
+                    if "lowestFareOffersByResourceId" in (body.get("data") or {}) and "lowestFareOffers" not in (body.get("data") or {}):
+                        body.setdefault("data", {})["lowestFareOffers"] = body["data"].pop("lowestFareOffersByResourceId", {})
+                    return_wrapped = {"meta_ref": "./.meta.json", "operationName": "SharedSearchLowestFareOffersByResourceIdForSearchQuery", "body": body}
+                    with open(return_dir / return_fname, "w", encoding="utf-8") as f:
+                        json.dump(return_wrapped, f, indent=2, ensure_ascii=False)
+                    _write_meta(return_dir, host_used, host_attempts, cfg, origin=destination, destination=origin,
+                        start_date=start_date, end_date=end_date, cabins=[cabin], search_type="MONTH_return")
+                    _log_line(f"Wrote return {destination}-{origin} {return_fname}" + ("" if has_data else " (no/lowestOffers)"), log_path)
+                    result["return_files"].append(str(return_dir / return_fname))
+    else:
+        _log_line("No resourceIds.self in outbound response, skipping return leg", log_path)
+    return result
+
+
 async def _open_dates_month_impl(
     cfg: Dict,
     output_base: Path,
@@ -637,33 +859,17 @@ async def _open_dates_month_impl(
     dry_run: bool,
     log_path: Optional[Path],
     full_month: bool = True,
+    warmed: Optional[tuple] = None,
 ) -> int:
     """Fetch LowestFareOffers for a month. full_month=True uses DAY type for full daily grid (like KLM).
-    full_month=False uses MONTH type with 12-month window (sparse sample)."""
-    import calendar as cal_mod
-    # month: "2026-03"
-    year, m = int(month[:4]), int(month[5:7])
-    start_date = f"{year:04d}-{m:02d}-01"
-    last_day = cal_mod.monthrange(year, m)[1]
-    end_date = f"{year:04d}-{m:02d}-{last_day:02d}"
-
-    if full_month:
-        # DAY type + single month: returns every day like KLM calendar
-        interval_type = "DAY"
-    else:
-        # MONTH type: 12-month window (sparse sample)
-        end_m = m + 11
-        end_year = year + (end_m - 1) // 12
-        end_m = ((end_m - 1) % 12) + 1
-        end_day = cal_mod.monthrange(end_year, end_m)[1]
-        end_date = f"{end_year:04d}-{end_m:02d}-{end_day:02d}"
-        interval_type = "MONTH"
-
+    full_month=False uses MONTH type with 12-month window (sparse sample).
+    warmed: (client, host_used, host_attempts) from a caller that keeps the client
+    alive across calls (jobs_worker's executor); skips warmup and leaves the client open."""
     if dry_run:
         _log_line(f"DRY-RUN: open-dates-month {origin}→{destination} {month} cabins={cabins}", log_path)
         return 0
 
-    warmup_result = await _try_hosts_warmup(cfg, log_path)
+    warmup_result = warmed or await _try_hosts_warmup(cfg, log_path)
     if not warmup_result:
         return 0
     client, host_used, host_attempts = warmup_result
@@ -671,113 +877,89 @@ async def _open_dates_month_impl(
     url_params = _url_params_from_host(host, cfg)
 
     try:
-        await asyncio.sleep(_pacing_delay(cfg))
-        search_uuid = str(uuid.uuid4())
-
-        create_res = await client.gql_post(
-            "SharedSearchCreateSearchContextForSearchQuery",
-            build_create_context(search_uuid),
-            url_params=url_params,
-            max_retries=cfg.get("max_retries", 1),
-        )
-        if not create_res["ok"]:
-            _log_line(f"CreateContext failed: {create_res.get('error', '')[:200]}", log_path)
+        search_uuid = await _create_search_context(client, cfg, url_params, log_path)
+        if not search_uuid:
             return 0
+        result = await _fetch_month(client, cfg, url_params, search_uuid, output_base, origin, destination,
+                                    month, cabins, host_used, host_attempts, log_path, full_month=full_month)
+        return 1 if result["ok"] else 0
+    finally:
+        if not warmed:
+            await client.close()
 
-        await asyncio.sleep(_pacing_delay(cfg))
-
-        lowest_res = await client.gql_post(
-            "SharedSearchLowestFareOffersForSearchQuery",
-            build_lowest_fares(origin, destination, start_date, end_date, cabins, search_uuid, interval_type=interval_type),
-            url_params=url_params,
-            max_retries=cfg.get("max_retries", 1),
-        )
-        _log_line(f"LowestFares {interval_type}: status={lowest_res.get('status')}", log_path)
-
-        # Fallback: if empty, retry with AIRPORT/AIRPORT (some routes e.g. AMS-CPT need both as airports)
-        if lowest_res["ok"] and lowest_res.get("json") and not _has_lowest_fare_connections(lowest_res["json"]):
-            for retry_name, retry_url_params, retry_kw in [
-                ("AIRPORT/AIRPORT", url_params, {"origin_type": "AIRPORT", "destination_type": "AIRPORT"}),
-                ("bookingFlow=REWARD", {**url_params, "bookingFlow": "REWARD"}, {"origin_type": "CITY", "destination_type": "AIRPORT"}),
-                ("DAY+omit_departure_date", url_params, {"interval_type": "DAY", "omit_departure_date": True, "origin_type": "AIRPORT", "destination_type": "AIRPORT"}),
-            ]:
-                _log_line(f"LowestFares empty, retrying with {retry_name} for {origin}-{destination}", log_path)
-                await asyncio.sleep(_pacing_delay(cfg))
-                kw = {"interval_type": interval_type, "origin_type": "CITY", "destination_type": "AIRPORT", **retry_kw}
-                retry_res = await client.gql_post(
-                    "SharedSearchLowestFareOffersForSearchQuery",
-                    build_lowest_fares(origin, destination, start_date, end_date, cabins, search_uuid, **kw),
-                    url_params=retry_url_params,
-                    max_retries=cfg.get("max_retries", 1),
-                )
-                if retry_res["ok"] and retry_res.get("json") and _has_lowest_fare_connections(retry_res["json"]):
-                    lowest_res = retry_res
-                    _log_line(f"Retry succeeded ({retry_name}): got connections for {origin}-{destination}", log_path)
-                    break
-
-        if not lowest_res["ok"] or not lowest_res.get("json"):
-            _log_line(f"LowestFares failed: {lowest_res.get('error', '')[:200]}", log_path)
-            return 0
 
-        out_dir = output_base / "AF" / f"{origin}-{destination}" / month
-        out_dir.mkdir(parents=True, exist_ok=True)
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        cab_str = "_".join(cabins)
-        fname = f"lowest_fares_MONTH_{cab_str}_{ts}.json"
-        out_path = out_dir / fname
-        wrapped = {"meta_ref": "./.meta.json", "operationName": "SharedSearchLowestFareOffersForSearchQuery", "body": lowest_res["json"]}
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(wrapped, f, indent=2, ensure_ascii=False)
-        _write_meta(out_dir, host_used, host_attempts, cfg, origin=origin, destination=destination,
-            start_date=start_date, end_date=end_date, cabins=cabins, search_type="MONTH")
-        _log_line(f"Wrote {out_path}", log_path)
+async def _open_dates_range_impl(
+    cfg: Dict,
+    output_base: Path,
+    origin: str,
+    destination: str,
+    months: List[str],
+    cabins: List[str],
+    dry_run: bool,
+    log_path: Optional[Path],
+    warmed: Optional[tuple] = None,
+) -> int:
+    """Walk several months of one route in a single session: one warmup, one browser
+    context and one CreateSearchContext, then LowestFareOffers + ByResourceId return
+    leg per month. Writes the usual month folders plus one range manifest under
+    AF/{origin}-{destination}/. Returns the number of months written."""
+    if dry_run:
+        _log_line(f"DRY-RUN: open-dates-range {origin}→{destination} {months[0]}..{months[-1]} cabins={cabins}", log_path)
+        return 0
 
-        # Return leg: use ByResourceId API with resourceIds.self from outbound response
-        outbound_body = lowest_res.get("json") or {}
-        lfo = (outbound_body.get("data") or {}).get("lowestFareOffers") or {}
-        resource_links = lfo.get("resourceIds") or {}
-        unique_resource_id = resource_links.get("self") if isinstance(resource_links, dict) else None
-        date_interval = f"{start_date}/{end_date}"
-        return_url_params = {**url_params, "bookingFlow": "REWARD"}
-        return_count = 0
-        if unique_resource_id:
-            for cabin in cabins:
-                await asyncio.sleep(_pacing_delay(cfg))
-                return_res = await client.gql_post(
-                    "SharedSearchLowestFareOffersByResourceIdForSearchQuery",
-                    build_lowest_fares_by_resource_id(unique_resource_id, date_interval, cabin, active_connection=1),
-                    url_params=return_url_params,
-                    max_retries=cfg.get("max_retries", 1),
-                )
-                _log_line(f"LowestFaresByResourceId return {cabin}: status={return_res.get('status')}", log_path)
-                return_json = return_res.get("json")
-                has_data = _has_lowest_fare_connections(return_json)
-                # ByResourceId may return lowestFareOffers or lowestFareOffersByResourceId; write whenever we have a body
-                if return_res.get("ok") and return_json:
-                    data = (return_json.get("data") or {})
-                    lfo = data.get("lowestFareOffers") or data.get("lowestFareOffersByResourceId")
-                    if isinstance(lfo, dict):
-                        return_dir = output_base / "AF" / f"{destination}-{origin}" / month
-                        return_dir.mkdir(parents=True, exist_ok=True)
-                        ts2 = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        return_fname = f"lowest_fares_MONTH_{cabin}_return_{ts2}.json"
-                        # Normalize to data.lowestFareOffers so ingest works
-                        body = copy.deepcopy(return_json)
-                        if "lowestFareOffersByResourceId" in (body.get("data") or {}) and "lowestFareOffers" not in (body.get("data") or {}):
-                            body.setdefault("data", {})["lowestFareOffers"] = body["data"].pop("lowestFareOffersByResourceId", {})
-                        return_wrapped = {"meta_ref": "./.meta.json", "operationName": "SharedSearchLowestFareOffersByResourceIdForSearchQuery", "body": body}
-                        with open(return_dir / return_fname, "w", encoding="utf-8") as f:
-                            json.dump(return_wrapped, f, indent=2, ensure_ascii=False)
-                        _write_meta(return_dir, host_used, host_attempts, cfg, origin=destination, destination=origin,
-                            start_date=start_date, end_date=end_date, cabins=[cabin], search_type="MONTH_return")
-                        _log_line(f"Wrote return {destination}-{origin} {return_fname}" + ("" if has_data else " (no/lowestOffers)"), log_path)
-                        return_count += 1
-        else:
-            _log_line("No resourceIds.self in outbound response, skipping return leg", log_path)
+    warmup_result = warmed or await _try_hosts_warmup(cfg, log_path)
+    if not warmup_result:
+        return 0
+    client, host_used, host_attempts = warmup_result
+    host = next((h for h in cfg["hosts_to_try"] if h.get("name") == host_used), {})
+    url_params = _url_params_from_host(host, cfg)
 
-        return 1
+    results: List[Dict[str, Any]] = []
+    requests_made = 0
+    consecutive_blocked = 0
+    try:
+        search_uuid = await _create_search_context(client, cfg, url_params, log_path)
+        requests_made += 1
+        if not search_uuid:
+            return 0
+        for month in months:
+            result = await _fetch_month(client, cfg, url_params, search_uuid, output_base, origin, destination,
+                                        month, cabins, host_used, host_attempts, log_path)
+            results.append(result)
+            requests_made += result["requests"]
+            if result["ok"]:
+                consecutive_blocked = 0
+            elif _is_retriable(result["status"], result["error"], cfg):
+                consecutive_blocked += 1
+                if consecutive_blocked >= 2:
+                    _log_line("Blocked twice in a row, stopping range", log_path)
+                    break
     finally:
-        await client.close()
+        if not warmed:
+            await client.close()
+
+    written = sum(1 for r in results if r["ok"])
+    route_dir = output_base / "AF" / f"{origin}-{destination}"
+    route_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        "schema_version": 1,
+        "run_id": str(uuid.uuid4()),
+        "generated_at": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "mode": "open-dates-range",
+        "origin": origin,
+        "destination": destination,
+        "cabins": cabins,
+        "months_requested": months,
+        "host_used": host_used,
+        "host_attempts": host_attempts,
+        "requests": requests_made,
+        "months": results,
+    }
+    manifest_path = route_dir / f"range_manifest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    _log_line(f"Range {origin}-{destination}: {written}/{len(months)} months, {requests_made} requests. Manifest: {manifest_path}", log_path)
+    return written
 
 
 def main():
@@ -807,6 +989,15 @@ def main():
     p_month.add_argument("--cabins", default="BUSINESS")
     p_month.add_argument("--dry-run", action="store_true")
 
+    # open-dates-range
+    p_range = sub.add_parser("open-dates-range", help="Fetch several months of one route in one session (one manifest)")
+    p_range.add_argument("--origin", required=True)
+    p_range.add_argument("--destination", required=True)
+    p_range.add_argument("--start-month", required=True, help="YYYY-MM e.g. 2026-03")
+    p_range.add_argument("--months", type=int, default=12, help="number of months from --start-month")
+    p_range.add_argument("--cabins", default="BUSINESS,PREMIUM")
+    p_range.add_argument("--dry-run", action="store_true")
+
     # calendar-scan
     p_cal = sub.add_parser("calendar-scan", help="Calendar scan over date range")
     p_cal.add_argument("--origin", required=True)
@@ -828,7 +1019,7 @@ def main():
         return _verify_output_impl(Path(args.path).resolve())
 
     # Cooldown gate: refuse scan if blocked
-    if args.cmd in ("run-once", "calendar-scan", "open-dates-month"):
+    if args.cmd in ("run-once", "calendar-scan", "open-dates-month", "open-dates-range"):
         try:
             proj_root = Path(__file__).resolve().parent.parent
             if str(proj_root) not in sys.path:
@@ -858,6 +1049,12 @@ def main():
         n = asyncio.run(
             _open_dates_month_impl(cfg, output_base, args.origin, args.destination, args.month, cabins, args.dry_run, log_path)
         )
+    elif args.cmd == "open-dates-range":
+        cabins = [c.strip() for c in args.cabins.split(",") if c.strip()] or ["BUSINESS"]
+        months = _next_months(args.start_month, max(1, args.months))
+        n = asyncio.run(
+            _open_dates_range_impl(cfg, output_base, args.origin, args.destination, months, cabins, args.dry_run, log_path)
+        )
     else:
         cabins = [c.strip() for c in args.cabins.split(",") if c.strip()] or ["ECONOMY"]
         n = asyncio.run(
@@ -2,11 +2,23 @@
 Shared database query helpers for the SAS Awards dashboard and reports.
 All SQL lives here — app.py only orchestrates routes and templates.
 """
+import base64
+import copy
+import datetime
+import functools
+import inspect
+import json
 import os
-import sqlite3
+import threading
+import time
+from collections import OrderedDict
 
 from report_config import MIN_SEATS, TRIP_DAYS_MIN, TRIP_DAYS_MAX
+import db
+import destinations
 import regions as _regions
+import schema
+import weekend_engine
 
 DB_PATH = os.path.expanduser(
     os.environ.get("SAS_DB_PATH", "~/sas_awards/sas_awards.sqlite")
@@ -14,13 +26,125 @@ DB_PATH = os.path.expanduser(
 
 
 def get_conn():
-    return sqlite3.connect(DB_PATH)
+    """Pooled read-only connection (see db.py); close() returns it to the pool."""
+    return db.reader(DB_PATH)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Result cache (invalidated by the fetcher's data_version bump)
+# ═══════════════════════════════════════════════════════════════════════════
+
+CACHE_SIZE = int(os.environ.get("SAS_QUERY_CACHE_SIZE", "512"))
+
+
+class ResultCache:
+    """Thread-safe LRU of query results with hit/miss counters."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, self._data[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self._data), "maxsize": self.maxsize}
+
+
+_cache = ResultCache(CACHE_SIZE)
+
+
+def _data_stamp(cur=None):
+    """
+    What a cached result depends on besides its arguments: the database, its
+    data_version (bumped by update_sas_awards.py after each refresh) and today's
+    UTC date, since queries filter on date('now').
+    """
+    if cur is None:
+        conn = get_conn()
+        version = schema.data_version(conn)[0]
+        conn.close()
+    else:
+        version = schema.data_version(cur.connection)[0]
+    return (DB_PATH, version, time.strftime("%Y-%m-%d", time.gmtime()))
+
+
+def _normalize(value):
+    """Hashable form of a filter argument; lists and sets (e.g. countries) are order-insensitive."""
+    if isinstance(value, (list, set, frozenset)):
+        return tuple(sorted(_normalize(v) for v in value))
+    if isinstance(value, tuple):
+        return tuple(_normalize(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _normalize(v)) for k, v in value.items()))
+    return value
+
+
+def cached(fn):
+    """Serve repeat calls with the same (normalized) arguments from _cache until the data changes."""
+    sig = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        bound = sig.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (fn.__name__, _normalize(bound.arguments), _data_stamp())
+        hit, value = _cache.get(key)
+        if not hit:
+            value = fn(*args, **kwargs)
+            _cache.put(key, value)
+        # Callers may mutate what they get back; keep the cached copy pristine
+        return copy.deepcopy(value)
+
+    return wrapper
+
+
+def data_version():
+    """(version, updated_at) of the flights data (not cached; one primary-key read)."""
+    conn = get_conn()
+    out = schema.data_version(conn)
+    conn.close()
+    return out
+
+
+def cache_info():
+    """Hit/miss counters and size of the query result cache."""
+    return _cache.info()
+
+
+def cache_clear():
+    _cache.clear()
+    _counts.clear()
 
 
 # ═══════════════════════════════════════════════════════════════════════════
 # Dashboard
 # ═══════════════════════════════════════════════════════════════════════════
 
+@cached
 def dashboard_stats():
     conn = get_conn()
     cur = conn.cursor()
@@ -29,37 +153,51 @@ def dashboard_stats():
     total = sum(counts.values())
     cur.execute(
         "SELECT COUNT(*) FROM sqlite_master "
-        "WHERE type='table' AND name='flight_history'"
+        "WHERE type='table' AND name='flight_versions'"
     )
     has_history = cur.fetchone()[0] > 0
     conn.close()
     return {"counts": counts, "total": total, "has_history": has_history}
 
 
+def _country_regions_cte():
+    """`country_regions(country_name, region)` CTE built from regions.py, with its params."""
+    pairs = [(c, key) for key, r in _regions.REGIONS.items() for c in r["countries"]]
+    values = ", ".join("(?, ?)" for _ in pairs)
+    return (f"country_regions(country_name, region) AS (VALUES {values})",
+            [v for pair in pairs for v in pair])
+
+
+@cached
 def region_counts():
-    """Live destination/seat counts for every region."""
-    out = []
+    """Live destination/seat counts for every region, in one grouped pass over flights."""
+    cte, params = _country_regions_cte()
     conn = get_conn()
     cur = conn.cursor()
+    cur.execute(f"""
+        WITH {cte}
+        SELECT cr.region,
+               COUNT(DISTINCT f.airport_code),
+               SUM(CASE WHEN f.ab >= 2 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN f.ap >= 2 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN f.ag >= 2 THEN 1 ELSE 0 END)
+        FROM country_regions AS cr
+        JOIN flights AS f ON f.country_name = cr.country_name
+        WHERE f.date >= date('now')
+        GROUP BY cr.region
+    """, params)
+    counts = {r[0]: r[1:] for r in cur.fetchall()}
+    conn.close()
+
+    out = []
     for key in _regions.all_region_keys():
         r = _regions.REGIONS[key]
-        countries = r["countries"]
-        ph = ",".join("?" * len(countries))
-        cur.execute(f"""
-            SELECT COUNT(DISTINCT airport_code),
-                   SUM(CASE WHEN ab >= 2 THEN 1 ELSE 0 END),
-                   SUM(CASE WHEN ap >= 2 THEN 1 ELSE 0 END),
-                   SUM(CASE WHEN ag >= 2 THEN 1 ELSE 0 END)
-            FROM flights
-            WHERE country_name IN ({ph}) AND date >= date('now')
-        """, countries)
-        row = cur.fetchone()
+        row = counts.get(key, (0, 0, 0, 0))
         out.append({
             "key": key, "label": r["label"], "icon": r["icon"],
             "destinations": row[0] or 0,
             "biz": row[1] or 0, "plus": row[2] or 0, "eco": row[3] or 0,
         })
-    conn.close()
     return out
 
 
@@ -67,13 +205,18 @@ def region_counts():
 # Unified flight query (replaces /all, /business, /plus, /flow)
 # ═══════════════════════════════════════════════════════════════════════════
 
+@cached
 def query_flights(
     countries=None, cabin="all", origin="", min_seats=MIN_SEATS,
     from_date="", to_date="", city="", page=1, per_page=50,
+    after="", before="",
 ):
     """
     Filtered, ranked, paginated flight query.
-    Returns {"rows": [dict, ...], "total": int, "page": int, "per_page": int}.
+    after/before are cursors from a previous page (keyset pagination);
+    without one, page falls back to LIMIT/OFFSET.
+    Returns {"rows": [dict, ...], "total": int, "total_exact": bool, "page": int,
+             "per_page": int, "next_cursor": str|None, "prev_cursor": str|None}.
     """
     conditions = ["date >= date('now')"]
     params = []
@@ -87,8 +230,9 @@ def query_flights(
         conditions.append("origin = ?")
         params.append(origin)
     if city:
-        conditions.append("(city_name LIKE ? OR airport_code LIKE ?)")
-        params.extend([f"%{city}%", f"%{city}%"])
+        cond, codes = _city_condition(city)
+        conditions.append(cond)
+        params.extend(codes)
     if from_date:
         conditions.append("date >= ?")
         params.append(from_date)
@@ -96,159 +240,242 @@ def query_flights(
         conditions.append("date <= ?")
         params.append(to_date)
 
-    seat_cond, order_expr = _cabin_clause(cabin, min_seats)
+    seat_cond, order_keys = _cabin_clause(cabin, min_seats)
     if seat_cond:
         conditions.append(seat_cond)
-
-    where = " AND ".join(conditions)
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute(f"SELECT COUNT(*) FROM flights WHERE {where}", params)
-    total = cur.fetchone()[0]
-
-    offset = (page - 1) * per_page
-    cur.execute(f"""
-        SELECT origin, city_name, airport_code, country_name,
-               direction, date, ag, ap, ab
-        FROM flights WHERE {where}
-        ORDER BY {order_expr}
-        LIMIT ? OFFSET ?
-    """, params + [per_page, offset])
+    # Implied by seat_cond (seat counts are >= 0); bounds the rank index the pages read
+    conditions.append(f"{order_keys[0]} <= {-int(min_seats)}")
 
     cols = ["origin", "city_name", "airport_code", "country_name",
             "direction", "date", "ag", "ap", "ab"]
-    rows = [dict(zip(cols, r)) for r in cur.fetchall()]
-    conn.close()
-    return {"rows": rows, "total": total, "page": page, "per_page": per_page}
+    return _paginate(
+        "flights", cols, " AND ".join(conditions), params, order_keys,
+        page, per_page, after, before,
+    )
 
 
 # ═══════════════════════════════════════════════════════════════════════════
 # Weekend pairs (outbound+inbound round-trip combos)
 # ═══════════════════════════════════════════════════════════════════════════
 
+@cached
 def query_weekend_pairs(
     countries=None, cabin="all", origin="", min_seats=MIN_SEATS,
-    city="", page=1, per_page=50,
+    city="", page=1, per_page=50, after="", before="",
 ):
     """
     Weekend round-trip pairs: outbound Wed/Thu/Fri, inbound Sat/Sun/Mon, 3-4 days.
+    Reads the weekend_pairs table the fetcher rebuilds after each refresh.
     Cabin filter:
       - "business"      → both legs must have ab >= min_seats
       - "business_plus"  → both legs must have (ab >= min_seats OR ap >= min_seats)
       - "all"            → both legs must have (ag >= min_seats OR ap >= min_seats OR ab >= min_seats)
-    Returns {"rows": [...], "total": int, "page": int, "per_page": int}.
+    Paginated like query_flights (same result keys, after/before cursors).
     """
     seat_out, seat_in = _weekend_cabin_clause(cabin, min_seats)
 
-    conditions = [
-        "inb.direction = 'inbound'",
-        "outb.direction = 'outbound'",
-        seat_out,
-        seat_in,
-        "strftime('%w', inb.date) IN ('6','0','1')",
-        "strftime('%w', outb.date) IN ('3','4','5')",
-        f"(julianday(inb.date) - julianday(outb.date)) BETWEEN {TRIP_DAYS_MIN} AND {TRIP_DAYS_MAX}",
-        "date(inb.date) BETWEEN date('now') AND date('now','+1 year')",
-    ]
+    # Pages run in outbound order: bound outbound as well (a trip lasts at most
+    # TRIP_DAYS_MAX days) and keep the inbound window off its index (unary +)
+    conditions = [seat_out, seat_in,
+                  f"outbound >= date('now', '-{int(TRIP_DAYS_MAX)} days')", "+" + _WEEKEND_WINDOW]
     params = []
 
     if countries:
         ph = ",".join("?" * len(countries))
-        conditions.append(f"inb.country_name IN ({ph})")
+        conditions.append(f"country_name IN ({ph})")
         params.extend(countries)
     if origin:
-        conditions.append("inb.origin = ?")
+        conditions.append("origin = ?")
         params.append(origin)
     if city:
-        conditions.append(
-            "(inb.city_name LIKE ? OR inb.airport_code LIKE ?)"
-        )
-        params.extend([f"%{city}%", f"%{city}%"])
+        cond, codes = _city_condition(city)
+        conditions.append(cond)
+        params.extend(codes)
 
-    where = " AND ".join(conditions)
-    conn = get_conn()
-    cur = conn.cursor()
+    cols = ["origin", "city_name", "airport_code", "country_name",
+            "outbound", "inbound",
+            "ag_out", "ap_out", "ab_out", "ag_in", "ap_in", "ab_in"]
+    return _paginate(
+        "weekend_pairs", cols, " AND ".join(conditions), params, _weekend_order(cabin),
+        page, per_page, after, before,
+    )
 
-    cur.execute(f"""
-        SELECT COUNT(*) FROM flights AS inb
-        JOIN flights AS outb
-          ON inb.airport_code = outb.airport_code AND inb.origin = outb.origin
-        WHERE {where}
-    """, params)
-    total = cur.fetchone()[0]
 
-    order = _weekend_order(cabin)
-    offset = (page - 1) * per_page
-    cur.execute(f"""
-        SELECT inb.origin, inb.city_name, inb.airport_code, inb.country_name,
-               outb.date AS outbound, inb.date AS inbound,
-               outb.ag AS ag_out, outb.ap AS ap_out, outb.ab AS ab_out,
-               inb.ag AS ag_in, inb.ap AS ap_in, inb.ab AS ab_in
-        FROM flights AS inb
-        JOIN flights AS outb
-          ON inb.airport_code = outb.airport_code AND inb.origin = outb.origin
-        WHERE {where}
-        ORDER BY {order}
-        LIMIT ? OFFSET ?
-    """, params + [per_page, offset])
+# Pairs whose return date is within the next year
+_WEEKEND_WINDOW = "inbound BETWEEN date('now') AND date('now','+1 year')"
 
-    rows = []
-    for r in cur.fetchall():
-        rows.append({
-            "origin": r[0], "city_name": r[1], "airport_code": r[2],
-            "country_name": r[3], "outbound": r[4], "inbound": r[5],
-            "ag_out": r[6], "ap_out": r[7], "ab_out": r[8],
-            "ag_in": r[9], "ap_in": r[10], "ab_in": r[11],
-        })
-    conn.close()
-    return {"rows": rows, "total": total, "page": page, "per_page": per_page}
+
+def _city_condition(city):
+    """Search text → `airport_code IN (...)` via the destination index (names, aliases, typos)."""
+    codes = destinations.resolve(DB_PATH, city)
+    if not codes:
+        return "0", []
+    return f"airport_code IN ({','.join('?' * len(codes))})", codes
 
 
 def _weekend_cabin_clause(cabin, min_seats):
     """Return (outbound_condition, inbound_condition) for weekend pair cabin filter."""
+    min_seats = int(min_seats)
     if cabin == "business":
-        return (f"outb.ab >= {min_seats}", f"inb.ab >= {min_seats}")
+        return (f"ab_out >= {min_seats}", f"ab_in >= {min_seats}")
     if cabin == "business_plus":
         return (
-            f"(outb.ab >= {min_seats} OR outb.ap >= {min_seats})",
-            f"(inb.ab >= {min_seats} OR inb.ap >= {min_seats})",
+            f"(ab_out >= {min_seats} OR ap_out >= {min_seats})",
+            f"(ab_in >= {min_seats} OR ap_in >= {min_seats})",
         )
     # "all" — any cabin
     return (
-        f"(outb.ag >= {min_seats} OR outb.ap >= {min_seats} OR outb.ab >= {min_seats})",
-        f"(inb.ag >= {min_seats} OR inb.ap >= {min_seats} OR inb.ab >= {min_seats})",
+        f"(ag_out >= {min_seats} OR ap_out >= {min_seats} OR ab_out >= {min_seats})",
+        f"(ag_in >= {min_seats} OR ap_in >= {min_seats} OR ab_in >= {min_seats})",
     )
 
 
+# Sort keys are ascending columns ending with the table's primary key, so
+# they are a total order and can serve as a page cursor. "Score DESC" is read
+# from a rank_* column holding the negated cabin score (schema migration 7),
+# and each key list matches an index a cursor seeks with one row-value
+# comparison instead of sorting every match.
+
 def _weekend_order(cabin):
     """Primary: outbound date (chronological). Tiebreak: inbound, then cabin score, then city."""
-    base = "outb.date ASC, inb.date ASC"
-    if cabin == "business":
-        return f"{base}, outb.ab + inb.ab DESC, inb.city_name COLLATE NOCASE"
-    if cabin == "business_plus":
-        return f"{base}, (outb.ab + outb.ap + inb.ab + inb.ap) DESC, inb.city_name COLLATE NOCASE"
-    return f"{base}, (outb.ab*3+outb.ap*2+outb.ag + inb.ab*3+inb.ap*2+inb.ag) DESC, inb.city_name COLLATE NOCASE"
+    rank = {"business": "rank_ab", "business_plus": "rank_plus"}.get(cabin, "rank_all")
+    return ["outbound", "inbound", rank, "city_name COLLATE NOCASE", "origin", "airport_code"]
 
 
 def _cabin_clause(cabin, min_seats):
+    """Return (seat_condition, sort_keys) for the flight list: best cabin score first."""
     if cabin == "business":
-        return (f"ab >= {min_seats}",
-                "ab DESC, date, origin, city_name COLLATE NOCASE")
-    if cabin == "plus":
-        return (f"(ap >= {min_seats} OR ab >= {min_seats})",
-                "ap + ab DESC, date, origin, city_name COLLATE NOCASE")
-    if cabin == "economy":
-        return (f"ag >= {min_seats}",
-                "ag DESC, date, origin, city_name COLLATE NOCASE")
-    return (f"(ag >= {min_seats} OR ap >= {min_seats} OR ab >= {min_seats})",
-            "(ab*3 + ap*2 + ag) DESC, date, origin, city_name COLLATE NOCASE")
+        seat_cond, rank = f"ab >= {min_seats}", "rank_ab"
+    elif cabin == "plus":
+        seat_cond, rank = f"(ap >= {min_seats} OR ab >= {min_seats})", "rank_plus"
+    elif cabin == "economy":
+        seat_cond, rank = f"ag >= {min_seats}", "rank_ag"
+    else:
+        seat_cond = f"(ag >= {min_seats} OR ap >= {min_seats} OR ab >= {min_seats})"
+        rank = "rank_all"
+    return seat_cond, [rank, "date", "origin", "city_name COLLATE NOCASE", "airport_code", "direction"]
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Pagination: keyset cursors + cached counts
+# ═══════════════════════════════════════════════════════════════════════════
+
+# Counts stop at this many rows; beyond it the UI shows "COUNT_CAP+"
+COUNT_CAP = 10000
+
+# (table, where, params, data stamp) -> (total, exact); older stamps age out of the LRU
+_counts = ResultCache(CACHE_SIZE)
+
+
+def _cached_count(cur, table, where, params):
+    """(total, exact) for a filter, counted once per data change and capped at COUNT_CAP."""
+    key = (table, where, tuple(params), _data_stamp(cur))
+    found, value = _counts.get(key)
+    if found:
+        return value
+    cur.execute(
+        f"SELECT COUNT(*) FROM (SELECT 1 FROM {table} WHERE {where} LIMIT ?)",
+        list(params) + [COUNT_CAP + 1],
+    )
+    n = cur.fetchone()[0]
+    total, exact = (n, True) if n <= COUNT_CAP else (COUNT_CAP, False)
+    _counts.put(key, (total, exact))
+    return total, exact
+
+
+def _encode_cursor(values):
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor, n_keys):
+    """Key values from a cursor, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != n_keys:
+        return None
+    return values
+
+
+def _keyset_condition(keys, values, backwards=False):
+    """Row-value WHERE clause for rows strictly after (or before) `values` in `keys` order."""
+    cols = ", ".join(keys)
+    marks = ", ".join("?" * len(keys))
+    return f"({cols}) {'<' if backwards else '>'} ({marks})", list(values)
+
+
+def _order_sql(keys, backwards=False):
+    return ", ".join(f"{col} {'DESC' if backwards else 'ASC'}" for col in keys)
+
+
+def _paginate(table, cols, where, params, keys, page=1, per_page=50, after="", before=""):
+    """
+    One page of `SELECT cols FROM table WHERE where` in `keys` order.
+    With an after/before cursor the page is found by seeking past the cursor's
+    sort key (cost independent of depth); otherwise page uses LIMIT/OFFSET.
+    """
+    page = max(int(page), 1)
+    after_vals = _decode_cursor(after, len(keys))
+    before_vals = None if after_vals else _decode_cursor(before, len(keys))
+    backwards = before_vals is not None
+    cursor_vals = before_vals if backwards else after_vals
+
+    conn = get_conn()
+    cur = conn.cursor()
+    total, total_exact = _cached_count(cur, table, where, params)
+
+    conditions, query_params = [where], list(params)
+    offset = 0
+    if cursor_vals is not None:
+        # Seek term first: the planner then ranges the sort-key index on the
+        # whole row value rather than on the leading date bound in `where`
+        seek, seek_params = _keyset_condition(keys, cursor_vals, backwards)
+        conditions.insert(0, seek)
+        query_params[:0] = seek_params
+    else:
+        offset = (page - 1) * per_page
+
+    key_cols = ", ".join(f"{col} AS _k{i}" for i, col in enumerate(keys))
+    cur.execute(f"""
+        SELECT {", ".join(cols)}, {key_cols}
+        FROM {table}
+        WHERE {" AND ".join(conditions)}
+        ORDER BY {_order_sql(keys, backwards)}
+        LIMIT ? OFFSET ?
+    """, query_params + [per_page + 1, offset])
+    fetched = cur.fetchall()
+    conn.close()
+
+    more = len(fetched) > per_page
+    fetched = fetched[:per_page]
+    if backwards:
+        fetched.reverse()
+    n = len(cols)
+    rows = [dict(zip(cols, r[:n])) for r in fetched]
+    first = _encode_cursor(fetched[0][n:]) if fetched else None
+    last = _encode_cursor(fetched[-1][n:]) if fetched else None
+    if backwards:
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = cursor_vals is not None or offset > 0, more
+    return {
+        "rows": rows, "total": total, "total_exact": total_exact,
+        "page": page, "per_page": per_page,
+        "next_cursor": last if has_next else None,
+        "prev_cursor": first if has_prev else None,
+    }
 
 
 # ═══════════════════════════════════════════════════════════════════════════
 # Route detail (generalized — works for any origin+dest+date)
 # ═══════════════════════════════════════════════════════════════════════════
 
+@cached
 def route_detail(origin, dest, date):
     conn = get_conn()
     cur = conn.cursor()
@@ -272,6 +499,7 @@ def route_detail(origin, dest, date):
 # Reports
 # ═══════════════════════════════════════════════════════════════════════════
 
+@cached
 def report_region(cabin="all", origin="", country="", min_seats=MIN_SEATS):
     """Countries aggregated with seat counts, grouped into regions."""
     conn = get_conn()
@@ -327,6 +555,7 @@ def report_region(cabin="all", origin="", country="", min_seats=MIN_SEATS):
     return {"chart": chart, "table": table}
 
 
+@cached
 def report_cities(countries=None, cabin="all", origin="", min_seats=MIN_SEATS):
     """Destinations ranked by total seat availability."""
     conn = get_conn()
@@ -376,18 +605,21 @@ def report_cities(countries=None, cabin="all", origin="", min_seats=MIN_SEATS):
     return {"chart": chart, "table": table}
 
 
+@cached
 def report_business(origin="", country="", min_seats=MIN_SEATS):
     """Business seats aggregated by date, split by origin."""
     conn = get_conn()
     cur = conn.cursor()
     origin_cond = "AND origin = ?" if origin else ""
     country_cond = "AND country_name = ?" if country else ""
-    params = [min_seats] + ([origin] if origin else []) + ([country] if country else [])
+    params = ([origin] if origin else []) + ([country] if country else [])
+    # Literal threshold so the partial index on ab >= MIN_SEATS can be used
+    min_seats = int(min_seats)
 
     cur.execute(f"""
         SELECT date, origin, SUM(ab) AS total_biz, COUNT(*) AS routes
         FROM flights
-        WHERE ab >= ? AND date >= date('now') {origin_cond} {country_cond}
+        WHERE ab >= {min_seats} AND date >= date('now') {origin_cond} {country_cond}
         GROUP BY date, origin ORDER BY date, origin
     """, params)
     rows = cur.fetchall()
@@ -409,7 +641,7 @@ def report_business(origin="", country="", min_seats=MIN_SEATS):
     cur.execute(f"""
         SELECT origin, city_name, airport_code, date, ab
         FROM flights
-        WHERE ab >= ? AND date >= date('now') {origin_cond} {country_cond}
+        WHERE ab >= {min_seats} AND date >= date('now') {origin_cond} {country_cond}
         ORDER BY date, origin, city_name COLLATE NOCASE LIMIT 200
     """, params)
     table = [
@@ -420,62 +652,48 @@ def report_business(origin="", country="", min_seats=MIN_SEATS):
     return {"chart": chart, "table": table}
 
 
+@cached
 def countries_with_weekend_pairs(origin="", cabin="all", min_seats=MIN_SEATS):
     """Country names that have at least one weekend pair for the given cabin/origin (for dropdown)."""
     seat_out, seat_in = _weekend_cabin_clause(cabin, min_seats)
     conn = get_conn()
     cur = conn.cursor()
-    origin_cond = "AND inb.origin = ?" if origin else ""
-    params = [TRIP_DAYS_MIN, TRIP_DAYS_MAX]
-    if origin:
-        params.append(origin)
+    origin_cond = "AND origin = ?" if origin else ""
+    params = [origin] if origin else []
     cur.execute(f"""
-        SELECT DISTINCT inb.country_name
-        FROM flights AS inb
-        JOIN flights AS outb
-          ON inb.airport_code = outb.airport_code AND inb.origin = outb.origin
-        WHERE inb.direction = 'inbound' AND outb.direction = 'outbound'
-          AND {seat_out} AND {seat_in}
-          AND strftime('%w', inb.date) IN ('6','0','1')
-          AND strftime('%w', outb.date) IN ('3','4','5')
-          AND (julianday(inb.date) - julianday(outb.date)) BETWEEN ? AND ?
-          AND date(inb.date) BETWEEN date('now') AND date('now','+1 year')
+        SELECT DISTINCT country_name
+        FROM weekend_pairs
+        WHERE {seat_out} AND {seat_in} AND {_WEEKEND_WINDOW}
           {origin_cond}
-        ORDER BY inb.country_name
+        ORDER BY country_name
     """, params)
     out = [r[0] for r in cur.fetchall()]
     conn.close()
     return out
 
 
+@cached
 def report_weekend(origin="", country="", min_seats=MIN_SEATS, cabin="all"):
     """Weekend pairs aggregated by city. cabin: all, business_plus, business."""
     seat_out, seat_in = _weekend_cabin_clause(cabin, min_seats)
     conn = get_conn()
     cur = conn.cursor()
-    origin_cond = "AND inb.origin = ?" if origin else ""
-    country_cond = "AND inb.country_name = ?" if country else ""
-    params = [TRIP_DAYS_MIN, TRIP_DAYS_MAX]
+    origin_cond = "AND origin = ?" if origin else ""
+    country_cond = "AND country_name = ?" if country else ""
+    params = []
     if origin:
         params.append(origin)
     if country:
         params.append(country)
 
     cur.execute(f"""
-        SELECT inb.origin, inb.city_name, inb.airport_code, inb.country_name,
+        SELECT origin, city_name, airport_code, country_name,
                COUNT(*) AS pairs,
-               MIN(outb.date) AS earliest, MAX(inb.date) AS latest
-        FROM flights AS inb
-        JOIN flights AS outb
-          ON inb.airport_code = outb.airport_code AND inb.origin = outb.origin
-        WHERE inb.direction = 'inbound' AND outb.direction = 'outbound'
-          AND {seat_out} AND {seat_in}
-          AND strftime('%w', inb.date) IN ('6','0','1')
-          AND strftime('%w', outb.date) IN ('3','4','5')
-          AND (julianday(inb.date) - julianday(outb.date)) BETWEEN ? AND ?
-          AND date(inb.date) BETWEEN date('now') AND date('now','+1 year')
+               MIN(outbound) AS earliest, MAX(inbound) AS latest
+        FROM weekend_pairs
+        WHERE {seat_out} AND {seat_in} AND {_WEEKEND_WINDOW}
           {origin_cond} {country_cond}
-        GROUP BY inb.origin, inb.city_name, inb.airport_code, inb.country_name
+        GROUP BY origin, city_name, airport_code, country_name
         ORDER BY pairs DESC
     """, params)
     table = [
@@ -503,51 +721,22 @@ def report_weekend(origin="", country="", min_seats=MIN_SEATS, cabin="all"):
     return {"chart": chart, "table": table, "summary": summary}
 
 
+@cached
 def report_new():
-    """New business flights since yesterday (from flight_history)."""
+    """New business flights since yesterday (from the flight_changes log)."""
     conn = get_conn()
     cur = conn.cursor()
 
-    cur.execute(
-        "SELECT name FROM sqlite_master "
-        "WHERE type='table' AND name='flight_history'"
-    )
-    if not cur.fetchone():
+    window = change_window(cur)
+    if not window:
         conn.close()
         return None
 
-    cur.execute(
-        "SELECT DISTINCT fetch_date FROM flight_history "
-        "ORDER BY fetch_date DESC LIMIT 2"
-    )
-    dates = [r[0] for r in cur.fetchall()]
-    if len(dates) < 2:
-        conn.close()
-        return None
-
-    latest, prev = dates[0], dates[1]
-    cur.execute("""
-        WITH t AS (
-            SELECT origin, airport_code, city_name, date, direction, ab
-            FROM flight_history
-            WHERE fetch_date = ? AND ab >= ?
-        ),
-        p AS (
-            SELECT origin, airport_code, date, direction
-            FROM flight_history
-            WHERE fetch_date = ? AND ab >= ?
-        )
-        SELECT t.origin, t.city_name, t.airport_code, t.date, t.direction, t.ab
-        FROM t LEFT JOIN p
-          ON p.origin = t.origin AND p.airport_code = t.airport_code
-             AND p.date = t.date AND p.direction = t.direction
-        WHERE p.airport_code IS NULL
-        ORDER BY t.ab DESC, t.date LIMIT 200
-    """, (latest, MIN_SEATS, prev, MIN_SEATS))
+    latest, prev = window
     table = [
         {"origin": r[0], "city": r[1], "code": r[2],
          "date": r[3], "direction": r[4], "ab": r[5]}
-        for r in cur.fetchall()
+        for r in new_seats(cur, latest, cabin="ab", limit=200)
     ]
 
     city_counts = {}
@@ -564,10 +753,106 @@ def report_new():
     return {"chart": chart, "table": table, "latest": latest, "prev": prev}
 
 
+# ═══════════════════════════════════════════════════════════════════════════
+# History (flight_versions) and change log (flight_changes),
+# both written by update_sas_awards.py
+# ═══════════════════════════════════════════════════════════════════════════
+
+def flights_as_of(fetch_date, origin="", airport_code=""):
+    """
+    Reconstruct the flights table as it was after the fetches of fetch_date
+    (YYYY-MM-DD), from the validity intervals in flight_versions.
+    """
+    conditions = [
+        "valid_from <= ?",
+        "(valid_to IS NULL OR valid_to > ?)",
+    ]
+    params = [fetch_date, fetch_date]
+    if origin:
+        conditions.append("origin = ?")
+        params.append(origin)
+    if airport_code:
+        conditions.append("airport_code = ?")
+        params.append(airport_code)
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT origin, airport_code, city_name, country_name,
+               direction, date, ag, ap, ab
+        FROM flight_versions
+        WHERE {" AND ".join(conditions)}
+        ORDER BY origin, airport_code, direction, date
+    """, params)
+    cols = ["origin", "airport_code", "city_name", "country_name",
+            "direction", "date", "ag", "ap", "ab"]
+    rows = [dict(zip(cols, r)) for r in cur.fetchall()]
+    conn.close()
+    return rows
+
+
+_CABIN_COLS = ("ag", "ap", "ab")
+
+
+def change_window(cur):
+    """(latest, prev) fetch dates from fetch_runs, or None with fewer than two."""
+    cur.execute(
+        "SELECT name FROM sqlite_master "
+        "WHERE type='table' AND name='fetch_runs'"
+    )
+    if not cur.fetchone():
+        return None
+    cur.execute(
+        "SELECT DISTINCT fetch_date FROM fetch_runs WHERE status = 'complete' "
+        "ORDER BY fetch_date DESC LIMIT 2"
+    )
+    dates = [r[0] for r in cur.fetchall()]
+    if len(dates) < 2:
+        return None
+    return dates[0], dates[1]
+
+
+def new_seats(cur, fetch_date, cabin="ab", min_seats=MIN_SEATS, direction="",
+              order="seats DESC, f.date", limit=None):
+    """
+    Flights that reached min_seats in `cabin` during the fetch day `fetch_date`.
+    Only that day's flight_changes rows are read: the first event per flight
+    holds its seats before the day, current seats come from flights.
+    Returns tuples (origin, city_name, airport_code, date, direction, seats).
+    """
+    if cabin not in _CABIN_COLS:
+        raise ValueError(f"Unknown cabin: {cabin}")
+    direction_cond = "AND direction = ?" if direction else ""
+    params = [fetch_date, cabin] + ([direction] if direction else [])
+    params += [min_seats, min_seats]
+    limit_sql = ""
+    if limit:
+        limit_sql = "LIMIT ?"
+        params.append(limit)
+    cur.execute(f"""
+        SELECT f.origin, f.city_name, f.airport_code, f.date, f.direction,
+               f.{cabin} AS seats
+        FROM (
+            SELECT origin, airport_code, direction, date, seats_before,
+                   MIN(change_id)
+            FROM flight_changes
+            WHERE fetch_date = ? AND cabin = ? {direction_cond}
+            GROUP BY origin, airport_code, direction, date
+        ) AS c
+        JOIN flights AS f
+          ON f.origin = c.origin AND f.airport_code = c.airport_code
+             AND f.direction = c.direction AND f.date = c.date
+        WHERE COALESCE(c.seats_before, 0) < ? AND f.{cabin} >= ?
+        ORDER BY {order}
+        {limit_sql}
+    """, params)
+    return cur.fetchall()
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 # Reports drill-down and calendar
 # ═══════════════════════════════════════════════════════════════════════════
 
+@cached
 def cities_for_country(country, cabin="all", origin="", min_seats=MIN_SEATS):
     """
     Cities in a single country for region-tab drill-down.
@@ -602,6 +887,7 @@ def cities_for_country(country, cabin="all", origin="", min_seats=MIN_SEATS):
     return {"table": table}
 
 
+@cached
 def calendar_availability(origin, airport_code, min_seats=MIN_SEATS):
     """
     Daily availability for origin → airport_code from today to +365 days.
@@ -626,37 +912,75 @@ def calendar_availability(origin, airport_code, min_seats=MIN_SEATS):
     return by_date
 
 
-def weekend_pairs_for_route(origin, airport_code, min_seats=MIN_SEATS, cabin="all"):
+@cached
+def weekend_pairs_for_route(origin, airport_code, min_seats=MIN_SEATS, cabin="all",
+                            trip_days=(TRIP_DAYS_MIN, TRIP_DAYS_MAX)):
     """
     Weekend pairs for a single route (origin → airport_code): outbound Wed/Thu/Fri,
-    return Sat/Sun/Mon, 3–4 days. cabin: all, business_plus, business.
+    return Sat/Sun/Mon, trip_days apart (default 3–4, read from weekend_pairs;
+    other windows come from the in-memory engine). cabin: all, business_plus, business.
     """
+    cols = ["outbound", "inbound",
+            "ab_out", "ap_out", "ag_out", "ab_in", "ap_in", "ag_in"]
+    if tuple(trip_days) != (TRIP_DAYS_MIN, TRIP_DAYS_MAX):
+        today = weekend_engine.utc_today()
+        rows = availability_matrix().pairs(
+            cabin=cabin, min_seats=min_seats, trip_days=tuple(trip_days),
+            from_date=today, to_date=today + datetime.timedelta(days=365),
+            route_filter=lambda o, code, *_: (o, code) == (origin, airport_code),
+        )
+        return [{c: r[c] for c in cols} for r in rows]
+
     seat_out, seat_in = _weekend_cabin_clause(cabin, min_seats)
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(f"""
-        SELECT outb.date AS outbound, inb.date AS inbound,
-               outb.ab AS ab_out, outb.ap AS ap_out, outb.ag AS ag_out,
-               inb.ab AS ab_in, inb.ap AS ap_in, inb.ag AS ag_in
-        FROM flights AS inb
-        JOIN flights AS outb
-          ON inb.airport_code = outb.airport_code AND inb.origin = outb.origin
-        WHERE inb.origin = ? AND inb.airport_code = ?
-          AND inb.direction = 'inbound' AND outb.direction = 'outbound'
+        SELECT outbound, inbound,
+               ab_out, ap_out, ag_out, ab_in, ap_in, ag_in
+        FROM weekend_pairs
+        WHERE origin = ? AND airport_code = ?
           AND {seat_out} AND {seat_in}
-          AND strftime('%w', inb.date) IN ('6','0','1')
-          AND strftime('%w', outb.date) IN ('3','4','5')
-          AND (julianday(inb.date) - julianday(outb.date)) BETWEEN ? AND ?
-          AND date(inb.date) BETWEEN date('now') AND date('now','+365 days')
-        ORDER BY outb.date, inb.date
-    """, (origin, airport_code, TRIP_DAYS_MIN, TRIP_DAYS_MAX))
-    rows = [
-        {
-            "outbound": r[0], "inbound": r[1],
-            "ab_out": r[2], "ap_out": r[3], "ag_out": r[4],
-            "ab_in": r[5], "ap_in": r[6], "ag_in": r[7],
-        }
-        for r in cur.fetchall()
-    ]
+          AND inbound BETWEEN date('now') AND date('now','+365 days')
+        ORDER BY outbound, inbound
+    """, (origin, airport_code))
+    rows = [dict(zip(cols, r)) for r in cur.fetchall()]
     conn.close()
     return rows
+
+
+@cached
+def weekend_pairs_window(trip_days, countries=None, cabin="all", origin="",
+                         min_seats=MIN_SEATS, city="", limit=500):
+    """
+    query_weekend_pairs rows for any trip length (e.g. (5, 7)), computed by
+    weekend_engine from the in-memory availability matrix instead of SQL.
+    """
+    countries = set(countries or ())
+    codes = set(destinations.resolve(DB_PATH, city)) if city else None
+
+    def route_filter(o, code, city_name, country):
+        return ((not origin or o == origin)
+                and (not countries or country in countries)
+                and (codes is None or code in codes))
+
+    rows = availability_matrix().pairs(
+        cabin=cabin, min_seats=min_seats, trip_days=tuple(trip_days), route_filter=route_filter,
+    )
+    return rows[:limit]
+
+
+# (data stamp, AvailabilityMatrix) — flights loaded once per data version
+_matrix = (None, None)
+_matrix_lock = threading.Lock()
+
+
+def availability_matrix():
+    """All flights as a weekend_engine.AvailabilityMatrix, reloaded after each refresh."""
+    global _matrix
+    stamp = _data_stamp()
+    with _matrix_lock:
+        if _matrix[0] != stamp:
+            conn = get_conn()
+            _matrix = (stamp, weekend_engine.AvailabilityMatrix.load(conn))
+            conn.close()
+        return _matrix[1]
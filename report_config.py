@@ -1,5 +1,5 @@
 """
-Report filter constants – used by weekend bot, split_weekend_trips, and daily reports.
+Report filter constants – used by weekend bot, split_weekend_trips.py, and daily reports.
 Adjust these to change what qualifies as "bookable" for your needs.
 """
 # Minimum seats required (2 = couples/friends traveling together)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Daily CSV reports in one run.
+
+    python reports.py                      # every report
+    python reports.py business_by_date     # just some
+    python reports.py --list
+
+Each report is a task registered with @report. All tasks read the same
+snapshot: one read-only connection per task, each in a read transaction
+opened together and checked against the same data_version, so a fetch that
+commits mid-run cannot make two reports disagree. Tasks run on a thread pool
+(sqlite3 releases the GIL while a query runs) and write rows to disk as the
+cursor yields them. A timing summary is printed at the end.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import db
+import queries
+import schema
+import split_weekend_trips
+from report_config import MIN_SEATS
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+DB_FILE = os.path.expanduser(os.environ.get("SAS_DB_PATH", "~/sas_awards/sas_awards.sqlite"))
+OUT_DIR = os.path.expanduser(os.environ.get("SAS_REPORTS_DIR", "~/OneDrive/SASReports"))
+WORKERS = int(os.environ.get("SAS_REPORT_WORKERS", "4"))
+SNAPSHOT_RETRIES = 3
+# ─────────────────────────────────────────────────────────────────────────────
+
+PLUS_EUROPE_COUNTRIES = (
+    "Österrike", "Belgien", "Danmark", "Frankrike", "Tyskland",
+    "Irland", "Italien", "Nederländerna", "Norge",
+    "Portugal", "Spanien", "Sverige", "Schweiz", "Storbritannien",
+)
+
+REPORTS = {}   # name -> (output name template, function)
+
+
+class Skip(Exception):
+    """A report has nothing to write today (e.g. not enough fetch history)."""
+
+
+def report(name, output):
+    """
+    Register fn(snapshot, conn, path) -> rows written. `output` is a file name
+    under the reports directory, or an absolute path; {today} and {db_dir}
+    are filled in.
+    """
+    def register(fn):
+        REPORTS[name] = (output, fn)
+        return fn
+    return register
+
+
+class Snapshot:
+    """Values every task shares, read once: data version, fetch window, report date."""
+
+    def __init__(self, version, window, today):
+        self.version = version
+        self.window = window
+        self.today = today
+
+    @classmethod
+    def open(cls, path, n):
+        """
+        (Snapshot, [n connections]) with all connections inside the same read snapshot.
+        The fetcher commits each refresh in one transaction with its data_version
+        bump, so connections that read the same version see the same data.
+        """
+        pool = db.pool(path)
+        for _ in range(SNAPSHOT_RETRIES):
+            conns = [pool.acquire() for _ in range(n)]
+            versions = set()
+            for conn in conns:
+                conn.execute("BEGIN")
+                versions.add(schema.data_version(conn))   # first read pins the WAL snapshot
+            if len(versions) == 1:
+                window = queries.change_window(conns[0].cursor())
+                return cls(versions.pop(), window, date.today().isoformat()), conns
+            # A refresh committed while the transactions were opening
+            for conn in conns:
+                conn.close()
+        raise RuntimeError("database kept changing while opening the report snapshot")
+
+
+def _write_csv(path, sections):
+    """sections: [(title row or None, header, rows iterable)], separated by a blank row."""
+    n = 0
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        for i, (title, header, rows) in enumerate(sections):
+            if i:
+                w.writerow([])
+            if title:
+                w.writerow(title)
+            w.writerow(header)
+            for row in rows:
+                w.writerow(row)
+                n += 1
+    return n
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Reports
+# ═══════════════════════════════════════════════════════════════════════════
+
+@report("new_business", "daily_new_business_us_{today}.csv")
+def new_business(snap, conn, path):
+    """New business flights at the last fetch (was daily_new_business_report.py)."""
+    if not snap.window:
+        raise Skip("not enough history yet (need 2 distinct fetch_date runs)")
+    latest, prev = snap.window
+    cur = conn.cursor()
+
+    def rows(direction):
+        for origin, city, code, d, _, seats in queries.new_seats(
+            cur, latest, cabin="ab", min_seats=MIN_SEATS, direction=direction,
+            order="f.origin, f.city_name COLLATE NOCASE, f.date",
+        ):
+            yield origin, city, code, d, seats
+
+    header = ["origin", "city_name", "airport_code", "date", "business_seats"]
+    return _write_csv(path, [
+        (["Outbound Business (NEW since", prev, "->", latest, f", >={MIN_SEATS} seats)"], header, rows("outbound")),
+        (["Inbound Business (NEW since", prev, "->", latest, f", >={MIN_SEATS} seats)"], header, rows("inbound")),
+    ])
+
+
+@report("business_by_date", "business_by_date_{today}.csv")
+def business_by_date(snap, conn, path):
+    """Business seats per flight date (was daily_business_by_date.sh)."""
+    def rows(direction):
+        return conn.execute("""
+            SELECT origin, city_name, airport_code, date, SUM(ab)
+            FROM flights
+            WHERE ab >= ? AND direction = ?
+            GROUP BY origin, city_name, airport_code, date
+            ORDER BY origin, city_name COLLATE NOCASE, date
+        """, (MIN_SEATS, direction))
+
+    header = ["Origin", "City", "Code", "Date", "Business_Seats"]
+    return _write_csv(path, [
+        ([f"Outbound Business (min {MIN_SEATS} seats)"], header, rows("outbound")),
+        ([f"Inbound Business (min {MIN_SEATS} seats)"], header, rows("inbound")),
+    ])
+
+
+@report("plus_europe_by_city", "plus_europe_by_city_{today}.csv")
+def plus_europe_by_city(snap, conn, path):
+    """Plus seats to European countries (was daily_plus_europe.sh)."""
+    ph = ", ".join("?" * len(PLUS_EUROPE_COUNTRIES))
+    rows = conn.execute(f"""
+        SELECT origin, city_name, airport_code, date, direction, SUM(ap)
+        FROM flights
+        WHERE ap >= ? AND country_name IN ({ph})
+        GROUP BY origin, city_name, airport_code, date, direction
+        ORDER BY origin, city_name COLLATE NOCASE, date, direction
+    """, (MIN_SEATS,) + PLUS_EUROPE_COUNTRIES)
+    return _write_csv(path, [
+        (None, ["Origin", "City", "Code", "Date", "Direction", "Plus_Seats"], rows),
+    ])
+
+
+@report("weekend_trips", os.path.join("{db_dir}", "reports", "weekend_trips"))
+def weekend_trips(snap, conn, path):
+    """Per-city weekend pair CSVs (split_weekend_trips.py); path is a directory."""
+    return sum(n for _, n in split_weekend_trips.export(conn, path))
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Runner
+# ═══════════════════════════════════════════════════════════════════════════
+
+def output_path(name, snap, out_dir=OUT_DIR, db_path=DB_FILE):
+    output = REPORTS[name][0].format(today=snap.today, db_dir=os.path.dirname(os.path.abspath(db_path)))
+    return output if os.path.isabs(output) else os.path.join(out_dir, output)
+
+
+def _run_one(name, snap, conn, path):
+    start = time.perf_counter()
+    try:
+        rows = REPORTS[name][1](snap, conn, path)
+        status = "ok"
+    except Skip as e:
+        rows, status = 0, f"skipped: {e}"
+    except Exception as e:
+        rows, status = 0, f"failed: {e!r}"
+    finally:
+        conn.close()
+    return {"name": name, "path": path, "rows": rows, "status": status,
+            "seconds": time.perf_counter() - start}
+
+
+def run(names=None, db_path=DB_FILE, out_dir=OUT_DIR, workers=WORKERS):
+    """Run the named reports (default: all) in parallel; returns one result dict per report."""
+    names = list(names or REPORTS)
+    unknown = [n for n in names if n not in REPORTS]
+    if unknown:
+        raise ValueError(f"Unknown report(s): {', '.join(unknown)}")
+    os.makedirs(out_dir, exist_ok=True)
+    snap, conns = Snapshot.open(db_path, len(names))
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="report") as ex:
+        futures = [
+            ex.submit(_run_one, name, snap, conn, output_path(name, snap, out_dir, db_path))
+            for name, conn in zip(names, conns)
+        ]
+        return [f.result() for f in futures]
+
+
+def print_summary(results, wall, out=sys.stdout):
+    print(f"{'report':<22}{'rows':>8}{'time':>10}  status / output", file=out)
+    for r in sorted(results, key=lambda r: -r["seconds"]):
+        detail = r["path"] if r["status"] == "ok" else r["status"]
+        print(f"{r['name']:<22}{r['rows']:>8}{r['seconds'] * 1000:>8.0f}ms  {detail}", file=out)
+    print(f"{'total (wall)':<22}{sum(r['rows'] for r in results):>8}{wall * 1000:>8.0f}ms", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the daily CSV reports from one DB snapshot.")
+    parser.add_argument("reports", nargs="*", help="report names (default: all)")
+    parser.add_argument("--out-dir", default=OUT_DIR, help=f"CSV directory (default: {OUT_DIR})")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="parallel report tasks")
+    parser.add_argument("--list", action="store_true", help="list reports and exit")
+    parser.add_argument("--strict", action="store_true",
+                        help="exit 1 if a report is skipped (e.g. not enough history yet), not only if one fails")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (output, fn) in REPORTS.items():
+            print(f"{name:<22}{fn.__doc__}")
+        return
+    unknown = [n for n in args.reports if n not in REPORTS]
+    if unknown:
+        parser.error(f"unknown report(s): {', '.join(unknown)} (see --list)")
+    if not os.path.exists(DB_FILE):
+        print(f"DB not found: {DB_FILE}", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    results = run(args.reports, out_dir=args.out_dir, workers=args.workers)
+    print_summary(results, time.perf_counter() - start)
+    bad = ("failed", "skipped") if args.strict else ("failed",)
+    if any(r["status"].startswith(bad) for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
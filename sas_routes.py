@@ -0,0 +1,105 @@
+"""
+Proxy for the SAS routes/v1 API (per-flight departure/arrival times).
+
+Used by the dashboard's /api/routes and /api/weekend-routes. Lookups go
+through one keep-alive session, are cached for ROUTES_TTL seconds per
+(origin, destination, date), and concurrent identical lookups share a single
+upstream request. fetch_legs() fetches several legs in parallel.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+SAS_API_BASE = os.environ.get("SAS_API_BASE", "https://www.sas.se/bff/award-finder").rstrip("/")
+ROUTES_API   = f"{SAS_API_BASE}/routes/v1"
+MARKET       = "se-sv"
+TIMEOUT      = 15
+ROUTES_TTL   = float(os.environ.get("SAS_ROUTES_TTL", "600"))       # seconds
+CACHE_MAX    = int(os.environ.get("SAS_ROUTES_CACHE_SIZE", "2048"))  # cached lookups
+WORKERS      = int(os.environ.get("SAS_ROUTES_WORKERS", "8"))
+
+
+def make_session(pool_size=WORKERS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_session = make_session()
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="sas-routes")
+_lock = threading.Lock()
+_cache = {}      # (origin, dest, date) -> (expires_at, data); insertion order = age
+_inflight = {}   # (origin, dest, date) -> Future of the upstream request
+stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+
+def _fetch(origin, dest, date):
+    r = _session.get(ROUTES_API, params={
+        "market": MARKET, "origin": origin, "destination": dest,
+        "departureDate": date, "direct": "false",
+    }, timeout=TIMEOUT)
+    r.raise_for_status()
+    return r.json()
+
+
+def get_routes(origin, dest, date):
+    """Raw routes/v1 body for one leg; raises on upstream errors (which are not cached)."""
+    key = (origin, dest, date)
+    with _lock:
+        hit = _cache.get(key)
+        if hit and hit[0] > time.monotonic():
+            stats["hits"] += 1
+            return hit[1]
+        fut = _inflight.get(key)
+        owner = fut is None
+        if owner:
+            fut = _inflight[key] = Future()
+            stats["misses"] += 1
+        else:
+            stats["coalesced"] += 1
+    if not owner:
+        return fut.result()
+
+    try:
+        data = _fetch(origin, dest, date)
+    except Exception as e:
+        with _lock:
+            stats["errors"] += 1
+            del _inflight[key]
+        fut.set_exception(e)
+        raise
+    with _lock:
+        _cache.pop(key, None)
+        _cache[key] = (time.monotonic() + ROUTES_TTL, data)
+        while len(_cache) > CACHE_MAX:
+            del _cache[next(iter(_cache))]
+        del _inflight[key]
+    fut.set_result(data)
+    return data
+
+
+def get_routes_or_error(origin, dest, date):
+    """Like get_routes, but returns {"_error": message} instead of raising."""
+    try:
+        return get_routes(origin, dest, date)
+    except Exception as e:
+        return {"_error": str(e)}
+
+
+def fetch_legs(legs):
+    """Fetch [(origin, dest, date), ...] in parallel; results (or {"_error"}) in the same order."""
+    futures = [_executor.submit(get_routes_or_error, *leg) for leg in legs]
+    return [f.result() for f in futures]
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+        for k in stats:
+            stats[k] = 0
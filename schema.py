@@ -0,0 +1,196 @@
+"""
+Versioned schema migrations for the SAS Awards database.
+The applied version is kept in PRAGMA user_version; update_sas_awards.connect_db()
+and queries.get_conn() both call migrate(), so readers and the fetcher agree on
+the schema whichever runs first.
+"""
+from report_config import MIN_SEATS, TRIP_DAYS_MIN, TRIP_DAYS_MAX
+
+# Every outbound Wed/Thu/Fri + inbound Sat/Sun/Mon combination of one route,
+# TRIP_DAYS_MIN–TRIP_DAYS_MAX days apart, with both legs' seats. Cabin
+# thresholds and the "from today" window are applied by the readers.
+WEEKEND_PAIRS_INSERT = f"""
+    INSERT INTO weekend_pairs (
+      origin, airport_code, city_name, country_name,
+      outbound, inbound, out_weekday, in_weekday, trip_days,
+      ag_out, ap_out, ab_out, ag_in, ap_in, ab_in
+    )
+    SELECT inb.origin, inb.airport_code, inb.city_name, inb.country_name,
+           outb.date, inb.date,
+           CAST(strftime('%w', outb.date) AS INTEGER),
+           CAST(strftime('%w', inb.date) AS INTEGER),
+           CAST(julianday(inb.date) - julianday(outb.date) AS INTEGER),
+           outb.ag, outb.ap, outb.ab, inb.ag, inb.ap, inb.ab
+    FROM flights AS inb
+    JOIN flights AS outb
+      ON outb.origin = inb.origin AND outb.airport_code = inb.airport_code
+     AND outb.direction = 'outbound'
+     AND outb.date BETWEEN date(inb.date, '-{int(TRIP_DAYS_MAX)} days')
+                       AND date(inb.date, '-{int(TRIP_DAYS_MIN)} days')
+    WHERE inb.direction = 'inbound'
+      AND strftime('%w', inb.date) IN ('6','0','1')
+      AND strftime('%w', outb.date) IN ('3','4','5')
+"""
+
+# (version, description, statements) — append only, never edit a shipped step
+MIGRATIONS = [
+    (1, "flights table", [
+        """
+        CREATE TABLE IF NOT EXISTS flights (
+          origin       TEXT,
+          airport_code TEXT,
+          city_name    TEXT,
+          country_name TEXT,
+          direction    TEXT,
+          date         TEXT,
+          total        INTEGER,
+          ag           INTEGER,
+          ap           INTEGER,
+          ab           INTEGER,
+          PRIMARY KEY (origin, airport_code, direction, date)
+        )
+        """,
+    ]),
+    (2, "indexes for dashboard, report and weekend-pair access paths", [
+        # weekend pairs: inbound/outbound legs by date; the partner leg is then
+        # found through the primary key (origin, airport_code, direction, date)
+        "CREATE INDEX IF NOT EXISTS idx_flights_direction_date ON flights (direction, date)",
+        # region / country filters with date >= date('now')
+        "CREATE INDEX IF NOT EXISTS idx_flights_country_date ON flights (country_name, date)",
+        # cabin filters; only used when the query has the literal same threshold
+        f"CREATE INDEX IF NOT EXISTS idx_flights_ab_date ON flights (date) WHERE ab >= {MIN_SEATS}",
+        f"CREATE INDEX IF NOT EXISTS idx_flights_ap_date ON flights (date) WHERE ap >= {MIN_SEATS}",
+        f"CREATE INDEX IF NOT EXISTS idx_flights_ag_date ON flights (date) WHERE ag >= {MIN_SEATS}",
+    ]),
+    (3, "weekend_pairs: materialized outbound x inbound weekend combinations", [
+        """
+        CREATE TABLE IF NOT EXISTS weekend_pairs (
+          origin       TEXT,
+          airport_code TEXT,
+          city_name    TEXT,
+          country_name TEXT,
+          outbound     TEXT,
+          inbound      TEXT,
+          out_weekday  INTEGER,   -- strftime('%w'): 0 = Sunday
+          in_weekday   INTEGER,
+          trip_days    INTEGER,
+          ag_out       INTEGER,
+          ap_out       INTEGER,
+          ab_out       INTEGER,
+          ag_in        INTEGER,
+          ap_in        INTEGER,
+          ab_in        INTEGER,
+          PRIMARY KEY (origin, airport_code, outbound, inbound)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_weekend_pairs_inbound ON weekend_pairs (inbound)",
+        "CREATE INDEX IF NOT EXISTS idx_weekend_pairs_country ON weekend_pairs (country_name, inbound)",
+        "CREATE INDEX IF NOT EXISTS idx_weekend_pairs_city ON weekend_pairs (city_name COLLATE NOCASE, inbound)",
+        "DELETE FROM weekend_pairs",
+        WEEKEND_PAIRS_INSERT,
+    ]),
+    (4, "data_version: refresh counter for reader caches", [
+        """
+        CREATE TABLE IF NOT EXISTS data_version (
+          id         INTEGER PRIMARY KEY CHECK (id = 1),
+          version    INTEGER NOT NULL,
+          updated_at TEXT NOT NULL      -- UTC, ISO 8601
+        )
+        """,
+        "INSERT OR IGNORE INTO data_version VALUES (1, 1, strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))",
+    ]),
+    (5, "airport_code lookups for city search (codes resolved by destinations.py)", [
+        "CREATE INDEX IF NOT EXISTS idx_flights_code_date ON flights (airport_code, date)",
+        "CREATE INDEX IF NOT EXISTS idx_weekend_pairs_code ON weekend_pairs (airport_code, inbound)",
+    ]),
+    (6, "page-order indexes: list sort keys, so cursors seek instead of sorting", [
+        "CREATE INDEX IF NOT EXISTS idx_flights_date_key ON flights (date, origin, airport_code, direction)",
+        # cabin filters keep their names; the key columns let a cabin page seek too
+        "DROP INDEX IF EXISTS idx_flights_ab_date",
+        "DROP INDEX IF EXISTS idx_flights_ap_date",
+        "DROP INDEX IF EXISTS idx_flights_ag_date",
+        f"CREATE INDEX IF NOT EXISTS idx_flights_ab_date ON flights (date, origin, airport_code, direction) WHERE ab >= {MIN_SEATS}",
+        f"CREATE INDEX IF NOT EXISTS idx_flights_ap_date ON flights (date, origin, airport_code, direction) WHERE ap >= {MIN_SEATS}",
+        f"CREATE INDEX IF NOT EXISTS idx_flights_ag_date ON flights (date, origin, airport_code, direction) WHERE ag >= {MIN_SEATS}",
+        "CREATE INDEX IF NOT EXISTS idx_weekend_pairs_outbound ON weekend_pairs (outbound, inbound, origin, airport_code)",
+    ]),
+    (7, "seat-ranked list order: negated cabin scores, indexed in page order", [
+        # rank_* = -(cabin score), so "score DESC" is an ascending key and the
+        # whole sort key can be one row-value seek (see queries._cabin_clause)
+        "ALTER TABLE flights ADD COLUMN rank_ab INTEGER GENERATED ALWAYS AS (-ab) VIRTUAL",
+        "ALTER TABLE flights ADD COLUMN rank_plus INTEGER GENERATED ALWAYS AS (-(ap + ab)) VIRTUAL",
+        "ALTER TABLE flights ADD COLUMN rank_ag INTEGER GENERATED ALWAYS AS (-ag) VIRTUAL",
+        "ALTER TABLE flights ADD COLUMN rank_all INTEGER GENERATED ALWAYS AS (-(ab*3 + ap*2 + ag)) VIRTUAL",
+        *(f"CREATE INDEX IF NOT EXISTS idx_flights_{rank} ON flights "
+          f"({rank}, date, origin, city_name COLLATE NOCASE, airport_code, direction)"
+          for rank in ("rank_ab", "rank_plus", "rank_ag", "rank_all")),
+        "ALTER TABLE weekend_pairs ADD COLUMN rank_ab INTEGER GENERATED ALWAYS AS (-(ab_out + ab_in)) VIRTUAL",
+        "ALTER TABLE weekend_pairs ADD COLUMN rank_plus INTEGER "
+        "GENERATED ALWAYS AS (-(ab_out + ap_out + ab_in + ap_in)) VIRTUAL",
+        "ALTER TABLE weekend_pairs ADD COLUMN rank_all INTEGER "
+        "GENERATED ALWAYS AS (-(ab_out*3 + ap_out*2 + ag_out + ab_in*3 + ap_in*2 + ag_in)) VIRTUAL",
+        *(f"CREATE INDEX IF NOT EXISTS idx_weekend_pairs_{rank} ON weekend_pairs "
+          f"(outbound, inbound, {rank}, city_name COLLATE NOCASE, origin, airport_code)"
+          for rank in ("rank_ab", "rank_plus", "rank_all")),
+        # replaced by the ranked indexes above
+        "DROP INDEX IF EXISTS idx_flights_date_key",
+        "DROP INDEX IF EXISTS idx_weekend_pairs_outbound",
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def rebuild_weekend_pairs(conn, commit=True):
+    """Recompute weekend_pairs from flights (run by the fetcher after each refresh)."""
+    cur = conn.cursor()
+    cur.execute("DELETE FROM weekend_pairs")
+    cur.execute(WEEKEND_PAIRS_INSERT)
+    if commit:
+        conn.commit()
+    return cur.rowcount
+
+
+def data_version(conn):
+    """(version, updated_at) of the flights data; readers key their caches on it."""
+    row = conn.execute("SELECT version, updated_at FROM data_version WHERE id = 1").fetchone()
+    return tuple(row) if row else (0, None)
+
+
+def bump_data_version(conn, commit=True):
+    """
+    Mark a completed refresh. The fetcher bumps inside the refresh's own
+    transaction (commit=False), so one version always names one set of data.
+    """
+    conn.execute("""
+        UPDATE data_version
+        SET version = version + 1, updated_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now')
+        WHERE id = 1
+    """)
+    if commit:
+        conn.commit()
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Apply pending migrations in one write transaction. Returns the new version."""
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return SCHEMA_VERSION
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-read under the write lock: another process may have migrated meanwhile
+        current = schema_version(conn)
+        for version, _, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            for sql in statements:
+                conn.execute(sql)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return SCHEMA_VERSION
@@ -6,6 +6,7 @@ Run after update_sas_awards.py and report scripts (e.g. via cron 06:20).
 """
 import os
 import sys
+import time
 
 # Load .env when run from cron (WorkingDirectory = project root)
 try:
@@ -14,151 +15,148 @@ try:
 except ImportError:
     pass
 
-import sqlite3
 import requests
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import db
+import queries
+import weekend_engine
+
 DB_PATH = os.path.expanduser(os.environ.get("SAS_DB_PATH", "~/sas_awards/sas_awards.sqlite"))
 TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "")
 CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID", "")
 MAX_LEN = 4000  # Telegram limit 4096, leave margin
 
 MIN_SEATS = 2
-TRIP_DAYS_MIN, TRIP_DAYS_MAX = 3, 4
 
 # Long-haul = Asia + North America (Swedish country names from SAS API)
 LONG_HAUL_COUNTRIES = ("USA", "Kanada", "Japan", "Korea", "Indien", "Thailand", "Förenade arabemiraten")
 
 
 def get_conn():
-    return sqlite3.connect(DB_PATH)
-
-
-def summary_counts(conn):
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT origin, direction, COUNT(*) FROM flights
-        WHERE ab >= ? OR ap >= ? OR ag >= ?
-        GROUP BY origin, direction
-    """, (MIN_SEATS, MIN_SEATS, MIN_SEATS))
-    rows = cur.fetchall()
-    return rows
-
-
-def top_business(conn, n=10):
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT origin, city_name, airport_code, date, direction, ab
-        FROM flights
-        WHERE ab >= ?
-        ORDER BY ab DESC, date
-        LIMIT ?
-    """, (MIN_SEATS, n))
-    return cur.fetchall()
-
-
-def new_since_yesterday(conn, n=10):
-    """New business flights since previous fetch_date (if flight_history exists)."""
-    cur = conn.cursor()
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='flight_history'")
-    if not cur.fetchone():
-        return []
-    cur.execute("""
-        SELECT DISTINCT fetch_date FROM flight_history ORDER BY fetch_date DESC LIMIT 2
-    """)
-    dates = [r[0] for r in cur.fetchall()]
-    if len(dates) < 2:
-        return []
-    latest, prev = dates[0], dates[1]
-    cur.execute("""
-        WITH t AS (
-            SELECT origin, airport_code, city_name, date, direction, ab FROM flight_history
-            WHERE fetch_date = ? AND ab >= ? AND direction = 'outbound'
-        ),
-        p AS (
-            SELECT origin, airport_code, date FROM flight_history
-            WHERE fetch_date = ? AND ab >= ? AND direction = 'outbound'
-        )
-        SELECT t.origin, t.city_name, t.airport_code, t.date, t.ab FROM t
-        LEFT JOIN p ON p.origin = t.origin AND p.airport_code = t.airport_code AND p.date = t.date
-        WHERE p.airport_code IS NULL
-        ORDER BY t.ab DESC, t.date LIMIT ?
-    """, (latest, MIN_SEATS, prev, MIN_SEATS, n))
-    return cur.fetchall()
-
-
-def new_longhaul_business_weekend_pairs(conn):
+    return db.reader(DB_PATH)
+
+
+class ReportData:
+    """
+    Everything the report needs, read in one short snapshot: all flights rows
+    and the legs that newly reached MIN_SEATS business at the last fetch.
+    Sections are then computed in memory; `timings` records each step.
+    """
+
+    def __init__(self, flights, new_legs):
+        self.flights = flights        # (origin, code, city, country, direction, date, ag, ap, ab)
+        self.new_legs = new_legs      # new_seats rows: (origin, city, code, date, direction, seats)
+        self.timings = {}
+        self._pairs = None
+
+    @classmethod
+    def load(cls, conn):
+        start = time.perf_counter()
+        cur = conn.cursor()
+        cur.execute("BEGIN")   # one consistent snapshot, released right after
+        try:
+            cur.execute("""
+                SELECT origin, airport_code, city_name, country_name, direction, date, ag, ap, ab
+                FROM flights
+            """)
+            flights = cur.fetchall()
+            window = queries.change_window(cur)
+            new_legs = queries.new_seats(
+                cur, window[0], cabin="ab", min_seats=MIN_SEATS,
+            ) if window else []
+        finally:
+            conn.rollback()
+        data = cls(flights, new_legs)
+        data.timings["load"] = time.perf_counter() - start
+        return data
+
+    def timed(self, name, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(self, *args)
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def weekend_pairs(self):
+        """All current weekend pairs (any seats; sections apply their own thresholds), computed once."""
+        if self._pairs is None:
+            start = time.perf_counter()
+            matrix = weekend_engine.AvailabilityMatrix.from_rows(
+                [(o, code, city, country, d, date, ag, ap, ab)
+                 for o, code, city, country, d, date, ag, ap, ab in self.flights]
+            )
+            self._pairs = matrix.pairs(cabin="all", min_seats=0)
+            self.timings["weekend_pairs"] = time.perf_counter() - start
+        return self._pairs
+
+
+def summary_counts(data):
+    counts = {}
+    for origin, _, _, _, direction, _, ag, ap, ab in data.flights:
+        if ab >= MIN_SEATS or ap >= MIN_SEATS or ag >= MIN_SEATS:
+            counts[(origin, direction)] = counts.get((origin, direction), 0) + 1
+    return [(origin, direction, n) for (origin, direction), n in sorted(counts.items())]
+
+
+def top_business(data, n=10):
+    rows = [
+        (origin, city, code, date, direction, ab)
+        for origin, code, city, _, direction, date, _, _, ab in data.flights
+        if ab >= MIN_SEATS
+    ]
+    rows.sort(key=lambda r: (-r[5], r[3]))
+    return rows[:n]
+
+
+def new_since_yesterday(data, n=10):
+    """New outbound business flights since previous fetch_date (from flight_changes)."""
+    return [
+        (origin, city, code, date, ab)
+        for origin, city, code, date, direction, ab in data.new_legs
+        if direction == "outbound"
+    ][:n]
+
+
+def new_longhaul_business_weekend_pairs(data):
     """New long-haul (Asia/N America) weekend pairs in Business (≥2 seats) since prev fetch."""
-    cur = conn.cursor()
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='flight_history'")
-    if not cur.fetchone():
-        return []
-    cur.execute("SELECT DISTINCT fetch_date FROM flight_history ORDER BY fetch_date DESC LIMIT 2")
-    dates = [r[0] for r in cur.fetchall()]
-    if len(dates) < 2:
+    # Legs that reached MIN_SEATS business today; every other current leg already qualified yesterday
+    new_legs = {
+        (origin, code, direction, date)
+        for origin, _, code, date, direction, _ in data.new_legs
+    }
+    if not new_legs:
         return []
-    latest, prev = dates[0], dates[1]
-    ph = ", ".join("?" * len(LONG_HAUL_COUNTRIES))
-    # Current pairs from flights
-    cur.execute(f"""
-        SELECT inb.origin, inb.airport_code, inb.city_name, outb.date, inb.date, outb.ab, inb.ab
-        FROM flights AS inb
-        JOIN flights AS outb
-          ON inb.airport_code = outb.airport_code AND inb.origin = outb.origin
-        WHERE inb.direction = 'inbound' AND outb.direction = 'outbound'
-          AND inb.ab >= ? AND outb.ab >= ?
-          AND inb.country_name IN ({ph})
-          AND strftime('%w', inb.date) IN ('6','0','1')
-          AND strftime('%w', outb.date) IN ('3','4','5')
-          AND (julianday(inb.date) - julianday(outb.date)) BETWEEN ? AND ?
-          AND date(inb.date) BETWEEN date('now') AND date('now','+1 year')
-    """, (MIN_SEATS, MIN_SEATS) + LONG_HAUL_COUNTRIES + (TRIP_DAYS_MIN, TRIP_DAYS_MAX))
-    current = {(r[0], r[1], r[3], r[4]): (r[2], r[5], r[6]) for r in cur.fetchall()}
-    # Previous pairs from flight_history
-    cur.execute(f"""
-        SELECT o.origin, o.airport_code, o.date, i.date
-        FROM flight_history o
-        JOIN flight_history i ON o.origin = i.origin AND o.airport_code = i.airport_code
-        WHERE o.fetch_date = ? AND i.fetch_date = ?
-          AND o.direction = 'outbound' AND i.direction = 'inbound'
-          AND o.ab >= ? AND i.ab >= ?
-          AND o.country_name IN ({ph}) AND i.country_name IN ({ph})
-          AND strftime('%w', i.date) IN ('6','0','1')
-          AND strftime('%w', o.date) IN ('3','4','5')
-          AND (julianday(i.date) - julianday(o.date)) BETWEEN ? AND ?
-          AND date(i.date) BETWEEN date('now') AND date('now','+1 year')
-          AND date(o.date) BETWEEN date(i.date, '-7 days') AND date(i.date, '-1 days')
-    """, (prev, prev, MIN_SEATS, MIN_SEATS) + LONG_HAUL_COUNTRIES + LONG_HAUL_COUNTRIES + (TRIP_DAYS_MIN, TRIP_DAYS_MAX))
-    prev_set = {(r[0], r[1], r[2], r[3]) for r in cur.fetchall()}
-    new = [(k[0], k[1], k[2], k[3], current[k]) for k in current if k not in prev_set]
+    # A pair is new when either leg is new
+    new = [
+        (p["origin"], p["airport_code"], p["outbound"], p["inbound"],
+         (p["city_name"], p["ab_out"], p["ab_in"]))
+        for p in data.weekend_pairs()
+        if p["ab_out"] >= MIN_SEATS and p["ab_in"] >= MIN_SEATS
+        and p["country_name"] in LONG_HAUL_COUNTRIES
+        and ((p["origin"], p["airport_code"], "outbound", p["outbound"]) in new_legs
+             or (p["origin"], p["airport_code"], "inbound", p["inbound"]) in new_legs)
+    ]
     return sorted(new, key=lambda x: (x[0], x[4][0], x[3]))
 
 
-def top_weekend_cities(conn, n=8):
+def top_weekend_cities(data, n=8):
     """Cities with most weekend pairs (min 2 seats, 3–4 day trip)."""
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT inb.origin, inb.city_name, COUNT(*) AS pairs
-        FROM flights AS inb
-        JOIN flights AS outb
-          ON inb.airport_code = outb.airport_code AND inb.origin = outb.origin
-        WHERE inb.direction = 'inbound' AND outb.direction = 'outbound'
-          AND (inb.ag>=? OR inb.ap>=?) AND (outb.ag>=? OR outb.ap>=?)
-          AND strftime('%w', inb.date) IN ('6','0','1')
-          AND strftime('%w', outb.date) IN ('3','4','5')
-          AND (julianday(inb.date) - julianday(outb.date)) BETWEEN ? AND ?
-          AND date(inb.date) BETWEEN date('now') AND date('now','+1 year')
-        GROUP BY inb.origin, inb.city_name
-        ORDER BY pairs DESC
-        LIMIT ?
-    """, (MIN_SEATS, MIN_SEATS, MIN_SEATS, MIN_SEATS, TRIP_DAYS_MIN, TRIP_DAYS_MAX, n))
-    return cur.fetchall()
-
-
-def format_report(conn):
+    counts = {}
+    for p in data.weekend_pairs():
+        if ((p["ag_in"] >= MIN_SEATS or p["ap_in"] >= MIN_SEATS)
+                and (p["ag_out"] >= MIN_SEATS or p["ap_out"] >= MIN_SEATS)):
+            key = (p["origin"], p["city_name"])
+            counts[key] = counts.get(key, 0) + 1
+    ranked = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
+    return [(origin, city, pairs) for (origin, city), pairs in ranked[:n]]
+
+
+def format_report(data):
     parts = ["*SAS Awards – Morning Report*", ""]
 
     # Summary counts
-    counts = summary_counts(conn)
+    counts = data.timed("summary", summary_counts)
     if counts:
         parts.append("*Summary (≥2 seats)*")
         for origin, direction, cnt in counts:
@@ -166,7 +164,7 @@ def format_report(conn):
         parts.append("")
 
     # New since yesterday
-    new_rows = new_since_yesterday(conn)
+    new_rows = data.timed("new_since_yesterday", new_since_yesterday)
     if new_rows:
         parts.append("*New business (since yesterday)*")
         for origin, city, code, date, ab in new_rows[:8]:
@@ -176,7 +174,7 @@ def format_report(conn):
         parts.append("")
 
     # Top weekend cities
-    weekend = top_weekend_cities(conn)
+    weekend = data.timed("top_weekend_cities", top_weekend_cities)
     if weekend:
         parts.append("*Top weekend cities*")
         for origin, city, pairs in weekend:
@@ -184,7 +182,7 @@ def format_report(conn):
         parts.append("")
 
     # Top business
-    business = top_business(conn, 5)
+    business = data.timed("top_business", top_business, 5)
     if business:
         parts.append("*Top business (sample)*")
         for origin, city, code, date, direction, ab in business:
@@ -216,28 +214,32 @@ def main():
 
     conn = get_conn()
     try:
-        report = format_report(conn)
-        print(report)
-        if TOKEN and CHAT_ID:
-            if send_telegram(report):
-                print("Sent to Telegram.", file=sys.stderr)
-            else:
-                sys.exit(1)
-        else:
-            print("(Skipped Telegram – no token/chat_id)", file=sys.stderr)
-
-        # Separate ping: new long-haul (Asia/N America) business weekend pairs
-        new_pairs = new_longhaul_business_weekend_pairs(conn)
-        if new_pairs and TOKEN and CHAT_ID:
-            lines = ["*🛫 New long-haul Business weekend pairs* (≥2 seats, 3–4 days)", ""]
-            for origin, code, outb, inb, (city, ab_out, ab_in) in new_pairs:
-                lines.append(f"  {origin} {city} ({code}) {outb} → {inb}  (B: {ab_out}/{ab_in})")
-            ping = "\n".join(lines)
-            if send_telegram(ping):
-                print("Sent long-haul alert to Telegram.", file=sys.stderr)
+        data = ReportData.load(conn)
     finally:
         conn.close()
 
+    report = format_report(data)
+    print(report)
+    if TOKEN and CHAT_ID:
+        if send_telegram(report):
+            print("Sent to Telegram.", file=sys.stderr)
+        else:
+            sys.exit(1)
+    else:
+        print("(Skipped Telegram – no token/chat_id)", file=sys.stderr)
+
+    # Separate ping: new long-haul (Asia/N America) business weekend pairs
+    new_pairs = data.timed("longhaul_alert", new_longhaul_business_weekend_pairs)
+    if new_pairs and TOKEN and CHAT_ID:
+        lines = ["*🛫 New long-haul Business weekend pairs* (≥2 seats, 3–4 days)", ""]
+        for origin, code, outb, inb, (city, ab_out, ab_in) in new_pairs:
+            lines.append(f"  {origin} {city} ({code}) {outb} → {inb}  (B: {ab_out}/{ab_in})")
+        ping = "\n".join(lines)
+        if send_telegram(ping):
+            print("Sent long-haul alert to Telegram.", file=sys.stderr)
+
+    print("Timing: " + ", ".join(f"{k} {v * 1000:.0f}ms" for k, v in data.timings.items()),
+          file=sys.stderr)
 
 if __name__ == "__main__":
     main()
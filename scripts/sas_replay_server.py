@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the SAS award-finder API (destinations/v1 and routes/v1).
+Replays recorded responses from a folder, or serves synthetic data, with
+configurable latency, error rate and payload size. Lets you run and time
+update_sas_awards.py and the /api/routes proxy with no network.
+
+Synthetic data (N destinations × 365 days):
+  python scripts/sas_replay_server.py serve --synthetic 120 --latency-ms 80 --error-rate 0.01
+  SAS_API_BASE=http://127.0.0.1:8765 SAS_FETCH_RATE=0 SAS_DB_PATH=/tmp/bench.sqlite \\
+      python update_sas_awards.py
+
+Record live responses, then replay them:
+  python scripts/sas_replay_server.py record --out fixtures/sas --routes-per-dest 2
+  python scripts/sas_replay_server.py serve --fixtures fixtures/sas
+
+Folder layout: destinations/<ORIGIN>.json, availability/<ORIGIN>_<DEST>.json,
+routes/<ORIGIN>_<DEST>_<YYYY-MM-DD>.json (raw API bodies).
+GET /__stats returns request and injected-error counters.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import regions as _regions
+
+DEFAULT_PORT = 8765
+
+
+class SyntheticSAS:
+    """Deterministic fake destinations and availability for each origin."""
+
+    def __init__(self, n_dests, days=365, seed=0, origins=("ARN", "CPH"), start=None):
+        self.days = days
+        self.seed = seed
+        self.origins = origins
+        self.start = start or datetime.date.today()
+        countries = _regions.all_countries()
+        self.dests = [
+            {
+                "airportCode": _synthetic_code(i),
+                "cityName": f"Synthetic City {i:03d}",
+                "countryName": countries[i % len(countries)],
+            }
+            for i in range(n_dests)
+        ]
+        self._by_code = {d["airportCode"]: d for d in self.dests}
+
+    def destinations(self, origin):
+        return [dict(d) for d in self.dests] if origin in self.origins else []
+
+    def availability(self, origin, dest):
+        d = self._by_code.get(dest)
+        if not d or origin not in self.origins:
+            return []
+        rng = random.Random(f"{self.seed}:{origin}:{dest}")
+        avail = {}
+        for direction in ("outbound", "inbound"):
+            days = []
+            for offset in range(self.days):
+                if rng.random() < 0.3:
+                    continue
+                seats = {c: rng.choice((0, 0, 0, 1, 2, 3, 4, 6, 9)) for c in ("AG", "AP", "AB")}
+                entry = {"date": (self.start + datetime.timedelta(days=offset)).isoformat(),
+                         "availableSeatsTotal": sum(seats.values())}
+                entry.update({c: n for c, n in seats.items() if n})
+                days.append(entry)
+            avail[direction] = days
+        return [dict(d, flightClasses=["AG", "AP", "AB"], availability=avail)]
+
+    def routes(self, origin, dest, date):
+        rng = random.Random(f"{self.seed}:{origin}:{dest}:{date}")
+        flights = []
+        for n in range(rng.randint(1, 3)):
+            dep = 7 + n * 5 + rng.randint(0, 2)
+            flights.append({
+                "flightId": f"SK{rng.randint(100, 9999)}-{origin}-{dest}",
+                "departureTime": f"{dep:02d}:{rng.choice((0, 15, 30, 45)):02d}",
+                "arrivalTime": f"{dep + 2:02d}:{rng.choice((5, 20, 35, 50)):02d}",
+                "availability": {c: rng.choice((0, 1, 2, 4)) for c in ("AG", "AP", "AB")},
+            })
+        return flights
+
+
+def _synthetic_code(i):
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    return "Z" + letters[(i // 26) % 26] + letters[i % 26] if i < 676 else f"Z{i:04d}"
+
+
+class RecordedSAS:
+    """Raw API bodies saved by `record` (or by hand from DevTools)."""
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def _load(self, *parts):
+        path = os.path.join(self.folder, *parts)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def destinations(self, origin):
+        return self._load("destinations", f"{origin}.json") or []
+
+    def availability(self, origin, dest):
+        return self._load("availability", f"{origin}_{dest}.json") or []
+
+    def routes(self, origin, dest, date):
+        return self._load("routes", f"{origin}_{dest}_{date}.json")
+
+
+def make_handler(source, latency_ms=0, jitter_ms=0, error_rate=0.0, error_status=503,
+                 pad_bytes=0, seed=None):
+    """Request handler class bound to a data source and fault/latency settings."""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    stats = {"requests": 0, "errors": 0, "by_endpoint": {}, "in_flight": 0, "max_in_flight": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b" " * pad_bytes
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == "/__stats":
+                with lock:
+                    snapshot = json.loads(json.dumps(stats))
+                return self._send(200, snapshot)
+            endpoint = "/".join(url.path.rstrip("/").rsplit("/", 2)[-2:])
+            with lock:
+                stats["requests"] += 1
+                stats["by_endpoint"][endpoint] = stats["by_endpoint"].get(endpoint, 0) + 1
+                stats["in_flight"] += 1
+                stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+                fail = error_rate and rng.random() < error_rate
+                delay = (latency_ms + rng.uniform(0, jitter_ms)) / 1000.0
+                if fail:
+                    stats["errors"] += 1
+            try:
+                self._answer(url, endpoint, q, delay, fail)
+            finally:
+                with lock:
+                    stats["in_flight"] -= 1
+
+        def _answer(self, url, endpoint, q, delay, fail):
+            if delay:
+                time.sleep(delay)
+            if fail:
+                return self._send(error_status, {"error": "injected"})
+
+            origin = q.get("origin", "")
+            if endpoint == "destinations/v1":
+                dest = q.get("destinations", "")
+                if not dest:
+                    return self._send(200, source.destinations(origin))
+                return self._send(200, source.availability(origin, dest))
+            if endpoint == "routes/v1":
+                data = source.routes(origin, q.get("destination", ""), q.get("departureDate", ""))
+                if data is None:
+                    return self._send(404, {"error": "not recorded"})
+                return self._send(200, data)
+            return self._send(404, {"error": f"unknown endpoint {url.path}"})
+
+    Handler.stats = stats
+    return Handler
+
+
+def start_server(source, host="127.0.0.1", port=DEFAULT_PORT, **opts):
+    """Start a threaded replay server in the background; returns the server."""
+    server = ThreadingHTTPServer((host, port), make_handler(source, **opts))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def record(out_dir, origins, routes_per_dest=0):
+    """Save live destinations/v1 (and optionally routes/v1) bodies for replay."""
+    import requests
+    import update_sas_awards as sas
+
+    routes_api = sas.BASE_URL.rsplit("/", 2)[0] + "/routes/v1"
+    for sub in ("destinations", "availability", "routes"):
+        os.makedirs(os.path.join(out_dir, sub), exist_ok=True)
+
+    def save(data, *parts):
+        with open(os.path.join(out_dir, *parts), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    for origin in origins:
+        dests = sas.get_all_destinations(origin)
+        save(dests, "destinations", f"{origin}.json")
+        print(f"{origin}: {len(dests)} destinations")
+        for d in dests:
+            code = d["airportCode"]
+            rec = sas.fetch_availability(origin, code)
+            save([rec] if rec else [], "availability", f"{origin}_{code}.json")
+            dates = [x["date"] for x in ((rec or {}).get("availability", {}).get("outbound", []))]
+            for date in dates[:routes_per_dest]:
+                r = requests.get(routes_api, params={
+                    "market": sas.MARKET, "origin": origin, "destination": code,
+                    "departureDate": date, "direct": "false",
+                }, timeout=15)
+                if r.ok:
+                    save(r.json(), "routes", f"{origin}_{code}_{date}.json")
+    print(f"Recorded into {out_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay or synthesize the SAS award-finder API locally.")
+    sub = parser.add_subparsers(dest="cmd")
+
+    s = sub.add_parser("serve", help="Serve recorded or synthetic responses")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=DEFAULT_PORT)
+    s.add_argument("--fixtures", help="Folder of recorded responses")
+    s.add_argument("--synthetic", type=int, default=0, metavar="N", help="Fake N destinations per origin")
+    s.add_argument("--days", type=int, default=365, help="Synthetic days of availability")
+    s.add_argument("--seed", type=int, default=0)
+    s.add_argument("--latency-ms", type=float, default=0)
+    s.add_argument("--jitter-ms", type=float, default=0)
+    s.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    s.add_argument("--error-status", type=int, default=503)
+    s.add_argument("--pad-bytes", type=int, default=0, help="Extra bytes appended to each body")
+
+    r = sub.add_parser("record", help="Save live API responses for replay")
+    r.add_argument("--out", default="fixtures/sas")
+    r.add_argument("--origins", nargs="+", default=["ARN", "CPH"])
+    r.add_argument("--routes-per-dest", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.cmd == "record":
+        record(args.out, args.origins, args.routes_per_dest)
+        return
+    if args.cmd != "serve":
+        parser.print_help()
+        sys.exit(1)
+    if args.fixtures:
+        source = RecordedSAS(args.fixtures)
+    elif args.synthetic:
+        source = SyntheticSAS(args.synthetic, days=args.days, seed=args.seed)
+    else:
+        print("Give --fixtures DIR or --synthetic N", file=sys.stderr)
+        sys.exit(1)
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(
+        source, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, error_status=args.error_status,
+        pad_bytes=args.pad_bytes, seed=args.seed,
+    ))
+    server.daemon_threads = True
+    print(f"SAS replay server on http://{args.host}:{args.port} "
+          f"(set SAS_API_BASE=http://{args.host}:{args.port})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
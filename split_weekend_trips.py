@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Weekend trip CSVs: one file per (origin, city) with an inbound Sat/Sun/Mon
+flight in the next year, listing its economy/plus weekend pairs
+(MIN_SEATS seats, TRIP_DAYS_MIN–MAX days, see report_config.py).
+
+Reads one snapshot — the city list and every qualifying pair in two queries —
+and streams the pairs into reports/weekend_trips/{origin}_{code}_{city}.csv.
+Also runs as the `weekend_trips` task of reports.py.
+"""
+import argparse
+import csv
+import itertools
+import os
+
+import db
+from report_config import MIN_SEATS
+
+# ─── CONFIG ────────────────────────────────────────────────────────────────
+DB_FILE = os.path.expanduser(os.environ.get("SAS_DB_PATH", "~/sas_awards/sas_awards.sqlite"))
+OUT_DIR = os.path.join(os.path.dirname(DB_FILE), "reports", "weekend_trips")
+HEADER  = ["origin", "inbound_date", "outbound_date", "econ_in", "plus_in", "econ_out", "plus_out"]
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _cities(cur):
+    """{(origin, city_name): airport_code} for cities with a bookable weekend inbound."""
+    cur.execute("""
+        SELECT origin, city_name, MIN(airport_code)
+        FROM flights
+        WHERE direction = 'inbound'
+          AND (ag >= ? OR ap >= ?)
+          AND strftime('%w', date) IN ('6','0','1')
+          AND date BETWEEN date('now') AND date('now','+1 year')
+        GROUP BY origin, city_name
+    """, (MIN_SEATS, MIN_SEATS))
+    return {(origin, city): code for origin, city, code in cur.fetchall()}
+
+
+def _pairs(cur):
+    """Cursor over (origin, city_name, *HEADER[1:]) ordered by origin, city, inbound, outbound."""
+    # weekend_pairs is rebuilt by update_sas_awards.py after every fetch
+    return cur.execute("""
+        SELECT origin, city_name, inbound, outbound, ag_in, ap_in, ag_out, ap_out
+        FROM weekend_pairs
+        WHERE (ag_in >= ? OR ap_in >= ?)
+          AND (ag_out >= ? OR ap_out >= ?)
+          AND inbound BETWEEN date('now') AND date('now','+1 year')
+        ORDER BY origin, city_name, inbound, outbound
+    """, (MIN_SEATS,) * 4)
+
+
+def file_name(origin, code, city):
+    safe_city = city.replace(" ", "_").replace("/", "-")
+    return f"{origin}_{code}_{safe_city}.csv"
+
+
+def _write(path, rows):
+    n = 0
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(HEADER)
+        for row in rows:
+            w.writerow(row)
+            n += 1
+    return n
+
+
+def export(conn, out_dir=OUT_DIR):
+    """
+    Write one CSV per city, streaming pairs from a single query into their
+    files; returns [(path, rows written)]. Runs inside the caller's read
+    transaction if there is one (reports.py), otherwise in its own.
+    """
+    cur = conn.cursor()
+    own = not conn.in_transaction
+    if own:
+        cur.execute("BEGIN")   # both queries see the same refresh
+    try:
+        cities = _cities(cur)
+        os.makedirs(out_dir, exist_ok=True)
+        written = {}
+        for (origin, city), rows in itertools.groupby(_pairs(cur), key=lambda r: (r[0], r[1])):
+            if (origin, city) in cities:
+                path = os.path.join(out_dir, file_name(origin, cities[origin, city], city))
+                written[origin, city] = (path, _write(path, ((r[0],) + r[2:] for r in rows)))
+    finally:
+        if own:
+            conn.rollback()
+    # Cities whose inbound flights have no matching outbound still get a (header-only) file
+    for (origin, city), code in cities.items():
+        if (origin, city) not in written:
+            path = os.path.join(out_dir, file_name(origin, code, city))
+            written[origin, city] = (path, _write(path, []))
+    return [written[k] for k in sorted(written)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export weekend trip CSVs per origin and city.")
+    parser.add_argument("--out-dir", default=OUT_DIR, help=f"output directory (default: {OUT_DIR})")
+    args = parser.parse_args()
+
+    conn = db.reader(DB_FILE)
+    try:
+        written = export(conn, args.out_dir)
+    finally:
+        conn.close()
+    for path, n in written:
+        print(f"Written {path} ({n + 1} lines)")
+    print(f"✅ All done — see files in {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
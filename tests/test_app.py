@@ -234,3 +234,39 @@ Set-Cookie: bm_s=YAAQlongvalue; Domain=.virginatlantic.com; Path=/; Expires=Wed;
     assert _extract_cookie_header("a=1; b=2") == "a=1; b=2"
     # Cookie: prefix stripped
     assert _extract_cookie_header("Cookie: a=1; b=2") == "a=1; b=2"
+
+
+# ── HTTP caching ──
+
+@pytest.mark.parametrize("url", [
+    "/", "/reports?tab=weekend", "/api/flow/results?cabin=business",
+    "/api/reports/calendar?origin=ARN&code=BGO",
+])
+def test_unchanged_data_answers_304(client, url):
+    r = client.get(url)
+    assert r.status_code == 200
+    assert r.headers["ETag"] and r.headers["Last-Modified"]
+    assert "no-cache" in r.headers["Cache-Control"]
+
+    again = client.get(url, headers={"If-None-Match": r.headers["ETag"]})
+    assert again.status_code == 304 and again.data == b""
+    assert again.headers["ETag"] == r.headers["ETag"]
+
+    since = client.get(url, headers={"If-Modified-Since": r.headers["Last-Modified"]})
+    assert since.status_code == 304
+
+
+def test_data_refresh_changes_etag(client, monkeypatch):
+    import queries
+    r = client.get("/api/flow/results")
+    version, updated_at = queries.data_version()
+    monkeypatch.setattr(queries, "data_version", lambda: (version + 1, updated_at))
+    again = client.get("/api/flow/results", headers={"If-None-Match": r.headers["ETag"]})
+    assert again.status_code == 200
+    assert again.headers["ETag"] != r.headers["ETag"]
+
+
+def test_errors_are_not_tagged(client):
+    r = client.get("/api/detail")
+    assert r.status_code == 400
+    assert "ETag" not in r.headers
@@ -0,0 +1,54 @@
+"""Tests for the shared SQLite connection layer."""
+import sys, os, sqlite3
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+import db
+import queries
+import update_sas_awards as u
+
+
+@pytest.fixture
+def sas_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "sas.sqlite")
+    monkeypatch.setattr(u, "DB_PATH", path)
+    monkeypatch.setattr(queries, "DB_PATH", path)
+    conn = u.connect_db()
+    u.apply_incremental(conn, [
+        ("ARN", "BGO", "Bergen", "Norge", "outbound", "2030-01-03", 4, 2, 0, 2),
+    ])
+    conn.close()
+    yield path
+    db.close_all()
+
+
+def test_readers_are_pooled_read_only_and_wal(sas_db):
+    queries.dashboard_stats()
+    queries.region_counts()
+    queries.query_flights()
+    assert db.pool(sas_db).opened == 1
+
+    conn = db.reader(sas_db)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("DELETE FROM flights")
+    conn.close()
+
+
+def test_readers_do_not_wait_for_the_fetcher(sas_db):
+    writer = db.connect(sas_db)
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("DELETE FROM flights")
+
+    conn = db.reader(sas_db)
+    conn.execute("PRAGMA busy_timeout = 0")
+    assert conn.execute("SELECT COUNT(*) FROM flights").fetchone()[0] == 1
+    conn.close()
+
+    writer.commit()
+    conn = db.reader(sas_db)
+    assert conn.execute("SELECT COUNT(*) FROM flights").fetchone()[0] == 0
+    conn.close()
+    writer.close()
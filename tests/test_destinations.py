@@ -0,0 +1,56 @@
+"""Tests for the destination search index."""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import destinations
+from destinations import DestinationIndex, normalize
+
+INDEX = DestinationIndex([
+    ("CPH", "Köpenhamn"), ("BCN", "Barcelona"), ("BGO", "Bergen"), ("BER", "Berlin"),
+    ("TOS", "Tromsø"), ("EWR", "New York"), ("JFK", "New York"), ("LAX", "Los Angeles"),
+])
+
+
+def test_normalize_folds_case_accents_and_spacing():
+    assert normalize("  Köpenhamn ") == "kopenhamn"
+    assert normalize("Tromsø") == "tromso"
+    assert normalize("Los-Angeles") == normalize("los  angeles") == "los angeles"
+
+
+def test_resolve_tiers():
+    assert INDEX.resolve("cph") == ["CPH"]                  # airport code
+    assert INDEX.resolve("Copenhagen") == ["CPH"]           # English alias
+    assert INDEX.resolve("kopenhamn") == ["CPH"]            # without diacritics
+    assert INDEX.resolve("new york") == ["EWR", "JFK"]      # name shared by two airports
+    assert INDEX.resolve("ber") == ["BER"]                  # exact code wins over prefixes
+    assert INDEX.resolve("berg") == ["BGO"]                 # prefix
+    assert INDEX.resolve("Be") == ["BER", "BGO"]
+    assert INDEX.resolve("angel") == ["LAX"]                # substring, like the old LIKE '%x%'
+    assert INDEX.resolve("wr") == ["EWR"]                   # part of an airport code, also as before
+    assert INDEX.resolve("GO") == ["BGO"]
+    assert INDEX.resolve("Barcelnoa") == ["BCN"]            # typo
+    assert INDEX.resolve("Atlantis") == []
+    assert INDEX.resolve("  ") == []
+
+
+def test_aliases_only_for_known_destinations():
+    assert INDEX.resolve("Vienna") == []
+
+
+def test_dashboard_search_uses_codes(tmp_path, monkeypatch):
+    import queries
+    import update_sas_awards as u
+    path = str(tmp_path / "sas.sqlite")
+    monkeypatch.setattr(u, "DB_PATH", path)
+    monkeypatch.setattr(queries, "DB_PATH", path)
+    conn = u.connect_db()
+    u.apply_incremental(conn, [
+        ("ARN", "CPH", "Köpenhamn", "Danmark", "outbound", "2030-01-03", 4, 2, 2, 2),
+        ("ARN", "BCN", "Barcelona", "Spanien", "outbound", "2030-01-03", 4, 2, 2, 2),
+    ])
+    conn.close()
+    for search in ("copenhagen", "Köpenhamn", "kope", "cph"):
+        rows = queries.query_flights(city=search)["rows"]
+        assert [r["airport_code"] for r in rows] == ["CPH"], search
+    assert queries.query_flights(city="nowhere")["rows"] == []
+    assert destinations.resolve(path, "barc") == ["BCN"]
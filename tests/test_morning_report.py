@@ -0,0 +1,84 @@
+"""The one-pass morning report must match the per-section SQL it replaced."""
+import sys, os, random, datetime
+ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import pytest
+
+import schema
+import weekend_engine
+import update_sas_awards as u
+import morning_report as m
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(u, "DB_PATH", str(tmp_path / "sas.sqlite"))
+    conn = u.connect_db()
+    u.ensure_change_log(conn)
+    rng = random.Random(5)
+    today = weekend_engine.utc_today()
+
+    def rows():
+        return [
+            (origin, code, f"City {code}", country, direction,
+             (today + datetime.timedelta(days=offset)).isoformat(), 0,
+             rng.choice((0, 2)), rng.choice((0, 1, 2)), rng.choice((0, 1, 2, 3)))
+            for origin in ("ARN", "CPH")
+            for code, country in (("BGO", "Norge"), ("EWR", "USA"), ("BKK", "Thailand"))
+            for direction in ("outbound", "inbound")
+            for offset in range(-5, 60)
+            if rng.random() < 0.8
+        ]
+
+    u.apply_incremental(conn, rows(), "2030-01-01T05:00:00")
+    u.apply_incremental(conn, rows(), "2030-01-02T05:00:00")
+    schema.rebuild_weekend_pairs(conn)
+    yield conn
+    conn.close()
+
+
+def test_sections_match_sql(conn):
+    data = m.ReportData.load(conn)
+    assert not conn.in_transaction
+
+    expected = conn.execute("""
+        SELECT origin, direction, COUNT(*) FROM flights
+        WHERE ab >= 2 OR ap >= 2 OR ag >= 2
+        GROUP BY origin, direction
+    """).fetchall()
+    assert m.summary_counts(data) == expected
+
+    expected = conn.execute("""
+        SELECT origin, city_name, COUNT(*) FROM weekend_pairs
+        WHERE (ag_in >= 2 OR ap_in >= 2) AND (ag_out >= 2 OR ap_out >= 2)
+          AND inbound BETWEEN date('now') AND date('now','+1 year')
+        GROUP BY origin, city_name
+    """).fetchall()
+    assert sorted(m.top_weekend_cities(data, n=100)) == sorted(expected)
+
+    assert [r[5] for r in m.top_business(data, 5)] == [r[0] for r in conn.execute(
+        "SELECT ab FROM flights WHERE ab >= 2 ORDER BY ab DESC, date LIMIT 5")]
+
+
+def test_longhaul_alert_uses_new_legs_and_shared_pairs(conn):
+    data = m.ReportData.load(conn)
+    new_legs = {(r[0], r[2], r[4], r[3]) for r in data.new_legs}
+    current = conn.execute("""
+        SELECT origin, airport_code, outbound, inbound FROM weekend_pairs
+        WHERE ab_in >= 2 AND ab_out >= 2 AND country_name IN ('USA', 'Thailand')
+          AND inbound BETWEEN date('now') AND date('now','+1 year')
+    """).fetchall()
+    expected = sorted(
+        k for k in current
+        if (k[0], k[1], "outbound", k[2]) in new_legs or (k[0], k[1], "inbound", k[3]) in new_legs
+    )
+
+    report = m.format_report(data)
+    pairs = data.weekend_pairs()
+    got = m.new_longhaul_business_weekend_pairs(data)
+    assert expected and sorted(r[:4] for r in got) == expected
+    assert data.weekend_pairs() is pairs
+    assert report.startswith("*SAS Awards – Morning Report*")
+    assert {"load", "weekend_pairs", "summary", "top_weekend_cities"} <= set(data.timings)
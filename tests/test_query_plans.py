@@ -0,0 +1,254 @@
+"""EXPLAIN QUERY PLAN checks: the hot queries in queries.py must stay on indexes."""
+import sys, os, sqlite3
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+import queries
+import schema
+import update_sas_awards as u
+
+
+@pytest.fixture
+def traced(tmp_path, monkeypatch):
+    """Point queries at a small migrated DB and capture every SELECT it runs."""
+    db = str(tmp_path / "sas.sqlite")
+    monkeypatch.setattr(u, "DB_PATH", db)
+    monkeypatch.setattr(queries, "DB_PATH", db)
+    conn = u.connect_db()
+    u.ensure_flight_history(conn)
+    rows = [
+        (origin, code, f"City {code}", country, direction, f"2030-0{m}-{d:02d}", 4, 2, 1, ab)
+        for origin in ("ARN", "CPH")
+        for code, country in (("BGO", "Norge"), ("BCN", "Spanien"), ("EWR", "USA"))
+        for direction in ("outbound", "inbound")
+        for m in (1, 2)
+        for d, ab in ((3, 2), (6, 0), (9, 3))
+    ]
+    u.apply_incremental(conn, rows, "2030-01-01T05:00:00")
+    u.apply_incremental(conn, rows[:-3], "2030-01-02T05:00:00")
+    schema.rebuild_weekend_pairs(conn)
+    conn.close()
+
+    statements = []
+    real_get_conn = queries.get_conn
+
+    def get_conn():
+        c = real_get_conn()
+        c.set_trace_callback(statements.append)
+        return c
+
+    monkeypatch.setattr(queries, "get_conn", get_conn)
+
+    def plans():
+        c = sqlite3.connect(db)
+        out = []
+        for sql in statements:
+            if sql.lstrip().upper().startswith(("SELECT", "WITH")) and "sqlite_master" not in sql:
+                detail = [r[3] for r in c.execute("EXPLAIN QUERY PLAN " + sql)]
+                out.append((sql, detail))
+        c.close()
+        statements.clear()
+        return out
+
+    return plans
+
+
+def _assert_no_full_scan(plans):
+    assert plans
+    for sql, detail in plans:
+        for line in detail:
+            assert not line.startswith(("SCAN flights", "SCAN inb", "SCAN outb", "SCAN flight_changes",
+                                            "SCAN weekend_pairs")), \
+                f"full scan in:\n{sql}\n{detail}"
+
+
+def _uses(plans, index):
+    return any(index in line for _, detail in plans for line in detail)
+
+
+def test_migration_is_versioned(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "fresh.sqlite"))
+    assert schema.migrate(conn) == schema.SCHEMA_VERSION
+    assert schema.schema_version(conn) == schema.SCHEMA_VERSION
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    assert {"idx_flights_direction_date", "idx_flights_country_date", "idx_flights_ab_date"} <= names
+    assert schema.migrate(conn) == schema.SCHEMA_VERSION
+    conn.close()
+
+
+def test_business_flights_use_partial_index(traced):
+    queries.query_flights(cabin="business")
+    plans = traced()
+    _assert_no_full_scan(plans)
+    assert _uses(plans, "idx_flights_ab_date")
+
+
+def test_region_filter_uses_country_index(traced):
+    queries.query_flights(countries=["Norge", "Spanien"])
+    queries.region_counts()
+    plans = traced()
+    _assert_no_full_scan(plans)
+    assert _uses(plans, "idx_flights_country_date")
+
+
+def test_report_business_uses_partial_index(traced):
+    queries.report_business()
+    plans = traced()
+    _assert_no_full_scan(plans)
+    assert _uses(plans, "idx_flights_ab_date")
+
+
+def test_weekend_pairs_read_the_materialized_table(traced):
+    queries.query_weekend_pairs(cabin="business")
+    queries.query_weekend_pairs(countries=["Norge"])
+    queries.weekend_pairs_for_route("ARN", "BGO")
+    queries.report_weekend()
+    plans = traced()
+    _assert_no_full_scan(plans)
+    assert not any("flights" in sql for sql, _ in plans)
+    assert _uses(plans, "idx_weekend_pairs_inbound")
+    assert _uses(plans, "idx_weekend_pairs_country")
+
+
+def test_report_new_reads_change_log_by_index(traced):
+    queries.report_new()
+    plans = traced()
+    _assert_no_full_scan(plans)
+    assert _uses(plans, "idx_flight_changes_fetch")
+
+
+@pytest.mark.parametrize("fn, kwargs", [
+    (queries.query_flights, {"cabin": "all", "min_seats": 1}),
+    (queries.query_flights, {"cabin": "business"}),
+    (queries.query_weekend_pairs, {"cabin": "all", "min_seats": 0}),
+])
+def test_keyset_pages_match_offset_pages(traced, monkeypatch, fn, kwargs):
+    # weekend_pairs only shows the next year; widen it to reach the 2030 fixture
+    monkeypatch.setattr(queries, "_WEEKEND_WINDOW", "inbound >= date('now')")
+    offset_pages, page = [], 1
+    while True:
+        res = fn(page=page, per_page=3, **kwargs)
+        if not res["rows"]:
+            break
+        offset_pages.append(res["rows"])
+        page += 1
+    assert len(offset_pages) > 2
+
+    first = fn(per_page=3, **kwargs)
+    assert first["total_exact"] and first["total"] == sum(map(len, offset_pages))
+    assert first["prev_cursor"] is None
+    keyset_pages, res = [first["rows"]], first
+    while res["next_cursor"]:
+        res = fn(per_page=3, after=res["next_cursor"], **kwargs)
+        keyset_pages.append(res["rows"])
+    assert keyset_pages == offset_pages
+
+    back = [res["rows"]]
+    while res["prev_cursor"]:
+        res = fn(per_page=3, before=res["prev_cursor"], **kwargs)
+        back.append(res["rows"])
+    assert back[::-1] == offset_pages
+
+    traced()
+    queries._cache.clear()
+    fn(per_page=3, after=first["next_cursor"], **kwargs)
+    sqls = [sql for sql, _ in traced()]
+    # Count is cached until the DB changes; the page query seeks instead of skipping
+    assert not any("COUNT(*)" in sql for sql in sqls)
+    assert any(sql.rstrip().endswith("LIMIT 4 OFFSET 0") for sql in sqls)
+
+
+@pytest.mark.parametrize("fn, kwargs", [
+    (queries.query_flights, {"cabin": "all", "min_seats": 1}),
+    (queries.query_flights, {"cabin": "business"}),
+    (queries.query_weekend_pairs, {"cabin": "all", "min_seats": 0}),
+])
+def test_pages_are_read_in_index_order(traced, monkeypatch, fn, kwargs):
+    monkeypatch.setattr(queries, "_WEEKEND_WINDOW", "inbound >= date('now')")
+    first = fn(per_page=3, **kwargs)
+    second = fn(per_page=3, after=first["next_cursor"], **kwargs)
+    fn(per_page=3, before=second["next_cursor"], **kwargs)
+    plans = [p for p in traced() if "LIMIT" in p[0] and "COUNT(*)" not in p[0]]
+    assert len(plans) == 3
+    _assert_no_full_scan(plans)
+    for sql, detail in plans:
+        assert not any("TEMP B-TREE" in line for line in detail), f"sorts every match:\n{sql}\n{detail}"
+    # both cursor directions seek on the sort key's ranked index
+    assert sum(any(">(" in line or "<(" in line for line in d) for _, d in plans) == 2
+    assert all(_uses([p], "_rank_") for p in plans)
+
+
+def test_lists_are_ranked_by_seats(traced, monkeypatch):
+    monkeypatch.setattr(queries, "_WEEKEND_WINDOW", "inbound >= date('now')")
+    rows = queries.query_flights(cabin="business", per_page=100)["rows"]
+    assert [(-r["ab"], r["date"], r["origin"]) for r in rows] == \
+        sorted((-r["ab"], r["date"], r["origin"]) for r in rows)
+    assert rows[0]["ab"] == 3 and rows[-1]["ab"] == 2
+    rows = queries.query_flights(per_page=100)["rows"]
+    score = [r["ab"] * 3 + r["ap"] * 2 + r["ag"] for r in rows]
+    assert score == sorted(score, reverse=True)
+
+    pairs = queries.query_weekend_pairs(cabin="business", min_seats=0, per_page=100)["rows"]
+    key = [(p["outbound"], p["inbound"], -(p["ab_out"] + p["ab_in"])) for p in pairs]
+    assert key == sorted(key) and len({k[:2] for k in key}) < len(key)  # some ties broken by seats
+
+
+def test_count_is_capped(traced, monkeypatch):
+    monkeypatch.setattr(queries, "COUNT_CAP", 5)
+    monkeypatch.setattr(queries, "_counts", queries.ResultCache(4))
+    res = queries.query_flights(min_seats=1, per_page=3)
+    assert (res["total"], res["total_exact"]) == (5, False)
+    assert res["next_cursor"]
+
+
+def test_region_counts_is_one_indexed_pass(traced):
+    cards = {c["key"]: c for c in queries.region_counts()}
+    plans = [p for p in traced() if "data_version" not in p[0]]
+    assert len(plans) == 1
+    _assert_no_full_scan(plans)
+    assert _uses(plans, "idx_flights_country_date")
+    assert list(cards) == list(queries._regions.REGIONS)
+    assert cards["europe"]["destinations"] == 2       # BGO, BCN
+    # EWR: 2 origins x 2 directions x 2 months x 2 ab>=2 days, minus the 2 dropped by the second fetch
+    assert cards["north_america"]["biz"] == 14
+    assert cards["asia"] == dict(cards["asia"], destinations=0, biz=0, plus=0, eco=0)
+
+
+def test_results_are_cached_until_the_data_version_changes(traced, monkeypatch):
+    queries.cache_clear()
+    first = queries.report_region(cabin="business")
+    first["table"].clear()                   # callers get copies
+    again = queries.report_region(cabin="business", origin="", country="")
+    assert again["table"]
+    assert queries.cache_info()["hits"] == 1
+
+    conn = u.connect_db()
+    conn.execute("DELETE FROM flights WHERE airport_code = 'EWR'")
+    conn.commit()
+    assert queries.report_region(cabin="business") == again     # not bumped yet
+    schema.bump_data_version(conn)
+    conn.close()
+    fresh = queries.report_region(cabin="business")
+    assert "USA" not in [r["country"] for r in fresh["table"]]
+    assert queries.cache_info()["misses"] == 2
+
+
+def test_cache_evicts_least_recently_used():
+    cache = queries.ResultCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.info() == {"hits": 2, "misses": 1, "size": 2, "maxsize": 2}
+
+
+def test_city_search_is_an_indexed_code_lookup(traced):
+    queries.query_flights(city="City BG")
+    queries.query_weekend_pairs(city="bgo")
+    plans = traced()
+    _assert_no_full_scan(plans)
+    assert not any("LIKE" in sql for sql, _ in plans)
+    assert _uses(plans, "idx_flights_code_date") or _uses(plans, "sqlite_autoindex_flights_1")
@@ -0,0 +1,88 @@
+"""The reports CLI: every task runs against one snapshot and writes its CSV."""
+import sys, os, csv, io
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+import db
+import schema
+import update_sas_awards as u
+import reports
+
+
+def _row(code, date, ab, ap=0, direction="outbound", country="Norge"):
+    return ("ARN", code, f"City {code}", country, direction, date, ab + ap, 0, ap, ab)
+
+
+@pytest.fixture
+def dbfile(tmp_path, monkeypatch):
+    path = str(tmp_path / "sas.sqlite")
+    monkeypatch.setattr(u, "DB_PATH", path)
+    conn = u.connect_db()
+    u.ensure_change_log(conn)
+    u.apply_incremental(conn, [_row("BGO", "2030-01-03", 1), _row("OSL", "2030-01-03", 4, ap=2)],
+                        "2030-01-01T05:00:00")
+    u.apply_incremental(conn, [_row("BGO", "2030-01-03", 3), _row("OSL", "2030-01-03", 4, ap=2),
+                               _row("EWR", "2030-01-05", 2, direction="inbound", country="USA")],
+                        "2030-01-02T05:00:00")
+    schema.rebuild_weekend_pairs(conn)
+    yield path, conn
+    conn.close()
+    db.close_all()
+
+
+def _read(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_all_reports_write_from_one_snapshot(dbfile, tmp_path):
+    path, _ = dbfile
+    results = {r["name"]: r for r in reports.run(db_path=path, out_dir=str(tmp_path / "out"), workers=2)}
+    assert set(results) == set(reports.REPORTS)
+    assert all(r["status"] == "ok" for r in results.values())
+
+    new = _read(results["new_business"]["path"])
+    assert new[1] == ["origin", "city_name", "airport_code", "date", "business_seats"]
+    assert new[2] == ["ARN", "City BGO", "BGO", "2030-01-03", "3"]
+    assert results["new_business"]["rows"] == 2   # BGO outbound, EWR inbound
+
+    by_date = _read(results["business_by_date"]["path"])
+    assert by_date[0] == ["Outbound Business (min 2 seats)"]
+    assert by_date[2:4] == [["ARN", "City BGO", "BGO", "2030-01-03", "3"],
+                            ["ARN", "City OSL", "OSL", "2030-01-03", "4"]]
+    assert ["ARN", "City EWR", "EWR", "2030-01-05", "2"] in by_date
+
+    plus = _read(results["plus_europe_by_city"]["path"])
+    assert plus[1:] == [["ARN", "City OSL", "OSL", "2030-01-03", "outbound", "2"]]
+    assert results["weekend_trips"]["path"] == os.path.join(str(tmp_path), "reports", "weekend_trips")
+
+    out = io.StringIO()
+    reports.print_summary(list(results.values()), 0.1, out=out)
+    assert "business_by_date" in out.getvalue() and "total (wall)" in out.getvalue()
+
+
+def test_snapshot_ignores_commits_after_it_opened(dbfile):
+    path, writer = dbfile
+    snap, conns = reports.Snapshot.open(path, 2)
+    try:
+        schema.bump_data_version(writer)
+        u.apply_incremental(writer, [_row("TRD", "2030-01-04", 5)])
+        for conn in conns:
+            assert schema.data_version(conn) == snap.version
+            assert conn.execute("SELECT COUNT(*) FROM flights WHERE airport_code = 'TRD'").fetchone()[0] == 0
+    finally:
+        for conn in conns:
+            conn.close()
+    assert snap.window == ("2030-01-02", "2030-01-01")
+
+
+def test_missing_history_is_skipped(tmp_path, monkeypatch):
+    path = str(tmp_path / "sas.sqlite")
+    monkeypatch.setattr(u, "DB_PATH", path)
+    u.connect_db().close()
+    (result,) = reports.run(["new_business"], db_path=path, out_dir=str(tmp_path))
+    assert result["status"].startswith("skipped")
+    with pytest.raises(ValueError):
+        reports.run(["nope"], db_path=path, out_dir=str(tmp_path))
+    db.close_all()
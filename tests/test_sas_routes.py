@@ -0,0 +1,64 @@
+"""Tests for the routes/v1 proxy, against the local replay server."""
+import sys, os, threading
+ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import pytest
+
+import sas_routes
+import sas_replay_server as replay
+
+LATENCY_MS = 150
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    source = replay.SyntheticSAS(3, days=30, seed=1)
+    server = replay.start_server(source, port=0, latency_ms=LATENCY_MS)
+    host, port = server.server_address
+    monkeypatch.setattr(sas_routes, "ROUTES_API", f"http://{host}:{port}/bff/award-finder/routes/v1")
+    sas_routes.clear_cache()
+    yield source, server.RequestHandlerClass.stats
+    server.shutdown()
+    sas_routes.clear_cache()
+
+
+def test_legs_are_fetched_in_parallel_and_cached(upstream):
+    source, stats = upstream
+    code = source.dests[0]["airportCode"]
+    legs = [("ARN", code, "2030-01-03"), (code, "ARN", "2030-01-06")]
+
+    out, inb = sas_routes.fetch_legs(legs)
+    assert out == source.routes("ARN", code, "2030-01-03")
+    assert inb == source.routes(code, "ARN", "2030-01-06")
+    assert stats["requests"] == 2
+    assert stats["max_in_flight"] == 2       # both legs were upstream at once
+
+    assert sas_routes.fetch_legs(legs) == [out, inb]
+    assert stats["requests"] == 2            # served from the cache
+    assert sas_routes.stats["hits"] == 2
+
+
+def test_concurrent_identical_lookups_share_one_request(upstream):
+    _, stats = upstream
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(sas_routes.get_routes("ARN", "ZAA", "2030-02-01")))
+        for _ in range(6)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 6 and all(r == results[0] for r in results)
+    assert stats["requests"] == 1
+    assert sas_routes.stats["misses"] == 1
+
+
+def test_errors_are_reported_and_not_cached(upstream, monkeypatch):
+    monkeypatch.setattr(sas_routes, "ROUTES_API", sas_routes.ROUTES_API.replace("routes/v1", "nope/v1"))
+    first = sas_routes.get_routes_or_error("ARN", "ZAA", "2030-02-01")
+    second = sas_routes.get_routes_or_error("ARN", "ZAA", "2030-02-01")
+    assert "_error" in first and "_error" in second
+    assert sas_routes.stats["errors"] == 2
@@ -0,0 +1,50 @@
+"""The bulk weekend-trip exporter must write what the per-city sqlite3 queries did."""
+import sys, os, csv, random, datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import schema
+import weekend_engine
+import update_sas_awards as u
+import split_weekend_trips as s
+
+PER_CITY = """
+    SELECT origin, inbound, outbound, ag_in, ap_in, ag_out, ap_out
+    FROM weekend_pairs
+    WHERE origin = ? AND city_name = ?
+      AND (ag_in >= 2 OR ap_in >= 2) AND (ag_out >= 2 OR ap_out >= 2)
+      AND inbound BETWEEN date('now') AND date('now','+1 year')
+    ORDER BY inbound, outbound
+"""
+
+
+def test_export_matches_per_city_queries(tmp_path, monkeypatch):
+    monkeypatch.setattr(u, "DB_PATH", str(tmp_path / "sas.sqlite"))
+    conn = u.connect_db()
+    rng = random.Random(11)
+    today = weekend_engine.utc_today()
+    u.apply_incremental(conn, [
+        (origin, code, city, "Norge", direction,
+         (today + datetime.timedelta(days=offset)).isoformat(), 0,
+         rng.choice((0, 2)), rng.choice((0, 1, 3)), 0)
+        for origin in ("ARN", "CPH")
+        for code, city in (("BGO", "Bergen"), ("OSL", "Oslo/Gardermoen"), ("TRD", "Trondheim Vaernes"))
+        for direction in ("outbound", "inbound")
+        for offset in range(-3, 50)
+        if rng.random() < 0.7
+    ])
+    schema.rebuild_weekend_pairs(conn)
+
+    out = tmp_path / "out"
+    written = s.export(conn, str(out))
+    names = sorted(os.path.basename(p) for p, _ in written)
+    assert "ARN_OSL_Oslo-Gardermoen.csv" in names and "CPH_TRD_Trondheim_Vaernes.csv" in names
+    for path, n in written:
+        origin, code = os.path.basename(path).split("_")[:2]
+        city = conn.execute("SELECT city_name FROM flights WHERE airport_code = ?", (code,)).fetchone()[0]
+        with open(path, newline="") as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == s.HEADER
+        expected = [[str(v) for v in r] for r in conn.execute(PER_CITY, (origin, city))]
+        assert rows[1:] == expected and n == len(expected)
+    assert sum(n for _, n in written) > 0
+    conn.close()
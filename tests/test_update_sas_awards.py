@@ -0,0 +1,362 @@
+"""Tests for the SAS award fetcher (no network)."""
+import sys, os, sqlite3
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+import update_sas_awards as u
+
+
+DESTS = [
+    {"airportCode": code, "cityName": f"City {code}", "countryName": "Norge"}
+    for code in ("BGO", "OSL", "TRD", "SVG", "BOO")
+]
+
+
+def _fake_availability(origin, code, session=None):
+    if code == "TRD":
+        return None
+    return {"availability": {
+        "outbound": [{"date": "2030-01-03", "availableSeatsTotal": 4, "AG": 2, "AP": 1, "AB": len(code)}],
+        "inbound": [{"date": "2030-01-06", "availableSeatsTotal": 2, "AG": 0, "AP": 2, "AB": 0}],
+    }}
+
+
+def _fetch_rows(tmp_path, concurrency):
+    """Rows of one ARN run through the checkpointed fetch main() uses, in a fresh DB."""
+    conn = sqlite3.connect(str(tmp_path / f"fetch-{concurrency}.sqlite"))
+    u.ensure_change_log(conn)
+    u.ensure_checkpoints(conn)
+    run_id = u.start_run(conn, "2030-01-01T05:00:00")
+    assert u.fetch_origin_checkpointed(conn, run_id, "ARN", concurrency=concurrency) == 0
+    rows = u.checkpoint_rows(conn, run_id, ["ARN"])
+    conn.close()
+    return rows
+
+
+def test_concurrent_fetch_matches_sequential(tmp_path, monkeypatch):
+    monkeypatch.setattr(u, "get_all_destinations", lambda origin, session=None: DESTS)
+    monkeypatch.setattr(u, "fetch_availability", _fake_availability)
+    monkeypatch.setattr(u, "_limiters", {})
+    sequential = _fetch_rows(tmp_path, concurrency=1)
+    concurrent = _fetch_rows(tmp_path, concurrency=4)
+    assert concurrent == sequential
+    assert len(sequential) == 8
+    assert [r[1] for r in sequential[::2]] == ["BGO", "OSL", "SVG", "BOO"]
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = u.RateLimiter(200)
+    start = u.time.monotonic()
+    for _ in range(5):
+        limiter.wait()
+    assert u.time.monotonic() - start >= 4 * limiter.interval * 0.9
+    assert u.RateLimiter(0).interval == 0.0
+
+
+def _row(code, date, ab, direction="outbound", city=None):
+    return ("ARN", code, city or f"City {code}", "Norge", direction, date, ab, 0, 0, ab)
+
+
+def _flights(conn):
+    return sorted(conn.execute(f"SELECT {u.FLIGHT_COLS} FROM flights").fetchall())
+
+
+def test_incremental_apply_writes_only_deltas(tmp_path, monkeypatch):
+    monkeypatch.setattr(u, "DB_PATH", str(tmp_path / "sas.sqlite"))
+    conn = u.connect_db()
+    first = [_row("BGO", "2030-01-03", 2), _row("OSL", "2030-01-03", 4), _row("TRD", "2030-01-04", 1)]
+    added, removed, changed = u.apply_incremental(conn, first)
+    assert len(added) == 3 and not removed and not changed
+
+    second = [_row("BGO", "2030-01-03", 2), _row("OSL", "2030-01-03", 6), _row("SVG", "2030-01-05", 3)]
+    u.stage_rows(conn, second)
+    added, removed, changed = u.staged_changes(conn)
+    before_changes = conn.total_changes
+    u.apply_staged(conn)
+    conn.commit()
+    # Unchanged BGO row is not rewritten: one insert, one replace, one delete
+    assert conn.total_changes - before_changes == 3
+    assert [r[1] for r in added] == ["SVG"]
+    assert [r[1] for r in removed] == ["TRD"]
+    assert changed == [(("ARN", "OSL", "outbound", "2030-01-03", 4, 0, 0, 4),
+                        ("ARN", "OSL", "outbound", "2030-01-03", 6, 0, 0, 6))]
+    assert _flights(conn) == sorted(second)
+
+    assert u.rewrite_all(conn, second) == ([], [], [])
+    assert _flights(conn) == sorted(second)
+    conn.close()
+
+
+def test_change_log_feeds_new_seats(tmp_path, monkeypatch):
+    import queries
+    monkeypatch.setattr(u, "DB_PATH", str(tmp_path / "sas.sqlite"))
+    conn = u.connect_db()
+    u.ensure_change_log(conn)
+    u.apply_incremental(conn, [_row("BGO", "2030-01-03", 1), _row("OSL", "2030-01-03", 4),
+                               _row("TRD", "2030-01-04", 2)], "2030-01-01T05:00:00")
+    u.apply_incremental(conn, [_row("BGO", "2030-01-03", 3), _row("OSL", "2030-01-03", 5),
+                               _row("SVG", "2030-01-05", 2)], "2030-01-02T05:00:00")
+
+    events = conn.execute("""
+        SELECT airport_code, cabin, change, seats_before, seats_after
+        FROM flight_changes WHERE fetch_date = '2030-01-02' ORDER BY airport_code, cabin
+    """).fetchall()
+    assert ("BGO", "ab", "changed", 1, 3) in events
+    assert ("SVG", "ab", "appeared", 0, 2) in events
+    assert ("TRD", "ab", "disappeared", 2, 0) in events
+
+    cur = conn.cursor()
+    assert queries.change_window(cur) == ("2030-01-02", "2030-01-01")
+    new = queries.new_seats(cur, "2030-01-02", cabin="ab", order="f.airport_code")
+    # OSL already had >= 2 business seats yesterday, so only BGO and SVG are new
+    assert [(r[2], r[5]) for r in new] == [("BGO", 3), ("SVG", 2)]
+    conn.close()
+
+
+def _history_run(conn, rows, fetched_at):
+    u.apply_incremental(conn, rows, fetched_at)
+    u.record_history(conn, fetched_at[:10])
+    conn.commit()
+
+
+def test_history_stores_only_changed_rows(tmp_path, monkeypatch):
+    import queries
+    db = str(tmp_path / "sas.sqlite")
+    monkeypatch.setattr(u, "DB_PATH", db)
+    monkeypatch.setattr(queries, "DB_PATH", db)
+    conn = u.connect_db()
+    u.ensure_flight_history(conn)
+    day1 = [_row("BGO", "2030-01-03", 1), _row("OSL", "2030-01-03", 4)]
+    day2 = [_row("BGO", "2030-01-03", 3), _row("OSL", "2030-01-03", 4)]
+    day3 = [_row("OSL", "2030-01-03", 4)]
+    _history_run(conn, day1, "2030-01-01T05:00:00")
+    _history_run(conn, day2, "2030-01-02T05:00:00")
+    _history_run(conn, day2, "2030-01-02T11:00:00")
+    _history_run(conn, day3, "2030-01-03T05:00:00")
+
+    # OSL never changed: one version. BGO: two versions, the second closed on day 3.
+    assert conn.execute("SELECT COUNT(*) FROM flight_versions").fetchone()[0] == 3
+    seats = lambda d: {r["airport_code"]: r["ab"] for r in queries.flights_as_of(d)}
+    assert seats("2030-01-01") == {"BGO": 1, "OSL": 4}
+    assert seats("2030-01-02") == {"BGO": 3, "OSL": 4}
+    assert seats("2030-01-03") == {"OSL": 4}
+    view = conn.execute(
+        "SELECT airport_code, ab FROM flight_history WHERE fetch_date = '2030-01-02' ORDER BY 1"
+    ).fetchall()
+    assert view == [("BGO", 3), ("OSL", 4)]
+    conn.close()
+
+
+def test_legacy_snapshot_history_is_migrated(tmp_path, monkeypatch):
+    monkeypatch.setattr(u, "DB_PATH", str(tmp_path / "sas.sqlite"))
+    conn = u.connect_db()
+    conn.execute("""
+        CREATE TABLE flight_history (
+          fetch_date TEXT, origin TEXT, airport_code TEXT, city_name TEXT, country_name TEXT,
+          direction TEXT, date TEXT, total INTEGER, ag INTEGER, ap INTEGER, ab INTEGER,
+          PRIMARY KEY (fetch_date, origin, airport_code, direction, date))
+    """)
+    for fetch_date, rows in (("2030-01-01", [_row("BGO", "2030-01-03", 1)]),
+                             ("2030-01-02", [_row("BGO", "2030-01-03", 1)]),
+                             ("2030-01-03", [_row("BGO", "2030-01-03", 2)])):
+        conn.executemany("INSERT INTO flight_history VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                         [(fetch_date,) + r for r in rows])
+    conn.commit()
+    u.ensure_flight_history(conn)
+    assert conn.execute("SELECT COUNT(*) FROM flight_versions").fetchone()[0] == 2
+    assert conn.execute(
+        "SELECT fetch_date, ab FROM flight_history ORDER BY fetch_date"
+    ).fetchall() == [("2030-01-01", 1), ("2030-01-02", 1), ("2030-01-03", 2)]
+    conn.close()
+
+
+def test_failed_run_resumes_only_missing_destinations(tmp_path, monkeypatch):
+    monkeypatch.setattr(u, "DB_PATH", str(tmp_path / "sas.sqlite"))
+    monkeypatch.setattr(u, "ORIGINS", ["ARN"])
+    monkeypatch.setattr(u, "RETRIES", 0)
+    monkeypatch.setattr(u, "_limiters", {})
+    monkeypatch.setattr(u, "get_all_destinations", lambda origin, session=None: DESTS)
+    calls = []
+    broken = {"OSL"}
+
+    def flaky(origin, code, session=None):
+        calls.append(code)
+        if code in broken:
+            raise u.requests.ConnectionError("reset by peer")
+        return _fake_availability(origin, code)
+
+    monkeypatch.setattr(u, "fetch_availability", flaky)
+    with pytest.raises(RuntimeError, match="--resume"):
+        u.main([])
+    assert sorted(calls) == sorted(d["airportCode"] for d in DESTS)
+
+    # A plain rerun (cron) resumes the recent incomplete run
+    calls.clear()
+    broken.clear()
+    u.main([])
+    assert calls == ["OSL"]
+
+    conn = u.connect_db()
+    expected = [r for d in DESTS for r in u.availability_rows("ARN", d, _fake_availability("ARN", d["airportCode"]))]
+    assert _flights(conn) == sorted(expected)
+    assert conn.execute("SELECT status FROM fetch_runs").fetchall() == [("complete",)]
+    assert conn.execute("SELECT COUNT(*) FROM fetch_run_destinations").fetchone()[0] == 0
+    conn.close()
+
+
+def test_start_run_resumes_recent_runs_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(u, "DB_PATH", str(tmp_path / "sas.sqlite"))
+    conn = u.connect_db()
+    u.ensure_flight_history(conn)
+    u.ensure_checkpoints(conn)
+    run = u.start_run(conn, "2030-01-01T05:00:00")
+    assert u.start_run(conn, "2030-01-01T06:00:00", max_age_hours=12) == run
+    assert u.start_run(conn, "2030-01-02T05:00:00", resume=True, max_age_hours=12) == run
+
+    # Too old for the default, or --fresh: a new run, and the old one is abandoned
+    stale = u.start_run(conn, "2030-01-02T05:00:00", max_age_hours=12)
+    assert stale != run
+    fresh = u.start_run(conn, "2030-01-02T06:00:00", resume=False)
+    assert fresh not in (run, stale)
+    assert conn.execute("SELECT run_id, status FROM fetch_runs ORDER BY run_id").fetchall() == [
+        (run, "abandoned"), (stale, "abandoned"), (fresh, "running")]
+    assert u.parse_args(["--fresh"]).resume is False and u.parse_args([]).resume is None
+    conn.close()
+
+
+def test_run_is_complete_only_with_its_history(tmp_path, monkeypatch):
+    monkeypatch.setattr(u, "DB_PATH", str(tmp_path / "sas.sqlite"))
+    monkeypatch.setattr(u, "ORIGINS", ["ARN"])
+    monkeypatch.setattr(u, "_limiters", {})
+    monkeypatch.setattr(u, "get_all_destinations", lambda origin, session=None: DESTS)
+    monkeypatch.setattr(u, "fetch_availability", _fake_availability)
+
+    def crash(conn, fetch_date, **kwargs):
+        raise RuntimeError("killed before history")
+
+    monkeypatch.setattr(u, "record_history", crash)
+    with pytest.raises(RuntimeError, match="killed"):
+        u.main([])
+    conn = u.connect_db()
+    assert conn.execute("SELECT status FROM fetch_runs").fetchall() == [("running",)]
+    assert conn.execute("SELECT COUNT(*) FROM flight_history").fetchone()[0] == 0
+    conn.close()
+
+
+def test_refresh_is_one_transaction_with_its_version_bump(tmp_path, monkeypatch):
+    monkeypatch.setattr(u, "DB_PATH", str(tmp_path / "sas.sqlite"))
+    monkeypatch.setattr(u, "ORIGINS", ["ARN"])
+    monkeypatch.setattr(u, "_limiters", {})
+    monkeypatch.setattr(u, "get_all_destinations", lambda origin, session=None: DESTS)
+    monkeypatch.setattr(u, "fetch_availability", _fake_availability)
+
+    def crash(conn, commit=True):
+        raise RuntimeError("killed before weekend pairs")
+
+    monkeypatch.setattr(u.schema, "rebuild_weekend_pairs", crash)
+    with pytest.raises(RuntimeError, match="killed"):
+        u.main([])
+    conn = u.connect_db()
+    assert u.schema.data_version(conn)[0] == 1
+    assert conn.execute("SELECT COUNT(*) FROM flights").fetchone()[0] == 0
+    assert conn.execute("SELECT status FROM fetch_runs").fetchall() == [("running",)]
+    conn.close()
+
+    monkeypatch.undo()
+    monkeypatch.setattr(u, "DB_PATH", str(tmp_path / "sas.sqlite"))
+    monkeypatch.setattr(u, "ORIGINS", ["ARN"])
+    monkeypatch.setattr(u, "_limiters", {})
+    monkeypatch.setattr(u, "get_all_destinations", lambda origin, session=None: DESTS)
+    monkeypatch.setattr(u, "fetch_availability", _fake_availability)
+    u.main([])
+    conn = u.connect_db()
+    assert u.schema.data_version(conn)[0] == 2
+    assert conn.execute("SELECT COUNT(*) FROM flights").fetchone()[0] > 0
+    conn.close()
+
+
+def test_with_retries_backs_off_on_server_errors(monkeypatch):
+    monkeypatch.setattr(u, "BACKOFF", 0)
+    attempts = []
+
+    def fn():
+        attempts.append(1)
+        resp = u.requests.Response()
+        resp.status_code = 503 if len(attempts) < 3 else 404
+        raise u.requests.HTTPError(response=resp)
+
+    with pytest.raises(u.requests.HTTPError) as e:
+        u.with_retries(fn, retries=5)
+    assert e.value.response.status_code == 404
+    assert len(attempts) == 3
+
+
+def test_fetch_against_replay_server(tmp_path, monkeypatch):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "scripts"))
+    import sas_replay_server as replay
+
+    source = replay.SyntheticSAS(12, days=30, seed=7)
+    server = replay.start_server(source, port=0, latency_ms=5)
+    try:
+        host, port = server.server_address
+        monkeypatch.setattr(u, "BASE_URL", f"http://{host}:{port}/bff/award-finder/destinations/v1")
+        monkeypatch.setattr(u, "_limiters", {})
+        sequential = _fetch_rows(tmp_path, concurrency=1)
+        concurrent = _fetch_rows(tmp_path, concurrency=6)
+    finally:
+        server.shutdown()
+    assert concurrent == sequential
+    assert {r[1] for r in sequential} == {d["airportCode"] for d in source.dests}
+    expected = sum(
+        len(source.availability("ARN", d["airportCode"])[0]["availability"][direction])
+        for d in source.dests for direction in ("outbound", "inbound")
+    )
+    assert len(sequential) == expected
+
+
+def test_weekend_pairs_match_flights_self_join(tmp_path, monkeypatch):
+    import random
+    import queries
+    import schema
+    db = str(tmp_path / "sas.sqlite")
+    monkeypatch.setattr(u, "DB_PATH", db)
+    monkeypatch.setattr(queries, "DB_PATH", db)
+    conn = u.connect_db()
+    rng = random.Random(1)
+    today = u.datetime.date.today()
+    rows = [
+        ("ARN", code, f"City {code}", "Norge", direction,
+         (today + u.datetime.timedelta(days=offset)).isoformat(), 0,
+         rng.choice((0, 1, 2, 3)), rng.choice((0, 2)), rng.choice((0, 1, 2)))
+        for code in ("BGO", "OSL")
+        for direction in ("outbound", "inbound")
+        for offset in range(-10, 60)
+        if rng.random() < 0.8
+    ]
+    u.apply_incremental(conn, rows)
+    assert schema.rebuild_weekend_pairs(conn) > 0
+
+    # The self-join query_weekend_pairs ran before weekend_pairs existed
+    expected = conn.execute("""
+        SELECT inb.origin, inb.airport_code, outb.date, inb.date,
+               outb.ag, outb.ap, outb.ab, inb.ag, inb.ap, inb.ab
+        FROM flights AS inb
+        JOIN flights AS outb
+          ON inb.airport_code = outb.airport_code AND inb.origin = outb.origin
+        WHERE inb.direction = 'inbound' AND outb.direction = 'outbound'
+          AND (outb.ag >= 2 OR outb.ap >= 2 OR outb.ab >= 2)
+          AND (inb.ag >= 2 OR inb.ap >= 2 OR inb.ab >= 2)
+          AND strftime('%w', inb.date) IN ('6','0','1')
+          AND strftime('%w', outb.date) IN ('3','4','5')
+          AND (julianday(inb.date) - julianday(outb.date)) BETWEEN 3 AND 4
+          AND date(inb.date) BETWEEN date('now') AND date('now','+1 year')
+    """).fetchall()
+    conn.close()
+    got = queries.query_weekend_pairs(per_page=1000)
+    assert got["total"] == len(expected) > 0
+    assert sorted(
+        (r["origin"], r["airport_code"], r["outbound"], r["inbound"],
+         r["ag_out"], r["ap_out"], r["ab_out"], r["ag_in"], r["ap_in"], r["ab_in"])
+        for r in got["rows"]
+    ) == sorted(expected)
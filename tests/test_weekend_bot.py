@@ -0,0 +1,88 @@
+"""Tests for the Telegram bot's data access (no network; handlers get stub updates)."""
+import sys, os, asyncio, time, types
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+pytest.importorskip("telegram")
+
+import schema
+import update_sas_awards as u
+import weekend_bot
+
+
+class _Message:
+    def __init__(self, text):
+        self.text = text
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+def _update(text):
+    return types.SimpleNamespace(message=_Message(text))
+
+
+@pytest.fixture
+def bot_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "sas.sqlite")
+    monkeypatch.setattr(u, "DB_PATH", path)
+    monkeypatch.setattr(weekend_bot, "DB_PATH", path)
+    monkeypatch.setattr(weekend_bot, "_cache", weekend_bot.OrderedDict())
+    conn = u.connect_db()
+    today = u.datetime.datetime.now(u.datetime.timezone.utc).date()
+    friday = today + u.datetime.timedelta(days=(4 - today.weekday()) % 7 + 7)
+    monday = friday + u.datetime.timedelta(days=3)
+    u.apply_incremental(conn, [
+        ("ARN", "BCN", "Barcelona", "Spanien", "outbound", friday.isoformat(), 4, 2, 0, 2),
+        ("ARN", "BCN", "Barcelona", "Spanien", "inbound", monday.isoformat(), 4, 3, 0, 0),
+    ])
+    schema.rebuild_weekend_pairs(conn)
+    yield conn, friday, monday
+    conn.close()
+
+
+def test_city_answers_are_cached_until_the_data_version_changes(bot_db):
+    conn, friday, monday = bot_db
+    rows = weekend_bot.weekend_pairs_for_city("barcelona")
+    assert rows == [("ARN", monday.isoformat(), friday.isoformat(), 3, 2)]
+
+    conn.execute("DELETE FROM weekend_pairs")
+    conn.commit()
+    assert weekend_bot.weekend_pairs_for_city("barcelona") == rows
+    schema.bump_data_version(conn)
+    assert weekend_bot.weekend_pairs_for_city("barcelona") == []
+
+
+def test_handlers_reply_from_worker_threads(bot_db):
+    _, friday, monday = bot_db
+    city, biz = _update("/Barcelona"), _update("/business Barcelona")
+    context = types.SimpleNamespace(args=["Barcelona"])
+
+    async def run():
+        await asyncio.gather(
+            weekend_bot.city_handler(city, None),
+            weekend_bot.business_handler(biz, context),
+        )
+
+    asyncio.run(run())
+    assert f"`ARN {monday} {friday} 3/2`" in city.message.replies[0]
+    assert f"`ARN {friday} out 2B`" in biz.message.replies[0]
+
+
+def test_slow_query_does_not_block_the_event_loop(bot_db, monkeypatch):
+    monkeypatch.setattr(weekend_bot, "weekend_pairs_for_city", lambda city: time.sleep(0.3) or [])
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.02)
+
+    async def run():
+        await asyncio.gather(weekend_bot.city_handler(_update("/Oslo"), None), ticker())
+
+    start = time.monotonic()
+    asyncio.run(run())
+    assert ticks[-1] - start < 0.3
@@ -0,0 +1,83 @@
+"""The in-memory weekend engine must agree with the SQL definitions of a weekend pair."""
+import sys, os, random, datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+import queries
+import schema
+import weekend_engine
+import update_sas_awards as u
+
+SELF_JOIN = """
+    SELECT inb.origin, inb.airport_code, outb.date, inb.date,
+           outb.ag, outb.ap, outb.ab, inb.ag, inb.ap, inb.ab
+    FROM flights AS inb
+    JOIN flights AS outb
+      ON inb.airport_code = outb.airport_code AND inb.origin = outb.origin
+    WHERE inb.direction = 'inbound' AND outb.direction = 'outbound'
+      AND (outb.ag >= 2 OR outb.ap >= 2 OR outb.ab >= 2)
+      AND (inb.ag >= 2 OR inb.ap >= 2 OR inb.ab >= 2)
+      AND strftime('%w', inb.date) IN ('6','0','1')
+      AND strftime('%w', outb.date) IN ('3','4','5')
+      AND (julianday(inb.date) - julianday(outb.date)) BETWEEN ? AND ?
+      AND date(inb.date) BETWEEN date('now') AND date('now','+1 year')
+"""
+
+
+@pytest.fixture(params=["numpy", "python"])
+def engine(request, tmp_path, monkeypatch):
+    if request.param == "numpy" and weekend_engine.np is None:
+        pytest.skip("numpy not installed")
+    if request.param == "python":
+        monkeypatch.setattr(weekend_engine, "np", None)
+    db = str(tmp_path / "sas.sqlite")
+    monkeypatch.setattr(u, "DB_PATH", db)
+    monkeypatch.setattr(queries, "DB_PATH", db)
+    monkeypatch.setattr(queries, "_matrix", (None, None))
+    conn = u.connect_db()
+    rng = random.Random(3)
+    today = weekend_engine.utc_today()
+    rows = [
+        (origin, code, f"City {code}", country, direction,
+         (today + datetime.timedelta(days=offset)).isoformat(), 0,
+         rng.choice((0, 1, 2, 3)), rng.choice((0, 2)), rng.choice((0, 1, 2)))
+        for origin in ("ARN", "CPH")
+        for code, country in (("BGO", "Norge"), ("EWR", "USA"))
+        for direction in ("outbound", "inbound")
+        for offset in range(-10, 80)
+        if rng.random() < 0.8
+    ]
+    u.apply_incremental(conn, rows)
+    schema.rebuild_weekend_pairs(conn)
+    yield conn
+    conn.close()
+
+
+def _key(r):
+    return (r["origin"], r["airport_code"], r["outbound"], r["inbound"],
+            r["ag_out"], r["ap_out"], r["ab_out"], r["ag_in"], r["ap_in"], r["ab_in"])
+
+
+@pytest.mark.parametrize("cabin", ["all", "business_plus", "business"])
+def test_default_window_matches_weekend_pairs_table(engine, cabin):
+    expected = queries.query_weekend_pairs(cabin=cabin, per_page=10000)["rows"]
+    got = queries.availability_matrix().pairs(cabin=cabin)
+    assert expected and got == expected
+
+
+def test_longer_trips_match_self_join(engine):
+    expected = engine.execute(SELF_JOIN, (5, 7)).fetchall()
+    got = queries.weekend_pairs_window((5, 7), limit=10000)
+    assert got and sorted(map(_key, got)) == sorted(expected)
+    assert [(r["outbound"], r["inbound"]) for r in got] == sorted((r["outbound"], r["inbound"]) for r in got)
+
+    usa = queries.weekend_pairs_window((5, 7), countries=["USA"], origin="CPH")
+    assert usa and {(r["origin"], r["airport_code"]) for r in usa} == {("CPH", "EWR")}
+
+
+def test_route_pairs_for_custom_window(engine):
+    expected = [r for r in engine.execute(SELF_JOIN, (5, 7)).fetchall() if r[:2] == ("ARN", "BGO")]
+    got = queries.weekend_pairs_for_route("ARN", "BGO", trip_days=(5, 7))
+    assert [(r["outbound"], r["inbound"], r["ag_out"], r["ab_in"]) for r in got] == \
+        sorted((r[2], r[3], r[4], r[9]) for r in expected)
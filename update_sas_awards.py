@@ -1,21 +1,90 @@
 #!/usr/bin/env python3
+import argparse
+import json
 import requests
-import sqlite3
 import datetime
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+
+import db
+import schema
 
 # ——— CONFIGURATION —————————————————————————————————————————————
 DB_PATH      = os.path.expanduser(os.environ.get("SAS_DB_PATH", "~/sas_awards/sas_awards.sqlite"))
-BASE_URL     = "https://www.sas.se/bff/award-finder/destinations/v1"
+# point at scripts/sas_replay_server.py (e.g. http://127.0.0.1:8765) to run offline
+API_BASE     = os.environ.get("SAS_API_BASE", "https://www.sas.se/bff/award-finder").rstrip("/")
+BASE_URL     = f"{API_BASE}/destinations/v1"
 MARKET       = "se-sv"
 ORIGINS      = ["ARN", "CPH"]  # Stockholm Arlanda, Copenhagen
 PASSENGERS   = 1
 # leave SELECT_CLASS = "" for all cabins; set to "AG", "AP" or "AB" to restrict
 SELECT_CLASS = ""
+# parallel fetch_availability calls per origin (1 = sequential)
+CONCURRENCY  = int(os.environ.get("SAS_FETCH_CONCURRENCY", "8"))
+# max requests per second per host, shared by all workers (0 = unlimited)
+RATE_LIMIT   = float(os.environ.get("SAS_FETCH_RATE", "10"))
+# retries per request on timeouts, connection errors, 429 and 5xx
+RETRIES      = int(os.environ.get("SAS_FETCH_RETRIES", "3"))
+# seconds before the first retry; doubles on each further attempt
+BACKOFF      = float(os.environ.get("SAS_FETCH_BACKOFF", "2"))
+# days of flight_versions / flight_changes history to keep
+HISTORY_DAYS = int(os.environ.get("SAS_HISTORY_DAYS", "90"))
+# an incomplete run younger than this many hours is resumed by default (0 = never)
+RESUME_HOURS = float(os.environ.get("SAS_RESUME_HOURS", "12"))
 # ——————————————————————————————————————————————————————————————
 
-def get_all_destinations(origin):
+FLIGHT_COLS = "origin, airport_code, city_name, country_name, direction, date, total, ag, ap, ab"
+
+class RateLimiter:
+    """Space calls to one host at least 1/rate seconds apart, across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def _limiter_for(url):
+    """One shared RateLimiter per host."""
+    host = urlparse(url).netloc
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = RateLimiter(RATE_LIMIT)
+        return _limiters[host]
+
+def make_session(pool_size=CONCURRENCY):
+    """Keep-alive session whose connection pool fits `pool_size` workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def _get_json(params, timeout, session=None):
+    _limiter_for(BASE_URL).wait()
+    resp = (session or requests).get(BASE_URL, params=params, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+def get_all_destinations(origin, session=None):
     """Fetch list of all destination codes from given origin."""
     params = {
         "market": MARKET,
@@ -27,11 +96,9 @@ def get_all_destinations(origin):
         "availability": str(False).lower(),
         "selectedFlightClass": SELECT_CLASS,
     }
-    resp = requests.get(BASE_URL, params=params, timeout=30)
-    resp.raise_for_status()
-    return resp.json()
+    return _get_json(params, 30, session)
 
-def fetch_availability(origin, dest_code):
+def fetch_availability(origin, dest_code, session=None):
     """Fetch outbound/inbound availability for one origin-destination pair."""
     params = {
         "market": MARKET,
@@ -43,14 +110,187 @@ def fetch_availability(origin, dest_code):
         "availability": str(True).lower(),
         "selectedFlightClass": SELECT_CLASS,
     }
-    resp = requests.get(BASE_URL, params=params, timeout=60)
-    resp.raise_for_status()
-    data = resp.json()
+    data = _get_json(params, 60, session)
     return data[0] if data else None
 
+def availability_rows(origin, dest, rec):
+    """Flatten one fetch_availability record into flights rows."""
+    rows = []
+    if not rec:
+        return rows
+    code    = dest["airportCode"]
+    city    = dest["cityName"]
+    country = dest.get("countryName", "")
+    for direction in ("outbound", "inbound"):
+        for x in rec.get("availability", {}).get(direction, []):
+            rows.append((
+                origin,
+                code,
+                city,
+                country,
+                direction,
+                x["date"],
+                x.get("availableSeatsTotal", 0),
+                x.get("AG", 0),
+                x.get("AP", 0),
+                x.get("AB", 0),
+            ))
+    return rows
+
+def _retriable(exc):
+    resp = getattr(exc, "response", None)
+    return resp is None or resp.status_code == 429 or resp.status_code >= 500
+
+def with_retries(fn, *args, retries=None):
+    """Call fn(*args), retrying transient request errors with exponential backoff."""
+    retries = RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args)
+        except requests.RequestException as e:
+            if attempt >= retries or not _retriable(e):
+                raise
+            time.sleep(BACKOFF * 2 ** attempt)
+
+def iter_destination_rows(origin, dests, session, concurrency=CONCURRENCY):
+    """
+    Fetch availability for dests, up to `concurrency` at once.
+    Yields (index, rows, error) per destination in completion order.
+    """
+    def fetch(d):
+        rec = with_retries(fetch_availability, origin, d["airportCode"], session)
+        return availability_rows(origin, d, rec)
+
+    if concurrency <= 1:
+        for i, d in enumerate(dests):
+            try:
+                yield i, fetch(d), None
+            except Exception as e:
+                yield i, None, e
+        return
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(fetch, d): i for i, d in enumerate(dests)}
+        for fut in as_completed(futures):
+            err = fut.exception()
+            yield futures[fut], (None if err else fut.result()), err
+
+def ensure_checkpoints(conn):
+    """Create fetch_run_destinations: per-(origin, destination) progress of a run."""
+    conn.cursor().execute("""
+      CREATE TABLE IF NOT EXISTS fetch_run_destinations (
+        run_id       INTEGER,
+        origin       TEXT,
+        seq          INTEGER,  -- position in the origin's destination list
+        airport_code TEXT,
+        city_name    TEXT,
+        country_name TEXT,
+        status       TEXT,     -- 'pending', 'done' or 'failed'
+        attempts     INTEGER DEFAULT 0,
+        error        TEXT,
+        rows_json    TEXT,
+        updated_at   TEXT,
+        PRIMARY KEY (run_id, origin, airport_code)
+      )
+    """)
+    conn.commit()
+
+def start_run(conn, started_at, resume=None, max_age_hours=None):
+    """
+    Return the run_id to fetch into. By default (resume=None) that is the
+    latest incomplete run if it started less than max_age_hours
+    (RESUME_HOURS) ago, so a cron rerun after a failure fetches only what is
+    missing. resume=True takes the latest incomplete run at any age and
+    resume=False always starts over. A new run abandons older incomplete ones.
+    """
+    max_age_hours = RESUME_HOURS if max_age_hours is None else max_age_hours
+    cur = conn.cursor()
+    if resume is not False:
+        cur.execute("""
+          SELECT run_id, fetched_at FROM fetch_runs
+           WHERE status = 'running' ORDER BY run_id DESC LIMIT 1
+        """)
+        row = cur.fetchone()
+        if row:
+            age = datetime.datetime.fromisoformat(started_at) - datetime.datetime.fromisoformat(row[1])
+            if resume or age < datetime.timedelta(hours=max_age_hours):
+                print(f"Resuming incomplete run {row[0]} from {row[1]}.", file=sys.stderr)
+                return row[0]
+            print(f"Incomplete run {row[0]} from {row[1]} is too old to resume; starting a new one.",
+                  file=sys.stderr)
+        elif resume:
+            print("No incomplete run to resume; starting a new one.", file=sys.stderr)
+    cur.execute("UPDATE fetch_runs SET status = 'abandoned' WHERE status = 'running'")
+    cur.execute("""
+      DELETE FROM fetch_run_destinations
+       WHERE run_id NOT IN (SELECT run_id FROM fetch_runs WHERE status = 'running')
+    """)
+    cur.execute(
+        "INSERT INTO fetch_runs (fetch_date, fetched_at, status) VALUES (?, ?, 'running')",
+        (started_at[:10], started_at),
+    )
+    conn.commit()
+    return cur.lastrowid
+
+def fetch_origin_checkpointed(conn, run_id, origin, concurrency=CONCURRENCY):
+    """
+    Fetch the destinations of origin that are not yet done in run_id,
+    checkpointing each one as it finishes. Returns the number that failed.
+    """
+    cur = conn.cursor()
+    concurrency = max(1, concurrency)
+    with make_session(concurrency) as session:
+        cur.execute("SELECT COUNT(*) FROM fetch_run_destinations WHERE run_id = ? AND origin = ?",
+                    (run_id, origin))
+        if not cur.fetchone()[0]:
+            all_dests = with_retries(get_all_destinations, origin, session)
+            cur.executemany("""
+              INSERT OR IGNORE INTO fetch_run_destinations
+                (run_id, origin, seq, airport_code, city_name, country_name, status)
+              VALUES (?, ?, ?, ?, ?, ?, 'pending')
+            """, [(run_id, origin, i, d["airportCode"], d["cityName"], d.get("countryName", ""))
+                  for i, d in enumerate(all_dests)])
+            conn.commit()
+        cur.execute("""
+          SELECT airport_code, city_name, country_name FROM fetch_run_destinations
+           WHERE run_id = ? AND origin = ? AND status != 'done'
+           ORDER BY seq
+        """, (run_id, origin))
+        todo = [{"airportCode": r[0], "cityName": r[1], "countryName": r[2]} for r in cur.fetchall()]
+
+        failed = 0
+        for i, rows, err in iter_destination_rows(origin, todo, session, concurrency):
+            code = todo[i]["airportCode"]
+            if err:
+                failed += 1
+                print(f"ERROR: {origin}-{code}: {err}", file=sys.stderr)
+            cur.execute("""
+              UPDATE fetch_run_destinations
+                 SET status = ?, attempts = attempts + 1, error = ?, rows_json = ?, updated_at = ?
+               WHERE run_id = ? AND origin = ? AND airport_code = ?
+            """, ("failed" if err else "done", str(err) if err else None,
+                  None if err else json.dumps(rows),
+                  datetime.datetime.now().isoformat(timespec="seconds"),
+                  run_id, origin, code))
+            conn.commit()
+    return failed
+
+def checkpoint_rows(conn, run_id, origins=ORIGINS):
+    """All rows checkpointed in run_id, in origin and destination-list order."""
+    cur = conn.cursor()
+    rows = []
+    for origin in origins:
+        cur.execute("""
+          SELECT rows_json FROM fetch_run_destinations
+           WHERE run_id = ? AND origin = ? AND status = 'done'
+           ORDER BY seq
+        """, (run_id, origin))
+        for (rows_json,) in cur.fetchall():
+            rows.extend(tuple(r) for r in json.loads(rows_json))
+    return rows
+
 def connect_db():
-    """Ensure flights table exists (with origin) and return connection."""
-    conn = sqlite3.connect(DB_PATH)
+    """Ensure flights table exists (with origin), migrate schema and return connection."""
+    conn = db.connect(DB_PATH)
     c = conn.cursor()
     # Check if old schema (no origin) exists – migrate
     c.execute("PRAGMA table_info(flights)")
@@ -78,8 +318,120 @@ def connect_db():
         c.execute("DROP TABLE flights")
         c.execute("ALTER TABLE flights_new RENAME TO flights")
         conn.commit()
-    c.execute("""
-      CREATE TABLE IF NOT EXISTS flights (
+    # flights table and its indexes (versioned, see schema.py)
+    schema.migrate(conn)
+    return conn
+
+def ensure_change_log(conn):
+    """Create fetch_runs and the append-only flight_changes log if not exists."""
+    cur = conn.cursor()
+    cur.execute("""
+      CREATE TABLE IF NOT EXISTS fetch_runs (
+        run_id       INTEGER PRIMARY KEY,
+        fetch_date   TEXT,
+        fetched_at   TEXT,
+        status       TEXT DEFAULT 'complete'  -- 'running', 'complete' or 'abandoned'
+      )
+    """)
+    cur.execute("PRAGMA table_info(fetch_runs)")
+    if "status" not in [row[1] for row in cur.fetchall()]:
+        cur.execute("ALTER TABLE fetch_runs ADD COLUMN status TEXT DEFAULT 'complete'")
+    cur.execute("""
+      CREATE TABLE IF NOT EXISTS flight_changes (
+        change_id    INTEGER PRIMARY KEY,
+        run_id       INTEGER,
+        fetch_date   TEXT,
+        fetched_at   TEXT,
+        origin       TEXT,
+        airport_code TEXT,
+        direction    TEXT,
+        date         TEXT,
+        cabin        TEXT,     -- 'ag', 'ap' or 'ab'
+        change       TEXT,     -- 'appeared', 'disappeared' or 'changed'
+        seats_before INTEGER,
+        seats_after  INTEGER
+      )
+    """)
+    cur.execute("""
+      CREATE INDEX IF NOT EXISTS idx_flight_changes_fetch
+        ON flight_changes (fetch_date, cabin)
+    """)
+    conn.commit()
+
+CABINS = ("ag", "ap", "ab")
+
+def change_events(added, removed, changed):
+    """
+    Per-cabin events from staged_changes() deltas, as
+    (origin, airport_code, direction, date, cabin, change, seats_before, seats_after).
+    A cabin going 0 → n is 'appeared', n → 0 'disappeared', n → m 'changed'.
+    """
+    pairs = ([(None, new) for new in added]
+             + [(old, None) for old in removed]
+             + list(changed))
+    events = []
+    for old, new in pairs:
+        key = (old or new)[:4]
+        for i, cabin in enumerate(CABINS, start=5):
+            before = (old[i] or 0) if old else 0
+            after  = (new[i] or 0) if new else 0
+            if before == after:
+                continue
+            if not before:
+                change = "appeared"
+            elif not after:
+                change = "disappeared"
+            else:
+                change = "changed"
+            events.append(key + (cabin, change, before, after))
+    return events
+
+def log_changes(conn, changes, fetched_at, run_id=None):
+    """
+    Record this run's per-cabin change events (caller commits). Without
+    run_id a complete run is created for them; an existing run keeps its
+    status until complete_run() is called after its history is recorded.
+    """
+    fetch_date = fetched_at[:10]
+    cur = conn.cursor()
+    if run_id is None:
+        cur.execute(
+            "INSERT INTO fetch_runs (fetch_date, fetched_at, status) VALUES (?, ?, 'complete')",
+            (fetch_date, fetched_at),
+        )
+        run_id = cur.lastrowid
+    else:
+        cur.execute(
+            "UPDATE fetch_runs SET fetch_date = ?, fetched_at = ? WHERE run_id = ?",
+            (fetch_date, fetched_at, run_id),
+        )
+    cur.executemany("""
+      INSERT INTO flight_changes
+        (run_id, fetch_date, fetched_at, origin, airport_code, direction, date,
+         cabin, change, seats_before, seats_after)
+      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [(run_id, fetch_date, fetched_at) + e for e in change_events(*changes)])
+    return run_id
+
+def complete_run(conn, run_id):
+    """
+    Mark run_id complete (caller commits). Call it in the transaction that
+    records the run's history: flight_history only lists complete runs, so a
+    run must not become visible there before its versions exist.
+    """
+    conn.execute("UPDATE fetch_runs SET status = 'complete' WHERE run_id = ?", (run_id,))
+
+def ensure_flight_history(conn):
+    """
+    Create flight_versions (one row per distinct state of a flight, valid over
+    [valid_from, valid_to) fetch dates) and the flight_history view that
+    expands it back into per-fetch_date snapshots. Old snapshot-style
+    flight_history tables are folded into flight_versions once.
+    """
+    ensure_change_log(conn)
+    cur = conn.cursor()
+    cur.execute("""
+      CREATE TABLE IF NOT EXISTS flight_versions (
         origin       TEXT,
         airport_code TEXT,
         city_name    TEXT,
@@ -90,26 +442,99 @@ def connect_db():
         ag           INTEGER,
         ap           INTEGER,
         ab           INTEGER,
-        PRIMARY KEY (origin, airport_code, direction, date)
+        valid_from   TEXT,
+        valid_to     TEXT,     -- NULL while still current
+        PRIMARY KEY (origin, airport_code, direction, date, valid_from)
       )
     """)
+    cur.execute("""
+      CREATE UNIQUE INDEX IF NOT EXISTS idx_flight_versions_open
+        ON flight_versions (origin, airport_code, direction, date)
+        WHERE valid_to IS NULL
+    """)
+    cur.execute("""
+      CREATE INDEX IF NOT EXISTS idx_flight_versions_valid
+        ON flight_versions (valid_from, valid_to)
+    """)
+    cur.execute("SELECT type FROM sqlite_master WHERE name = 'flight_history'")
+    row = cur.fetchone()
+    if row and row[0] == "table":
+        _migrate_history_snapshots(conn)
+    cur.execute("DROP VIEW IF EXISTS flight_history")
+    cur.execute(f"""
+      CREATE VIEW flight_history AS
+      SELECT r.fetch_date, {", ".join("v." + c for c in FLIGHT_COLS.split(", "))}
+        FROM (SELECT DISTINCT fetch_date FROM fetch_runs WHERE status = 'complete') AS r
+        JOIN flight_versions AS v
+          ON v.valid_from <= r.fetch_date
+         AND (v.valid_to IS NULL OR v.valid_to > r.fetch_date)
+    """)
     conn.commit()
-    return conn
 
-def snapshot(conn):
-    """Return a set of tuples for existing flights."""
+def _migrate_history_snapshots(conn):
+    """Replay a legacy snapshot flight_history table into flight_versions, then drop it."""
     cur = conn.cursor()
-    cur.execute("""
-      SELECT origin, airport_code, direction, date, total, ag, ap, ab
-        FROM flights
-    """)
-    return set(cur.fetchall())
+    cur.execute("ALTER TABLE flight_history RENAME TO flight_history_snapshots")
+    cur.execute("SELECT DISTINCT fetch_date FROM flight_history_snapshots ORDER BY fetch_date")
+    for (fetch_date,) in cur.fetchall():
+        record_history(
+            conn, fetch_date,
+            source=f"(SELECT {FLIGHT_COLS} FROM flight_history_snapshots WHERE fetch_date = ?)",
+            params=(fetch_date,),
+        )
+        cur.execute("""
+          INSERT INTO fetch_runs (fetch_date)
+          SELECT ? WHERE NOT EXISTS (SELECT 1 FROM fetch_runs WHERE fetch_date = ?)
+        """, (fetch_date, fetch_date))
+    cur.execute("DROP TABLE flight_history_snapshots")
 
-def ensure_flight_history(conn):
-    """Create flight_history table if not exists."""
-    conn.cursor().execute("""
-      CREATE TABLE IF NOT EXISTS flight_history (
-        fetch_date   TEXT,
+def record_history(conn, fetch_date, source="flights", params=()):
+    """
+    Fold the state in `source` (default: flights) into flight_versions as of
+    fetch_date: open versions that changed or vanished are closed, and new
+    versions are opened only for rows that differ. Caller commits.
+    """
+    cur = conn.cursor()
+    same_key = ("s.origin = v.origin AND s.airport_code = v.airport_code "
+                "AND s.direction = v.direction AND s.date = v.date")
+    same_values = ("s.total IS v.total AND s.ag IS v.ag AND s.ap IS v.ap AND s.ab IS v.ab "
+                   "AND s.city_name IS v.city_name AND s.country_name IS v.country_name")
+    stale = f"""
+      valid_to IS NULL AND rowid IN (
+        SELECT v.rowid FROM flight_versions AS v
+         WHERE v.valid_to IS NULL AND NOT EXISTS (
+           SELECT 1 FROM {source} AS s WHERE {same_key} AND {same_values}
+         )
+      )
+    """
+    # A version opened earlier the same fetch_date is superseded, not closed
+    cur.execute(f"DELETE FROM flight_versions WHERE valid_from = ? AND {stale}",
+                (fetch_date,) + tuple(params))
+    cur.execute(f"UPDATE flight_versions SET valid_to = ? WHERE {stale}",
+                (fetch_date,) + tuple(params))
+    cur.execute(f"""
+      INSERT INTO flight_versions ({FLIGHT_COLS}, valid_from, valid_to)
+      SELECT {", ".join("s." + c for c in FLIGHT_COLS.split(", "))}, ?, NULL
+        FROM {source} AS s
+       WHERE NOT EXISTS (
+         SELECT 1 FROM flight_versions AS v
+          WHERE v.valid_to IS NULL AND {same_key}
+       )
+    """, (fetch_date,) + tuple(params))
+
+def prune_history(conn, fetch_date, days=HISTORY_DAYS):
+    """Drop closed versions and change-log rows older than `days` before fetch_date."""
+    cutoff = (datetime.date.fromisoformat(fetch_date) - datetime.timedelta(days=days)).isoformat()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM flight_versions WHERE valid_to IS NOT NULL AND valid_to <= ?", (cutoff,))
+    cur.execute("DELETE FROM flight_changes WHERE fetch_date < ?", (cutoff,))
+    cur.execute("DELETE FROM fetch_runs WHERE fetch_date < ?", (cutoff,))
+
+def stage_rows(conn, rows):
+    """Load freshly fetched rows into the temp flights_staging table."""
+    cur = conn.cursor()
+    cur.execute("""
+      CREATE TEMP TABLE IF NOT EXISTS flights_staging (
         origin       TEXT,
         airport_code TEXT,
         city_name    TEXT,
@@ -120,80 +545,104 @@ def ensure_flight_history(conn):
         ag           INTEGER,
         ap           INTEGER,
         ab           INTEGER,
-        PRIMARY KEY (fetch_date, origin, airport_code, direction, date)
+        PRIMARY KEY (origin, airport_code, direction, date)
       )
     """)
-    conn.commit()
+    cur.execute("DELETE FROM flights_staging")
+    cur.executemany(f"""
+      INSERT OR REPLACE INTO flights_staging ({FLIGHT_COLS})
+      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
 
-def snapshot_to_history(conn, fetch_date):
-    """Copy current flights into flight_history, then prune to last 7 days."""
+def staged_changes(conn):
+    """
+    Diff flights_staging against flights in SQL.
+    Returns (added, removed, changed): added/removed are
+    (origin, airport_code, direction, date, total, ag, ap, ab) tuples for
+    keys that appeared/disappeared; changed is a list of (old, new) tuples for
+    keys whose seat counts differ.
+    """
     cur = conn.cursor()
-    cur.execute("""
-      INSERT INTO flight_history (fetch_date, origin, airport_code, city_name, country_name, direction, date, total, ag, ap, ab)
-      SELECT ?, origin, airport_code, city_name, country_name, direction, date, total, ag, ap, ab FROM flights
-    """, (fetch_date,))
-    cur.execute("""
-      DELETE FROM flight_history
-      WHERE fetch_date < date('now', '-7 days')
+    key = ("s.origin = f.origin AND s.airport_code = f.airport_code "
+           "AND s.direction = f.direction AND s.date = f.date")
+    cur.execute(f"""
+      SELECT s.origin, s.airport_code, s.direction, s.date, s.total, s.ag, s.ap, s.ab
+        FROM flights_staging s LEFT JOIN flights f ON {key}
+       WHERE f.origin IS NULL
     """)
-    conn.commit()
+    added = cur.fetchall()
+    cur.execute(f"""
+      SELECT f.origin, f.airport_code, f.direction, f.date, f.total, f.ag, f.ap, f.ab
+        FROM flights f LEFT JOIN flights_staging s ON {key}
+       WHERE s.origin IS NULL
+    """)
+    removed = cur.fetchall()
+    cur.execute(f"""
+      SELECT f.origin, f.airport_code, f.direction, f.date, f.total, f.ag, f.ap, f.ab,
+             s.total, s.ag, s.ap, s.ab
+        FROM flights_staging s JOIN flights f ON {key}
+       WHERE s.total IS NOT f.total OR s.ag IS NOT f.ag
+          OR s.ap IS NOT f.ap OR s.ab IS NOT f.ab
+    """)
+    changed = [(r[:8], r[:4] + r[8:]) for r in cur.fetchall()]
+    return added, removed, changed
 
-def rewrite_all(conn, rows):
-    """Delete all old flights and insert these new rows."""
+def apply_staged(conn):
+    """Write only the staged deltas: upsert new/changed rows, delete vanished ones."""
     cur = conn.cursor()
-    cur.execute("DELETE FROM flights")
-    cur.executemany("""
-      INSERT OR REPLACE INTO flights
-        (origin, airport_code, city_name, country_name, direction, date, total, ag, ap, ab)
-      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, rows)
-    conn.commit()
+    cur.execute(f"""
+      INSERT OR REPLACE INTO flights ({FLIGHT_COLS})
+      SELECT {", ".join("s." + c for c in FLIGHT_COLS.split(", "))}
+        FROM flights_staging s
+        LEFT JOIN flights f
+          ON s.origin = f.origin AND s.airport_code = f.airport_code
+         AND s.direction = f.direction AND s.date = f.date
+       WHERE f.origin IS NULL
+          OR s.total IS NOT f.total OR s.ag IS NOT f.ag
+          OR s.ap IS NOT f.ap OR s.ab IS NOT f.ab
+          OR s.city_name IS NOT f.city_name OR s.country_name IS NOT f.country_name
+    """)
+    cur.execute("""
+      DELETE FROM flights
+       WHERE NOT EXISTS (
+         SELECT 1 FROM flights_staging s
+          WHERE s.origin = flights.origin AND s.airport_code = flights.airport_code
+            AND s.direction = flights.direction AND s.date = flights.date
+       )
+    """)
 
-def main():
-    conn = connect_db()
-    ensure_flight_history(conn)
-    before = snapshot(conn)
-    fetch_date = datetime.datetime.now().strftime("%Y-%m-%d")
+def apply_incremental(conn, rows, fetched_at=None, run_id=None, commit=True):
+    """
+    Stage rows, diff them against flights and write only the deltas.
+    With fetched_at, the deltas are also appended to flight_changes in the
+    same transaction. commit=False leaves it open for the caller to extend.
+    """
+    stage_rows(conn, rows)
+    changes = staged_changes(conn)
+    if fetched_at:
+        log_changes(conn, changes, fetched_at, run_id)
+    apply_staged(conn)
+    if commit:
+        conn.commit()
+    return changes
 
-    rows = []
-    for origin in ORIGINS:
-        # 1) Fetch master list of destinations from this origin
-        all_dests = get_all_destinations(origin)
-
-        # 2) Fetch availability for each destination
-        for d in all_dests:
-            code    = d["airportCode"]
-            city    = d["cityName"]
-            country = d.get("countryName", "")
-            rec     = fetch_availability(origin, code)
-            if not rec:
-                continue
-            for direction in ("outbound", "inbound"):
-                for x in rec.get("availability", {}).get(direction, []):
-                    rows.append((
-                        origin,
-                        code,
-                        city,
-                        country,
-                        direction,
-                        x["date"],
-                        x.get("availableSeatsTotal", 0),
-                        x.get("AG", 0),
-                        x.get("AP", 0),
-                        x.get("AB", 0),
-                    ))
-
-    # 3) Store to DB
-    rewrite_all(conn, rows)
-
-    # 4) Snapshot new state to flight_history (for "new since yesterday" reports)
-    snapshot_to_history(conn, fetch_date)
-
-    after = snapshot(conn)
-    added   = after - before
-    removed = before - after
+def rewrite_all(conn, rows, fetched_at=None, run_id=None, commit=True):
+    """Delete all old flights and insert these new rows (returns the same deltas)."""
+    stage_rows(conn, rows)
+    changes = staged_changes(conn)
+    if fetched_at:
+        log_changes(conn, changes, fetched_at, run_id)
+    cur = conn.cursor()
+    cur.execute("DELETE FROM flights")
+    cur.execute(f"INSERT INTO flights ({FLIGHT_COLS}) SELECT {FLIGHT_COLS} FROM flights_staging")
+    if commit:
+        conn.commit()
+    return changes
 
-    # 6) Print only today's changes
+def print_changes(added, removed, changed):
+    """Console diff; a seat-count change shows as one removed and one added line."""
+    added   = set(added) | {new for _, new in changed}
+    removed = set(removed) | {old for old, _ in changed}
     now = datetime.datetime.now().isoformat()
     print(f"Run at {now}")
     if added:
@@ -207,6 +656,74 @@ def main():
     if not added and not removed:
         print("No new flights today!")
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch SAS award availability into SQLite.")
+    parser.add_argument(
+        "--full-rewrite", action="store_true",
+        help="Replace the whole flights table instead of writing only changed rows",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--resume", dest="resume", action="store_const", const=True, default=None,
+        help="Continue the last incomplete run whatever its age, fetching only destinations it is missing "
+             f"(by default runs younger than {RESUME_HOURS:g}h, SAS_RESUME_HOURS, are resumed)",
+    )
+    mode.add_argument(
+        "--fresh", dest="resume", action="store_const", const=False,
+        help="Start a new run even if an incomplete one could be resumed",
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = connect_db()
+    ensure_flight_history(conn)
+    ensure_checkpoints(conn)
+    started_at = datetime.datetime.now().isoformat(timespec="seconds")
+    run_id = start_run(conn, started_at, resume=args.resume)
+
+    # 1+2) Destinations and availability, fetched concurrently per origin and
+    #      checkpointed per destination so a failed run can be resumed
+    failed = 0
+    for origin in ORIGINS:
+        try:
+            failed += fetch_origin_checkpointed(conn, run_id, origin)
+        except Exception as e:
+            print(f"ERROR: {origin} destination list: {e}", file=sys.stderr)
+            failed += 1
+    if failed:
+        conn.close()
+        raise RuntimeError(
+            f"{failed} fetch(es) failed; the next run within {RESUME_HOURS:g}h (or with --resume) "
+            "fetches only those")
+    rows = checkpoint_rows(conn, run_id)
+
+    # 3-5) One transaction, so readers see the old data or all of the new:
+    #   3) store to DB (only the deltas unless --full-rewrite) and log them to flight_changes
+    #   4) fold new state into flight_versions (only changed rows), prune old
+    #      history and drop this run's checkpoints
+    #   5) recompute the weekend_pairs table the dashboard, bot and reports read,
+    #      and bump the data version so their caches refresh
+    fetched_at = datetime.datetime.now().isoformat(timespec="seconds")
+    fetch_date = fetched_at[:10]
+    apply = rewrite_all if args.full_rewrite else apply_incremental
+    try:
+        added, removed, changed = apply(conn, rows, fetched_at, run_id, commit=False)
+        record_history(conn, fetch_date)
+        complete_run(conn, run_id)
+        prune_history(conn, fetch_date)
+        conn.execute("DELETE FROM fetch_run_destinations WHERE run_id = ?", (run_id,))
+        schema.rebuild_weekend_pairs(conn, commit=False)
+        schema.bump_data_version(conn, commit=False)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        conn.close()
+        raise
+
+    # 6) Print only today's changes
+    print_changes(added, removed, changed)
+
     conn.close()
 
 if __name__ == "__main__":
@@ -11,7 +11,9 @@ except ImportError:
 
 from telegram import Update
 from telegram.ext import ApplicationBuilder, ContextTypes, MessageHandler, CommandHandler, filters
-import sqlite3, os
+import asyncio, os, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # ─── Configuration ───────────────────────────────────────────────────────────────
 # Set TELEGRAM_BOT_TOKEN in environment or .env (never commit real tokens)
@@ -19,41 +21,108 @@ TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "")
 DB_PATH = os.path.expanduser(os.environ.get("SAS_DB_PATH", "~/sas_awards/sas_awards.sqlite"))
 
 from report_config import MIN_SEATS, TRIP_DAYS_MIN, TRIP_DAYS_MAX
+import db
+import destinations
+import schema
+
+DB_WORKERS = int(os.environ.get("BOT_DB_WORKERS", "4"))   # concurrent SQLite readers
+CACHE_SIZE = int(os.environ.get("BOT_CACHE_SIZE", "256"))  # cached city/business answers
+
+# ─── Data access (blocking — always run via run_db, never on the event loop) ──────
+_db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="bot-db")
+_cache = OrderedDict()   # (kind, city) -> (stamp, rows); LRU
+_cache_lock = threading.Lock()
+
+
+async def run_db(fn, *args):
+    """Run a blocking query function in the DB thread pool and await its result."""
+    return await asyncio.get_running_loop().run_in_executor(_db_executor, fn, *args)
+
+
+def _cached(key, load):
+    """
+    Rows for `key`, reused until update_sas_awards.py bumps the data version
+    (or the UTC day changes, since the queries filter on date('now')).
+    """
+    conn = db.reader(DB_PATH)
+    try:
+        stamp = (schema.data_version(conn)[0], time.strftime("%Y-%m-%d", time.gmtime()))
+        with _cache_lock:
+            hit = _cache.get(key)
+            if hit and hit[0] == stamp:
+                _cache.move_to_end(key)
+                return hit[1]
+        rows = load(conn.cursor())
+    finally:
+        conn.close()
+    with _cache_lock:
+        _cache[key] = (stamp, rows)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return rows
+
+
+def weekend_pairs_for_city(city):
+    """(origin, inbound, outbound, seats_in, seats_out) rows for /CityName."""
+    # "Barcelona", "barc", "Köpenhamn"/"Copenhagen", "CPH" → airport codes
+    codes = destinations.resolve(DB_PATH, city)
+    if not codes:
+        return []
+
+    def load(cur):
+        # weekend_pairs already holds Wed/Thu/Fri → Sat/Sun/Mon pairs of
+        # TRIP_DAYS_MIN–TRIP_DAYS_MAX days (rebuilt by update_sas_awards.py)
+        cur.execute("""
+            SELECT
+              origin,
+              inbound  AS inbound_date,
+              outbound AS outbound_date,
+              CASE WHEN ag_in>0  THEN ag_in  ELSE ap_in  END AS seats_in,
+              CASE WHEN ag_out>0 THEN ag_out ELSE ap_out END AS seats_out
+            FROM weekend_pairs
+            WHERE
+              airport_code IN ({ph})
+              AND (ag_in>=?  OR ap_in>=?)
+              AND (ag_out>=? OR ap_out>=?)
+              AND inbound BETWEEN date('now') AND date('now','+1 year')
+            ORDER BY origin, inbound, outbound;
+        """.format(ph=",".join("?" * len(codes))), (*codes, MIN_SEATS, MIN_SEATS, MIN_SEATS, MIN_SEATS))
+        return cur.fetchall()
+    return _cached(("weekend", city), load)
+
+
+def business_rows(city=""):
+    """Business seats for /business [City]: per-city list, or the top 10 overall."""
+    codes = destinations.resolve(DB_PATH, city) if city else []
+    if city and not codes:
+        return []
+
+    def load(cur):
+        if city:
+            cur.execute("""
+                SELECT origin, date, direction, ab
+                FROM flights
+                WHERE ab >= ? AND airport_code IN ({ph})
+                ORDER BY date, origin
+                LIMIT 20
+            """.format(ph=",".join("?" * len(codes))), (MIN_SEATS, *codes))
+        else:
+            cur.execute("""
+                SELECT origin, city_name, date, direction, ab
+                FROM flights
+                WHERE ab >= ?
+                ORDER BY ab DESC, date
+                LIMIT 10
+            """, (MIN_SEATS,))
+        return cur.fetchall()
+    return _cached(("business", city), load)
+
 
 # ─── Handler for any “/CityName” command ─────────────────────────────────────────
 async def city_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     city = update.message.text.lstrip("/").strip()
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT
-          inb.origin   AS origin,
-          inb.date     AS inbound_date,
-          outb.date    AS outbound_date,
-          CASE WHEN inb.ag>0 THEN inb.ag ELSE inb.ap END   AS seats_in,
-          CASE WHEN outb.ag>0 THEN outb.ag ELSE outb.ap END AS seats_out
-        FROM flights AS inb
-        JOIN flights AS outb
-          ON inb.airport_code = outb.airport_code
-          AND inb.origin = outb.origin
-        WHERE
-          inb.city_name    = ? COLLATE NOCASE
-          AND inb.direction = 'inbound'
-          AND outb.direction= 'outbound'
-          AND (inb.ag>=? OR inb.ap>=?)
-          AND (outb.ag>=? OR outb.ap>=?)
-          AND strftime('%w', inb.date)  IN ('6','0','1')   -- Sat/Sun/Mon
-          AND strftime('%w', outb.date) IN ('3','4','5')   -- Wed/Thu/Fri
-          AND (julianday(inb.date) - julianday(outb.date)) BETWEEN ? AND ?
-          AND date(outb.date)
-              BETWEEN date(inb.date,'-7 days') AND date(inb.date,'-1 days')
-          AND date(inb.date)
-              BETWEEN date('now') AND date('now','+1 year')
-        ORDER BY inb.origin, inb.date, outb.date;
-    """, (city, MIN_SEATS, MIN_SEATS, MIN_SEATS, MIN_SEATS, TRIP_DAYS_MIN, TRIP_DAYS_MAX))
-
-    rows = cur.fetchall()
-    conn.close()
+    rows = await run_db(weekend_pairs_for_city, city)
 
     if not rows:
         await update.message.reply_text(
@@ -89,26 +158,7 @@ Min {m} seats, 3–4 day trip for weekend pairs.
 
 async def business_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     city = " ".join(context.args).strip() if context.args else ""
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    if city:
-        cur.execute("""
-            SELECT origin, date, direction, ab
-            FROM flights
-            WHERE ab >= ? AND (city_name LIKE ? OR airport_code LIKE ?)
-            ORDER BY date, origin
-            LIMIT 20
-        """, (MIN_SEATS, f"%{city}%", f"%{city}%"))
-    else:
-        cur.execute("""
-            SELECT origin, city_name, date, direction, ab
-            FROM flights
-            WHERE ab >= ?
-            ORDER BY ab DESC, date
-            LIMIT 10
-        """, (MIN_SEATS,))
-    rows = cur.fetchall()
-    conn.close()
+    rows = await run_db(business_rows, city)
 
     if not rows:
         await update.message.reply_text(
@@ -137,7 +187,8 @@ def main():
     if not TOKEN:
         print("ERROR: Set TELEGRAM_BOT_TOKEN in environment. See README.md")
         sys.exit(1)
-    app = ApplicationBuilder().token(TOKEN).build()
+    # Handle chats concurrently; queries run in _db_executor, so none waits on another
+    app = ApplicationBuilder().token(TOKEN).concurrent_updates(True).build()
     app.add_handler(CommandHandler("help", help_handler))
     app.add_handler(CommandHandler("business", business_handler))
     app.add_handler(
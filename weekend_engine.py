@@ -0,0 +1,214 @@
+"""
+In-memory weekend-pair engine.
+
+Loads `flights` once into an availability matrix seats[route, day, direction,
+cabin] and finds outbound/inbound pairs for any trip length, weekday set and
+seat threshold with array shifts and masks — no SQL per window. The
+weekend_pairs table (schema.py) covers the default TRIP_DAYS_MIN–MAX window;
+this engine serves everything else (e.g. 5–7 day trips).
+
+NumPy is optional: without it the same rules run as a plain Python loop over
+the matrix, which is slower but returns identical rows.
+"""
+import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from report_config import MIN_SEATS, TRIP_DAYS_MIN, TRIP_DAYS_MAX
+
+OUTBOUND, INBOUND = 0, 1
+CABINS = ("ag", "ap", "ab")
+# strftime('%w') numbering, as in the SQL: 0 = Sunday
+OUT_WEEKDAYS = (3, 4, 5)   # Wed/Thu/Fri
+IN_WEEKDAYS = (6, 0, 1)    # Sat/Sun/Mon
+
+# Cabin filter → cabins of which at least one needs min_seats (same as queries._weekend_cabin_clause)
+CABIN_SETS = {
+    "business": ("ab",),
+    "business_plus": ("ab", "ap"),
+    "all": ("ag", "ap", "ab"),
+}
+
+# COLLATE NOCASE folds ASCII letters only
+_NOCASE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def _weekday(d):
+    return (d.weekday() + 1) % 7
+
+
+def utc_today():
+    """SQLite's date('now')."""
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+def _plus_one_year(d):
+    """SQLite's date(d, '+1 year'): Feb 29 rolls over to Mar 1."""
+    try:
+        return d.replace(year=d.year + 1)
+    except ValueError:
+        return datetime.date(d.year + 1, 3, 1)
+
+
+class AvailabilityMatrix:
+    """
+    routes: [(origin, airport_code, city_name, country_name), ...]
+    seats:  int array [route, day, direction, cabin] (cabins ag, ap, ab)
+    present: bool array [route, day, direction] — a flights row exists
+    Day 0 is `start`; with NumPy missing, seats/present are nested lists.
+    """
+
+    def __init__(self, routes, start, seats, present):
+        self.routes = routes
+        self.start = start
+        self.seats = seats
+        self.present = present
+        self.days = len(seats[0]) if routes else 0
+
+    @classmethod
+    def load(cls, conn):
+        rows = conn.execute("""
+            SELECT origin, airport_code, city_name, country_name, direction, date, ag, ap, ab
+            FROM flights
+            WHERE direction IN ('outbound', 'inbound')
+            ORDER BY origin, airport_code
+        """).fetchall()
+        return cls.from_rows(rows)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """rows: (origin, airport_code, city_name, country_name, direction, date, ag, ap, ab)."""
+        route_ix, routes, cells = {}, [], []
+        start = end = None
+        for origin, code, city, country, direction, date, ag, ap, ab in rows:
+            key = (origin, code)
+            if key not in route_ix:
+                route_ix[key] = len(routes)
+                routes.append((origin, code, city, country))
+            d = datetime.date.fromisoformat(date)
+            start = d if start is None or d < start else start
+            end = d if end is None or d > end else end
+            cells.append((route_ix[key], d, OUTBOUND if direction == "outbound" else INBOUND,
+                          (ag or 0, ap or 0, ab or 0)))
+        days = (end - start).days + 1 if cells else 0
+        if np is not None:
+            seats = np.zeros((len(routes), days, 2, 3), dtype=np.int32)
+            present = np.zeros((len(routes), days, 2), dtype=bool)
+        else:
+            seats = [[[[0, 0, 0], [0, 0, 0]] for _ in range(days)] for _ in routes]
+            present = [[[False, False] for _ in range(days)] for _ in routes]
+        for r, d, direction, values in cells:
+            day = (d - start).days
+            if np is not None:
+                seats[r, day, direction] = values
+                present[r, day, direction] = True
+            else:
+                seats[r][day][direction] = list(values)
+                present[r][day][direction] = True
+        return cls(routes, start, seats, present)
+
+    def date(self, day):
+        return self.start + datetime.timedelta(days=int(day))
+
+    def pairs(self, cabin="all", min_seats=MIN_SEATS, trip_days=(TRIP_DAYS_MIN, TRIP_DAYS_MAX),
+              out_weekdays=OUT_WEEKDAYS, in_weekdays=IN_WEEKDAYS, from_date=None, to_date=None,
+              route_filter=None):
+        """
+        All pairs (route, outbound day, inbound day) where both legs exist, both
+        meet `cabin`/`min_seats`, the outbound/inbound fall on the given weekdays,
+        inbound - outbound is within trip_days, and the inbound date lies in
+        [from_date, to_date] (default: today .. today + 1 year).
+        route_filter(origin, airport_code, city_name, country_name) -> bool narrows routes.
+        Returns query_weekend_pairs-style row dicts in its order.
+        """
+        if not self.routes:
+            return []
+        today = utc_today()
+        from_date = from_date or today
+        to_date = to_date or _plus_one_year(today)
+        cabin_ix = [CABINS.index(c) for c in CABIN_SETS.get(cabin, CABIN_SETS["all"])]
+        route_ok = [route_filter(*r) if route_filter else True for r in self.routes]
+        lo, hi = trip_days
+
+        if np is not None:
+            found = self._pairs_numpy(cabin_ix, int(min_seats), lo, hi, out_weekdays,
+                                      in_weekdays, from_date, to_date, route_ok)
+        else:
+            found = self._pairs_python(cabin_ix, int(min_seats), lo, hi, out_weekdays,
+                                       in_weekdays, from_date, to_date, route_ok)
+        rows = [self._row(r, d_out, d_in) for r, d_out, d_in in found]
+        rows.sort(key=lambda x: (x["outbound"], x["inbound"], -_score(cabin, x),
+                                 x["city_name"].translate(_NOCASE), x["origin"], x["airport_code"]))
+        return rows
+
+    def _day_masks(self, weekdays, from_date=None, to_date=None):
+        days = [self.date(i) for i in range(self.days)]
+        return [
+            _weekday(d) in weekdays
+            and (from_date is None or d >= from_date)
+            and (to_date is None or d <= to_date)
+            for d in days
+        ]
+
+    def _pairs_numpy(self, cabin_ix, min_seats, lo, hi, out_wd, in_wd, from_date, to_date, route_ok):
+        # leg_ok[route, day, direction]: row exists and one of the cabins has min_seats
+        leg_ok = self.present & (self.seats[:, :, :, cabin_ix] >= min_seats).any(axis=3)
+        leg_ok &= np.asarray(route_ok)[:, None, None]
+        out_ok = leg_ok[:, :, OUTBOUND] & np.asarray(self._day_masks(out_wd))[None, :]
+        in_ok = leg_ok[:, :, INBOUND] & np.asarray(self._day_masks(in_wd, from_date, to_date))[None, :]
+        found = []
+        for k in range(max(lo, 0), min(hi, self.days - 1) + 1):
+            # outbound on day d pairs with inbound on day d + k
+            both = out_ok[:, :self.days - k] & in_ok[:, k:]
+            r, d = np.nonzero(both)
+            found.extend(zip(r.tolist(), d.tolist(), (d + k).tolist()))
+        return found
+
+    def _pairs_python(self, cabin_ix, min_seats, lo, hi, out_wd, in_wd, from_date, to_date, route_ok):
+        out_days = self._day_masks(out_wd)
+        in_days = self._day_masks(in_wd, from_date, to_date)
+
+        def ok(r, day, direction):
+            return self.present[r][day][direction] and any(
+                self.seats[r][day][direction][c] >= min_seats for c in cabin_ix)
+
+        found = []
+        for r in range(len(self.routes)):
+            if not route_ok[r]:
+                continue
+            for d_in in range(self.days):
+                if not in_days[d_in] or not ok(r, d_in, INBOUND):
+                    continue
+                for k in range(max(lo, 0), hi + 1):
+                    d_out = d_in - k
+                    if 0 <= d_out and out_days[d_out] and ok(r, d_out, OUTBOUND):
+                        found.append((r, d_out, d_in))
+        return found
+
+    def _row(self, r, d_out, d_in):
+        origin, code, city, country = self.routes[r]
+        if np is not None:
+            out = self.seats[r, d_out, OUTBOUND].tolist()
+            inb = self.seats[r, d_in, INBOUND].tolist()
+        else:
+            out = self.seats[r][d_out][OUTBOUND]
+            inb = self.seats[r][d_in][INBOUND]
+        return {
+            "origin": origin, "city_name": city, "airport_code": code, "country_name": country,
+            "outbound": self.date(d_out).isoformat(), "inbound": self.date(d_in).isoformat(),
+            "ag_out": out[0], "ap_out": out[1], "ab_out": out[2],
+            "ag_in": inb[0], "ap_in": inb[1], "ab_in": inb[2],
+        }
+
+
+def _score(cabin, x):
+    """Tie-break score, as in queries._weekend_order."""
+    if cabin == "business":
+        return x["ab_out"] + x["ab_in"]
+    if cabin == "business_plus":
+        return x["ab_out"] + x["ap_out"] + x["ab_in"] + x["ap_in"]
+    return (x["ab_out"] * 3 + x["ap_out"] * 2 + x["ag_out"]
+            + x["ab_in"] * 3 + x["ap_in"] * 2 + x["ag_in"])